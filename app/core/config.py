@@ -29,3 +29,136 @@ REDIS_URL = f"redis://{REDIS_HOST}:{REDIS_PORT}/0"
 
 SECRET_KEY = os.getenv("SECRET_KEY", secrets.token_urlsafe(32))
 ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24 * 8  # 8 days
+
+# Outbound webhook delivery. A single pooled client is kept per worker process.
+WEBHOOK_REQUEST_TIMEOUT = float(os.getenv("WEBHOOK_REQUEST_TIMEOUT") or 30.0)
+WEBHOOK_MAX_CONNECTIONS = int(os.getenv("WEBHOOK_MAX_CONNECTIONS") or 100)
+WEBHOOK_MAX_KEEPALIVE_CONNECTIONS = int(
+    os.getenv("WEBHOOK_MAX_KEEPALIVE_CONNECTIONS") or 20
+)
+# In-flight requests per destination host adapt to its latency within these bounds.
+WEBHOOK_MAX_CONNECTIONS_PER_HOST = int(
+    os.getenv("WEBHOOK_MAX_CONNECTIONS_PER_HOST") or 32
+)
+WEBHOOK_MIN_CONNECTIONS_PER_HOST = int(
+    os.getenv("WEBHOOK_MIN_CONNECTIONS_PER_HOST") or 1
+)
+WEBHOOK_INITIAL_CONNECTIONS_PER_HOST = int(
+    os.getenv("WEBHOOK_INITIAL_CONNECTIONS_PER_HOST") or 4
+)
+# Limits start from the latency recorded for each host over this many seconds
+# (0 disables), so a restarted worker does not learn them again from scratch.
+WEBHOOK_LATENCY_SEED_WINDOW = int(os.getenv("WEBHOOK_LATENCY_SEED_WINDOW") or 900)
+# HTTP/2 needs the optional `h2` package (pip install "httpx[http2]").
+WEBHOOK_HTTP2 = os.getenv("WEBHOOK_HTTP2", "false").lower() == "true"
+
+# Failed deliveries are retried individually by the `retry_due_deliveries` beat task.
+WEBHOOK_RETRY_POLL_INTERVAL = float(os.getenv("WEBHOOK_RETRY_POLL_INTERVAL") or 5.0)
+WEBHOOK_RETRY_BATCH_SIZE = int(os.getenv("WEBHOOK_RETRY_BATCH_SIZE") or 500)
+# A claimed delivery becomes due again after this many seconds if its worker dies.
+WEBHOOK_DELIVERY_LEASE_SECONDS = int(os.getenv("WEBHOOK_DELIVERY_LEASE_SECONDS") or 120)
+
+# Events published in bulk are enqueued as one Celery message per chunk.
+WEBHOOK_PUBLISH_CHUNK_SIZE = int(os.getenv("WEBHOOK_PUBLISH_CHUNK_SIZE") or 100)
+
+# Outbox relay: unpublished events are drained in batches of this size.
+OUTBOX_BATCH_SIZE = int(os.getenv("OUTBOX_BATCH_SIZE") or 500)
+OUTBOX_POLL_INTERVAL = float(os.getenv("OUTBOX_POLL_INTERVAL") or 0.5)
+
+# Cached per-user subscriber counts expire and are recounted after this many seconds.
+SUBSCRIBER_COUNT_TTL = int(os.getenv("SUBSCRIBER_COUNT_TTL") or 3600)
+
+# Totals of filtered subscriber listings (total=cached) are served from Redis and
+# recounted in the background once older than SUBSCRIBER_TOTAL_REFRESH seconds.
+SUBSCRIBER_TOTAL_REFRESH = int(os.getenv("SUBSCRIBER_TOTAL_REFRESH") or 60)
+SUBSCRIBER_TOTAL_TTL = int(os.getenv("SUBSCRIBER_TOTAL_TTL") or 3600)
+
+# Bulk subscriber import: lines are validated in batches of SUBSCRIBER_IMPORT_BATCH_SIZE
+# by SUBSCRIBER_IMPORT_PROCESSES worker processes (0 validates in the API process),
+# and the first SUBSCRIBER_IMPORT_MAX_ERRORS invalid lines are reported back.
+SUBSCRIBER_IMPORT_BATCH_SIZE = int(os.getenv("SUBSCRIBER_IMPORT_BATCH_SIZE") or 5000)
+SUBSCRIBER_IMPORT_PROCESSES = int(os.getenv("SUBSCRIBER_IMPORT_PROCESSES") or 4)
+SUBSCRIBER_IMPORT_MAX_ERRORS = int(os.getenv("SUBSCRIBER_IMPORT_MAX_ERRORS") or 100)
+
+# Bulk subscriber export: rows are fetched through a server-side cursor in batches of this size.
+SUBSCRIBER_EXPORT_BATCH_SIZE = int(os.getenv("SUBSCRIBER_EXPORT_BATCH_SIZE") or 5000)
+
+# Per-worker cache of active webhooks by (user_id, event_type).
+WEBHOOK_ROUTING_CACHE_SIZE = int(os.getenv("WEBHOOK_ROUTING_CACHE_SIZE") or 10000)
+WEBHOOK_ROUTING_CACHE_TTL = float(os.getenv("WEBHOOK_ROUTING_CACHE_TTL") or 60.0)
+
+# Circuit breaker per webhook host: deliveries are deferred for the cooldown once
+# this many requests failed within the window, then a single probe is sent.
+WEBHOOK_CIRCUIT_FAILURE_THRESHOLD = int(
+    os.getenv("WEBHOOK_CIRCUIT_FAILURE_THRESHOLD") or 5
+)
+WEBHOOK_CIRCUIT_FAILURE_WINDOW = float(
+    os.getenv("WEBHOOK_CIRCUIT_FAILURE_WINDOW") or 60.0
+)
+WEBHOOK_CIRCUIT_COOLDOWN = float(os.getenv("WEBHOOK_CIRCUIT_COOLDOWN") or 30.0)
+
+# Outbound token buckets in requests/second (0 disables) with their burst size.
+# Waits up to WEBHOOK_RATE_LIMIT_MAX_WAIT seconds are slept through, longer
+# ones defer the delivery.
+WEBHOOK_RATE_LIMIT_HOST_RATE = float(os.getenv("WEBHOOK_RATE_LIMIT_HOST_RATE") or 50.0)
+WEBHOOK_RATE_LIMIT_HOST_BURST = int(os.getenv("WEBHOOK_RATE_LIMIT_HOST_BURST") or 100)
+WEBHOOK_RATE_LIMIT_WEBHOOK_RATE = float(
+    os.getenv("WEBHOOK_RATE_LIMIT_WEBHOOK_RATE") or 10.0
+)
+WEBHOOK_RATE_LIMIT_WEBHOOK_BURST = int(
+    os.getenv("WEBHOOK_RATE_LIMIT_WEBHOOK_BURST") or 20
+)
+WEBHOOK_RATE_LIMIT_MAX_WAIT = float(os.getenv("WEBHOOK_RATE_LIMIT_MAX_WAIT") or 1.0)
+
+# Fair queueing: the dispatcher keeps each Celery queue at most this deep and
+# gives every user with a backlog up to FAIR_QUEUE_QUANTUM messages per round.
+FAIR_QUEUE_DEPTH = int(os.getenv("FAIR_QUEUE_DEPTH") or 100)
+FAIR_QUEUE_QUANTUM = int(os.getenv("FAIR_QUEUE_QUANTUM") or 10)
+FAIR_QUEUE_POLL_INTERVAL = float(os.getenv("FAIR_QUEUE_POLL_INTERVAL") or 0.05)
+
+# Asyncio delivery worker (python -m app.webhook.worker): tasks in flight per
+# process, its own database pool and how long shutdown waits for running tasks.
+ASYNC_WORKER_CONCURRENCY = int(os.getenv("ASYNC_WORKER_CONCURRENCY") or 1000)
+ASYNC_WORKER_DB_POOL_SIZE = int(os.getenv("ASYNC_WORKER_DB_POOL_SIZE") or 20)
+ASYNC_WORKER_POLL_INTERVAL = float(os.getenv("ASYNC_WORKER_POLL_INTERVAL") or 0.05)
+ASYNC_WORKER_SHUTDOWN_TIMEOUT = float(
+    os.getenv("ASYNC_WORKER_SHUTDOWN_TIMEOUT") or 30.0
+)
+# Workers missing heartbeats for 3 intervals are presumed dead and their
+# unacknowledged tasks are put back on the queues.
+ASYNC_WORKER_HEARTBEAT_INTERVAL = float(
+    os.getenv("ASYNC_WORKER_HEARTBEAT_INTERVAL") or 10.0
+)
+
+# Virtual shards of the delivery queues by user_id hash, served by the worker
+# processes of python -m app.webhook.supervisor. 0 keeps the shared Celery
+# queues; only enable it when no Celery workers consume the delivery queues.
+WEBHOOK_SHARDS = int(os.getenv("WEBHOOK_SHARDS") or 0)
+# A worker process that died is restarted after this many seconds, its shards
+# are served by the other processes meanwhile.
+SUPERVISOR_RESTART_DELAY = float(os.getenv("SUPERVISOR_RESTART_DELAY") or 5.0)
+
+# webhook_events and webhook_deliveries are partitioned per day (see
+# app/db/partitions.py): partitions are created this many days ahead and
+# dropped once older than the retention, 0 keeps them forever.
+WEBHOOK_PARTITION_PREMAKE_DAYS = int(os.getenv("WEBHOOK_PARTITION_PREMAKE_DAYS") or 7)
+WEBHOOK_RETENTION_DAYS = int(os.getenv("WEBHOOK_RETENTION_DAYS") or 30)
+
+# Event data larger than this is written to the blob store and replaced by a
+# claim check in Redis and webhook_events (see app/webhook/blobstore.py), 0
+# disables it. The store is file:///path (shared by all workers) or
+# s3://bucket/prefix, with WEBHOOK_BLOB_S3_ENDPOINT_URL for MinIO and the like.
+WEBHOOK_BLOB_THRESHOLD_BYTES = int(os.getenv("WEBHOOK_BLOB_THRESHOLD_BYTES") or 0)
+WEBHOOK_BLOB_STORE_URL = (
+    os.getenv("WEBHOOK_BLOB_STORE_URL") or "file:///var/lib/webhook-notifier/blobs"
+)
+WEBHOOK_BLOB_S3_ENDPOINT_URL = os.getenv("WEBHOOK_BLOB_S3_ENDPOINT_URL") or None
+
+# Encoding of Celery task messages (see app/webhook/serialization.py): json or
+# msgpack, and gzip or zstd compression of bodies over the threshold ("" to
+# never compress). Workers read every setting, they can be changed any time.
+CELERY_TASK_SERIALIZER = os.getenv("CELERY_TASK_SERIALIZER") or "json"
+CELERY_TASK_COMPRESSION = os.getenv("CELERY_TASK_COMPRESSION") or ""
+CELERY_COMPRESSION_THRESHOLD_BYTES = int(
+    os.getenv("CELERY_COMPRESSION_THRESHOLD_BYTES") or 4096
+)
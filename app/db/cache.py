@@ -1,22 +1,35 @@
 from typing import Annotated
 
-import redis.asyncio as redis
+import redis
+import redis.asyncio as aioredis
 from fastapi import Depends
 
 from app.core import config
 
 
 def _create_connection_pool():
+    return aioredis.BlockingConnectionPool.from_url(
+        config.REDIS_URL, max_connections=70, timeout=10
+    )
+
+
+def _create_sync_connection_pool():
     return redis.BlockingConnectionPool.from_url(
         config.REDIS_URL, max_connections=70, timeout=10
     )
 
 
 _connection_pool = _create_connection_pool()
+_sync_connection_pool = _create_sync_connection_pool()
 
 
 def get_redis():
-    return redis.Redis(connection_pool=_connection_pool)
+    return aioredis.Redis(connection_pool=_connection_pool)
+
+
+def get_sync_redis():
+    """Client for synchronous code such as the Celery tasks"""
+    return redis.Redis(connection_pool=_sync_connection_pool)
 
 
-Cache = Annotated[redis.Redis, Depends(get_redis)]
+Cache = Annotated[aioredis.Redis, Depends(get_redis)]
@@ -0,0 +1,198 @@
+# app/db/partitions.py
+"""Daily range partitions of the webhook event tables.
+
+webhook_events and webhook_deliveries are partitioned by created_at, one
+partition per UTC day named <table>_pYYYYMMDD. Deliveries take the created_at
+of their event, so an event and its deliveries live in the same day and the
+idempotency check of a redelivered event only probes one partition's index.
+
+Partitions are created a few days ahead and dropped whole once they are past
+retention, instead of DELETEing old rows. Both run hourly from the beat
+schedule (webhook_notifier.maintain_partitions). Rows of days without a
+partition, should maintenance fall behind, land in the table's DEFAULT
+partition and are moved to their day's partition once it is created.
+"""
+
+import re
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+
+import structlog
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+from app.core import config
+from app.db.base_model import now
+
+logger = structlog.get_logger()
+
+PARTITIONED_TABLES = ("webhook_events", "webhook_deliveries")
+
+# Upper bound in pg_get_expr(relpartbound), absent for MAXVALUE and DEFAULT
+UPPER_BOUND = re.compile(r"TO \('([^']+)'\)")
+
+
+def partition_name(table: str, day: date) -> str:
+    return f"{table}_p{day:%Y%m%d}"
+
+
+def default_partition_name(table: str) -> str:
+    return f"{table}_default"
+
+
+def day_start(day: date) -> datetime:
+    return datetime.combine(day, time.min, timezone.utc)
+
+
+def parse_bound(bound: str) -> Optional[datetime]:
+    match = UPPER_BOUND.search(bound)
+    if match is None:
+        return None
+    value = match.group(1)
+    # Postgres prints offsets as +00, Python before 3.11 only reads +00:00
+    if re.search(r"[+-]\d\d$", value):
+        value += ":00"
+    return datetime.fromisoformat(value)
+
+
+def is_partitioned(conn: Connection, table: str) -> bool:
+    return bool(
+        conn.execute(
+            text(
+                "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table "
+                "WHERE partrelid = to_regclass(:table))"
+            ),
+            {"table": table},
+        ).scalar()
+    )
+
+
+def partitions(conn: Connection, table: str) -> List[Tuple[str, Optional[datetime]]]:
+    """(name, upper bound) of each partition of a table"""
+    rows = conn.execute(
+        text(
+            """
+            SELECT c.relname, pg_get_expr(c.relpartbound, c.oid)
+            FROM pg_inherits i
+            JOIN pg_class c ON c.oid = i.inhrelid
+            WHERE i.inhparent = to_regclass(:table)
+            """
+        ),
+        {"table": table},
+    ).all()
+    return [(name, parse_bound(bound)) for name, bound in rows]
+
+
+def default_partition_days(conn: Connection, table: str) -> List[date]:
+    """The days of the rows in the table's DEFAULT partition"""
+    rows = conn.execute(
+        text(
+            "SELECT DISTINCT (created_at AT TIME ZONE 'UTC')::date "
+            f"FROM {default_partition_name(table)}"
+        )
+    ).all()
+    return sorted(day for (day,) in rows)
+
+
+def ensure_partitions(
+    conn: Connection, table: str, first_day: date, days: int
+) -> List[str]:
+    """Create the daily partitions from first_day on that do not exist yet,
+    and those of the days with rows in the DEFAULT partition"""
+    existing = partitions(conn, table)
+    bounds = [upper for _, upper in existing if upper is not None]
+    # Days before the last bound are covered already, if only by the
+    # partition of the rows that predate partitioning
+    covered = max(bounds, default=None)
+    stray: List[date] = []
+    if default_partition_name(table) in {name for name, _ in existing}:
+        stray = default_partition_days(conn, table)
+    if stray:
+        logger.error(
+            "Rows without a partition, partition maintenance fell behind",
+            table=table,
+            days=[day.isoformat() for day in stray],
+        )
+
+    created = []
+    upcoming = [first_day + timedelta(days=offset) for offset in range(days + 1)]
+    for day in sorted(set(upcoming) | set(stray)):
+        # Days with rows in the DEFAULT partition have no partition of their own
+        if day not in stray and covered is not None and day_start(day) < covered:
+            continue
+        name = partition_name(table, day)
+        bounds_sql = (
+            f"FOR VALUES FROM ('{day_start(day).isoformat()}') "
+            f"TO ('{day_start(day + timedelta(days=1)).isoformat()}')"
+        )
+        if day in stray:
+            move_from_default(conn, table, name, day, bounds_sql)
+        else:
+            conn.execute(
+                text(
+                    f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF {table} "
+                    + bounds_sql
+                )
+            )
+        created.append(name)
+    return created
+
+
+def move_from_default(
+    conn: Connection, table: str, name: str, day: date, bounds_sql: str
+):
+    """Create a day's partition out of its rows in the DEFAULT partition.
+    Postgres refuses to create a partition whose rows are in the DEFAULT
+    one, so they are moved to a plain table that is then attached."""
+    conn.execute(
+        text(
+            f"CREATE TABLE {name} (LIKE {table} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"
+        )
+    )
+    conn.execute(
+        text(
+            f"WITH moved AS (DELETE FROM {default_partition_name(table)} "
+            "WHERE created_at >= :start AND created_at < :end RETURNING *) "
+            f"INSERT INTO {name} SELECT * FROM moved"
+        ),
+        {"start": day_start(day), "end": day_start(day + timedelta(days=1))},
+    )
+    conn.execute(text(f"ALTER TABLE {table} ATTACH PARTITION {name} {bounds_sql}"))
+
+
+def drop_expired_partitions(
+    conn: Connection, table: str, cutoff: datetime
+) -> List[str]:
+    """Drop the partitions holding only rows created before cutoff"""
+    dropped = []
+    for name, upper in partitions(conn, table):
+        if upper is not None and upper <= cutoff:
+            conn.execute(text(f"DROP TABLE {name}"))
+            dropped.append(name)
+    return dropped
+
+
+def maintain_partitions(
+    conn: Connection,
+    today: Optional[date] = None,
+    premake_days: int = config.WEBHOOK_PARTITION_PREMAKE_DAYS,
+    retention_days: int = config.WEBHOOK_RETENTION_DAYS,
+) -> Dict[str, List[str]]:
+    """Create the upcoming partitions and drop expired ones of every
+    partitioned table, returns the partitions created and dropped"""
+    today = today or now().date()
+    # Concurrent runs would race on the same partitions
+    conn.execute(text("SELECT pg_advisory_xact_lock(hashtext('maintain_partitions'))"))
+    changes: Dict[str, List[str]] = {"created": [], "dropped": []}
+    for table in PARTITIONED_TABLES:
+        if not is_partitioned(conn, table):
+            logger.warning("Table is not partitioned, skipping", table=table)
+            continue
+        changes["created"] += ensure_partitions(conn, table, today, premake_days)
+        if retention_days > 0:
+            cutoff = day_start(today - timedelta(days=retention_days))
+            changes["dropped"] += drop_expired_partitions(conn, table, cutoff)
+
+    if changes["created"] or changes["dropped"]:
+        logger.info("Webhook table partitions maintained", **changes)
+    return changes
@@ -1,3 +1,4 @@
+from contextlib import asynccontextmanager
 from datetime import datetime
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
@@ -7,6 +8,9 @@ import structlog
 from prometheus_client import Counter, Histogram, generate_latest
 from starlette.responses import Response
 
+from app.subscriber.importer import shutdown_import_pool
+from app.webhook.circuit import collect_circuit_metrics
+from app.webhook.sharding import collect_shard_metrics
 from app.webhook.webhook_notifier import WebhookNotifier
 import app.auth.user.route as user_route
 import app.auth.login.route as login_route
@@ -21,10 +25,19 @@ REQUEST_DURATION = Histogram("request_duration_seconds", "Request duration")
 
 logger = structlog.get_logger()
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    # The import processes would outlive a reload or shutdown
+    shutdown_import_pool()
+
+
 app = FastAPI(
     title="Whookfirm Subscriber Management API",
     description="API for managing subscribers, integrations, and webhooks",
     version="1.0.0",
+    lifespan=lifespan,
 )
 
 # Middleware
@@ -55,6 +68,8 @@ async def health_check():
 
 @app.get("/metrics")
 async def metrics():
+    await collect_circuit_metrics()
+    await collect_shard_metrics()
     return Response(generate_latest(), media_type="text/plain")
 
 
@@ -0,0 +1,177 @@
+"""Partition webhook events and deliveries by day
+
+Revision ID: 2f8c4e1a7b95
+Revises: 6b3f0d2a9c81
+Create Date: 2026-10-18 21:37:45.104218
+
+"""
+
+from datetime import datetime, time, timedelta, timezone
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "2f8c4e1a7b95"
+down_revision: Union[str, Sequence[str], None] = "6b3f0d2a9c81"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Daily partitions created ahead, from then on the maintain_partitions task
+# keeps creating them (app/db/partitions.py)
+PREMAKE_DAYS = 7
+
+# (table, foreign key column, referenced table)
+TABLES = [
+    ("webhook_events", "user_id", "users"),
+    ("webhook_deliveries", "webhook_id", "webhooks"),
+]
+
+
+def _create_indexes():
+    # Unique indexes of a partitioned table must contain the partition key
+    op.create_index(
+        "ix_webhook_events_event_id",
+        "webhook_events",
+        ["event_id", "created_at"],
+        unique=True,
+    )
+    op.create_index(
+        "ix_webhook_events_unpublished",
+        "webhook_events",
+        ["created_at"],
+        postgresql_where=sa.text("published_at IS NULL"),
+    )
+    op.create_index(
+        "ix_webhook_deliveries_next_attempt",
+        "webhook_deliveries",
+        ["next_attempt"],
+        postgresql_where=sa.text("next_attempt IS NOT NULL"),
+    )
+    op.create_index(
+        "uq_webhook_deliveries_webhook_event",
+        "webhook_deliveries",
+        ["webhook_id", "event_id", "created_at"],
+        unique=True,
+    )
+
+
+def _drop_indexes():
+    op.drop_index("ix_webhook_events_event_id", table_name="webhook_events")
+    op.drop_index("ix_webhook_events_unpublished", table_name="webhook_events")
+    op.drop_index("ix_webhook_deliveries_next_attempt", table_name="webhook_deliveries")
+    op.drop_index(
+        "uq_webhook_deliveries_webhook_event", table_name="webhook_deliveries"
+    )
+
+
+def _day_start(offset: int) -> datetime:
+    today = datetime.now(timezone.utc).date()
+    return datetime.combine(today + timedelta(days=offset), time.min, timezone.utc)
+
+
+def upgrade():
+    # Existing rows are kept in place: each table becomes the first partition
+    # of its new parent, covering everything up to tomorrow, and is dropped
+    # whole by retention once all of it has expired. Attaching builds the
+    # parent's indexes on it, which takes a while on large tables.
+    _drop_indexes()
+    for table, fk_column, _ in TABLES:
+        op.drop_constraint(f"{table}_pkey", table, type_="primary")
+        op.drop_constraint(f"{table}_{fk_column}_fkey", table, type_="foreignkey")
+        op.rename_table(table, f"{table}_legacy")
+        op.execute(
+            f"UPDATE {table}_legacy SET created_at = now() WHERE created_at IS NULL"
+        )
+        op.alter_column(
+            f"{table}_legacy",
+            "created_at",
+            existing_type=sa.DateTime(timezone=True),
+            nullable=False,
+        )
+        op.execute(
+            f"""
+            CREATE TABLE {table} (LIKE {table}_legacy INCLUDING DEFAULTS)
+            PARTITION BY RANGE (created_at)
+            """
+        )
+    # Deliveries used to be stamped with their own insert time, they now take
+    # the created_at of their event, which the workers look the event up by
+    op.execute(
+        """
+        UPDATE webhook_deliveries_legacy AS d SET created_at = e.created_at
+        FROM webhook_events_legacy AS e
+        WHERE e.event_id = d.event_id::text AND d.created_at <> e.created_at
+        """
+    )
+
+    for table, fk_column, referenced in TABLES:
+        op.create_primary_key(f"{table}_pkey", table, ["id", "created_at"])
+        op.create_foreign_key(
+            f"{table}_{fk_column}_fkey", table, referenced, [fk_column], ["id"]
+        )
+    _create_indexes()
+
+    for table, _, _ in TABLES:
+        op.execute(
+            f"""
+            ALTER TABLE {table} ATTACH PARTITION {table}_legacy
+            FOR VALUES FROM (MINVALUE) TO ('{_day_start(1).isoformat()}')
+            """
+        )
+        for offset in range(1, PREMAKE_DAYS + 1):
+            start = _day_start(offset)
+            op.execute(
+                f"""
+                CREATE TABLE {table}_p{start:%Y%m%d} PARTITION OF {table}
+                FOR VALUES FROM ('{start.isoformat()}')
+                TO ('{_day_start(offset + 1).isoformat()}')
+                """
+            )
+        # Catches the rows of days whose partition maintain_partitions has not
+        # created yet, which it moves out once it does (app/db/partitions.py)
+        op.execute(f"CREATE TABLE {table}_default PARTITION OF {table} DEFAULT")
+
+
+def downgrade():
+    # Copy the partitions that retention left back into plain tables
+    for table, _, _ in TABLES:
+        op.execute(f"CREATE TABLE {table}_plain (LIKE {table} INCLUDING DEFAULTS)")
+        op.execute(f"INSERT INTO {table}_plain SELECT * FROM {table}")
+        op.drop_table(table)
+        op.rename_table(f"{table}_plain", table)
+        op.alter_column(
+            table,
+            "created_at",
+            existing_type=sa.DateTime(timezone=True),
+            nullable=True,
+        )
+
+    for table, fk_column, referenced in TABLES:
+        op.create_primary_key(f"{table}_pkey", table, ["id"])
+        op.create_foreign_key(
+            f"{table}_{fk_column}_fkey", table, referenced, [fk_column], ["id"]
+        )
+    op.create_index(
+        "ix_webhook_events_event_id", "webhook_events", ["event_id"], unique=True
+    )
+    op.create_index(
+        "ix_webhook_events_unpublished",
+        "webhook_events",
+        ["created_at"],
+        postgresql_where=sa.text("published_at IS NULL"),
+    )
+    op.create_index(
+        "ix_webhook_deliveries_next_attempt",
+        "webhook_deliveries",
+        ["next_attempt"],
+        postgresql_where=sa.text("next_attempt IS NOT NULL"),
+    )
+    op.create_index(
+        "uq_webhook_deliveries_webhook_event",
+        "webhook_deliveries",
+        ["webhook_id", "event_id"],
+        unique=True,
+    )
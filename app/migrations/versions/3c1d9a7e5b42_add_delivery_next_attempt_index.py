@@ -0,0 +1,33 @@
+"""Add webhook_deliveries next_attempt index
+
+Revision ID: 3c1d9a7e5b42
+Revises: bf928fe6f18a
+Create Date: 2026-10-18 09:12:31.204518
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "3c1d9a7e5b42"
+down_revision: Union[str, Sequence[str], None] = "bf928fe6f18a"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade():
+    # Partial index used by the retry scheduler to find due deliveries
+    op.create_index(
+        "ix_webhook_deliveries_next_attempt",
+        "webhook_deliveries",
+        ["next_attempt"],
+        postgresql_where=sa.text("next_attempt IS NOT NULL"),
+    )
+
+
+def downgrade():
+    op.drop_index("ix_webhook_deliveries_next_attempt", table_name="webhook_deliveries")
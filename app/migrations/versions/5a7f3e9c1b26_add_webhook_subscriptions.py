@@ -0,0 +1,55 @@
+"""Add webhook_subscriptions routing table
+
+Revision ID: 5a7f3e9c1b26
+Revises: 8e4b2f61d0c7
+Create Date: 2026-10-18 13:40:05.672114
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlalchemy.dialects.postgresql as pg
+
+
+# revision identifiers, used by Alembic.
+revision: str = "5a7f3e9c1b26"
+down_revision: Union[str, Sequence[str], None] = "8e4b2f61d0c7"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade():
+    # Create webhook_subscriptions table
+    op.create_table(
+        "webhook_subscriptions",
+        sa.Column("webhook_id", pg.UUID, primary_key=True),
+        sa.Column("event_type", sa.String, primary_key=True),
+        sa.Column("user_id", pg.UUID, nullable=False),
+        sa.ForeignKeyConstraint(["webhook_id"], ["webhooks.id"], ondelete="CASCADE"),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"]),
+    )
+    op.create_index(
+        "ix_webhook_subscriptions_user_event",
+        "webhook_subscriptions",
+        ["user_id", "event_type"],
+    )
+
+    # Backfill from the events of active webhooks
+    op.execute(
+        """
+        INSERT INTO webhook_subscriptions (webhook_id, event_type, user_id)
+        SELECT DISTINCT w.id, e.event_type, w.user_id
+        FROM webhooks w
+        CROSS JOIN LATERAL json_array_elements_text(w.events) AS e(event_type)
+        WHERE w.is_active
+        """
+    )
+
+
+def downgrade():
+    op.drop_index(
+        "ix_webhook_subscriptions_user_event", table_name="webhook_subscriptions"
+    )
+    op.drop_table("webhook_subscriptions")
@@ -0,0 +1,71 @@
+"""Build webhook delivery payloads from their event
+
+Revision ID: 6b3f0d2a9c81
+Revises: a94e0c3b7d58
+Create Date: 2026-10-18 19:04:12.582093
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import JSON
+
+
+# revision identifiers, used by Alembic.
+revision: str = "6b3f0d2a9c81"
+down_revision: Union[str, Sequence[str], None] = "a94e0c3b7d58"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade():
+    op.alter_column("webhook_deliveries", "payload", existing_type=JSON, nullable=True)
+    # Drop the copies of event data, retries rebuild them from the event. The
+    # space is reused by new rows; run VACUUM FULL (or pg_repack) on
+    # webhook_deliveries to give it back to the OS.
+    op.execute(
+        """
+        UPDATE webhook_deliveries d
+        SET payload = NULL
+        FROM webhook_events e
+        WHERE e.event_id = d.event_id::text
+          AND d.payload IS NOT NULL
+        """
+    )
+
+
+def downgrade():
+    op.execute(
+        """
+        UPDATE webhook_deliveries d
+        SET payload = json_build_object(
+            'event_id', e.event_id,
+            'event_type', e.event_type,
+            'timestamp', to_char(
+                e.created_at AT TIME ZONE 'UTC', 'YYYY-MM-DD"T"HH24:MI:SS.US"+00:00"'
+            ),
+            'data', e.data
+        )
+        FROM webhook_events e
+        WHERE e.event_id = d.event_id::text
+          AND d.payload IS NULL
+        """
+    )
+    # Deliveries whose event is gone cannot get their payload back, refuse to
+    # downgrade rather than delete them
+    missing = (
+        op.get_bind()
+        .execute(
+            sa.text("SELECT count(*) FROM webhook_deliveries WHERE payload IS NULL")
+        )
+        .scalar()
+    )
+    if missing:
+        raise RuntimeError(
+            f"{missing} webhook deliveries have no payload and no event to "
+            "rebuild it from. Restore their events, or delete them if they are "
+            "no longer needed, before downgrading."
+        )
+    op.alter_column("webhook_deliveries", "payload", existing_type=JSON, nullable=False)
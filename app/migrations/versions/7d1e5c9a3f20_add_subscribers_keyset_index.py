@@ -0,0 +1,45 @@
+"""Add subscribers (user_id, created_at, id) index
+
+Revision ID: 7d1e5c9a3f20
+Revises: 2f8c4e1a7b95
+Create Date: 2026-10-18 22:06:12.583917
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "7d1e5c9a3f20"
+down_revision: Union[str, Sequence[str], None] = "2f8c4e1a7b95"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade():
+    # Keyset pagination compares (created_at, id), which NULLs would break
+    op.execute("UPDATE subscribers SET created_at = now() WHERE created_at IS NULL")
+    op.alter_column(
+        "subscribers",
+        "created_at",
+        existing_type=sa.DateTime(timezone=True),
+        nullable=False,
+    )
+    op.create_index(
+        "ix_subscribers_user_id_created_at",
+        "subscribers",
+        ["user_id", "created_at", "id"],
+    )
+
+
+def downgrade():
+    op.drop_index("ix_subscribers_user_id_created_at", table_name="subscribers")
+    op.alter_column(
+        "subscribers",
+        "created_at",
+        existing_type=sa.DateTime(timezone=True),
+        nullable=True,
+    )
@@ -0,0 +1,40 @@
+"""Add webhook_events published_at for the transactional outbox
+
+Revision ID: 8e4b2f61d0c7
+Revises: 3c1d9a7e5b42
+Create Date: 2026-10-18 11:02:47.518330
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "8e4b2f61d0c7"
+down_revision: Union[str, Sequence[str], None] = "3c1d9a7e5b42"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade():
+    op.add_column(
+        "webhook_events",
+        sa.Column("published_at", sa.DateTime(timezone=True), nullable=True),
+    )
+    # Existing events were enqueued directly when they were created
+    op.execute("UPDATE webhook_events SET published_at = created_at")
+    # Partial index used by the outbox relay to find unpublished events
+    op.create_index(
+        "ix_webhook_events_unpublished",
+        "webhook_events",
+        ["created_at"],
+        postgresql_where=sa.text("published_at IS NULL"),
+    )
+
+
+def downgrade():
+    op.drop_index("ix_webhook_events_unpublished", table_name="webhook_events")
+    op.drop_column("webhook_events", "published_at")
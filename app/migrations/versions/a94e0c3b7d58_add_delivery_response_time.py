@@ -0,0 +1,31 @@
+"""Add webhook_deliveries response_time_ms
+
+Revision ID: a94e0c3b7d58
+Revises: d27c4a8f9e13
+Create Date: 2026-10-18 16:21:09.547731
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "a94e0c3b7d58"
+down_revision: Union[str, Sequence[str], None] = "d27c4a8f9e13"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade():
+    # Latency of the last attempt, as observed by the delivery engine
+    op.add_column(
+        "webhook_deliveries",
+        sa.Column("response_time_ms", sa.Integer(), nullable=True),
+    )
+
+
+def downgrade():
+    op.drop_column("webhook_deliveries", "response_time_ms")
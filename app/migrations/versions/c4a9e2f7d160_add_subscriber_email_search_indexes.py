@@ -0,0 +1,38 @@
+"""Add subscriber email search indexes
+
+Revision ID: c4a9e2f7d160
+Revises: 7d1e5c9a3f20
+Create Date: 2026-10-18 22:48:31.906245
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "c4a9e2f7d160"
+down_revision: Union[str, Sequence[str], None] = "7d1e5c9a3f20"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade():
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    # Substring search, lower(email) LIKE '%term%'
+    op.execute(
+        "CREATE INDEX ix_subscribers_email_trgm "
+        "ON subscribers USING gin (lower(email) gin_trgm_ops)"
+    )
+    # Prefix search of a user's subscribers, lower(email) LIKE 'term%'
+    op.execute(
+        "CREATE INDEX ix_subscribers_user_id_email_prefix "
+        "ON subscribers (user_id, lower(email) text_pattern_ops)"
+    )
+
+
+def downgrade():
+    # pg_trgm is left installed, other objects may use it
+    op.drop_index("ix_subscribers_user_id_email_prefix", table_name="subscribers")
+    op.drop_index("ix_subscribers_email_trgm", table_name="subscribers")
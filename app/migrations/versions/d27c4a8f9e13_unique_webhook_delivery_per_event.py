@@ -0,0 +1,43 @@
+"""Make webhook deliveries unique per webhook and event
+
+Revision ID: d27c4a8f9e13
+Revises: 5a7f3e9c1b26
+Create Date: 2026-10-18 15:02:47.318260
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "d27c4a8f9e13"
+down_revision: Union[str, Sequence[str], None] = "5a7f3e9c1b26"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade():
+    # Drop duplicates left by racing retries, keeping the oldest delivery
+    op.execute(
+        """
+        DELETE FROM webhook_deliveries d
+        USING webhook_deliveries o
+        WHERE d.webhook_id = o.webhook_id
+          AND d.event_id = o.event_id
+          AND (d.created_at, d.id) > (o.created_at, o.id)
+        """
+    )
+    op.create_index(
+        "uq_webhook_deliveries_webhook_event",
+        "webhook_deliveries",
+        ["webhook_id", "event_id"],
+        unique=True,
+    )
+
+
+def downgrade():
+    op.drop_index(
+        "uq_webhook_deliveries_webhook_event", table_name="webhook_deliveries"
+    )
@@ -0,0 +1,34 @@
+"""Unique subscribers (user_id, email)
+
+Revision ID: e5b8d3a1c7f4
+Revises: c4a9e2f7d160
+Create Date: 2026-10-18 23:31:58.240716
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "e5b8d3a1c7f4"
+down_revision: Union[str, Sequence[str], None] = "c4a9e2f7d160"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade():
+    # Concurrent creates could race past the duplicate check, keep the oldest
+    op.execute(
+        "DELETE FROM subscribers s USING subscribers d "
+        "WHERE s.user_id = d.user_id AND s.email = d.email "
+        "AND (s.created_at, s.id) > (d.created_at, d.id)"
+    )
+    op.create_unique_constraint(
+        "uq_subscribers_user_id_email", "subscribers", ["user_id", "email"]
+    )
+
+
+def downgrade():
+    op.drop_constraint("uq_subscribers_user_id_email", "subscribers", type_="unique")
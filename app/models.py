@@ -1,5 +1,7 @@
+from typing import Any, Dict, Optional
 from uuid import UUID
 from sqlalchemy import (
+    DDL,
     Column,
     Integer,
     String,
@@ -7,7 +9,11 @@ from sqlalchemy import (
     Boolean,
     Text,
     ForeignKey,
+    UniqueConstraint,
+    Index,
     JSON,
+    event,
+    text,
 )
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from sqlalchemy.sql import func
@@ -38,12 +44,41 @@ class Subscriber(Base, PrimaryKeyUuidMixin):
     custom_fields = Column(JSON, default=dict)
     status = Column(String, default="active")  # active, unsubscribed, bounced
     source = Column(String)  # shopify, woocommerce, manual, api
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    created_at = Column(
+        DateTime(timezone=True), server_default=func.now(), nullable=False
+    )
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     user_id: Mapped[UUID] = mapped_column(ForeignKey("users.id"))
 
     user = relationship("User", back_populates="subscribers")
 
+    __table_args__ = (
+        # Listing order and keyset pagination of a user's subscribers
+        Index("ix_subscribers_user_id_created_at", "user_id", "created_at", "id"),
+        # One subscriber per email and user, imports and creates conflict here
+        UniqueConstraint("user_id", "email", name="uq_subscribers_user_id_email"),
+        # Email search: substrings through trigrams, prefixes through a btree
+        Index(
+            "ix_subscribers_email_trgm",
+            func.lower(email).label("email_lower"),
+            postgresql_using="gin",
+            postgresql_ops={"email_lower": "gin_trgm_ops"},
+        ),
+        Index(
+            "ix_subscribers_user_id_email_prefix",
+            "user_id",
+            func.lower(email).label("email_lower"),
+            postgresql_ops={"email_lower": "text_pattern_ops"},
+        ),
+    )
+
+
+event.listen(
+    Subscriber.__table__,
+    "before_create",
+    DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm"),
+)
+
 
 class Webhook(Base, PrimaryKeyUuidMixin):
     __tablename__ = "webhooks"
@@ -57,6 +92,27 @@ class Webhook(Base, PrimaryKeyUuidMixin):
 
     user = relationship("User", back_populates="webhooks")
     deliveries = relationship("WebhookDelivery", back_populates="webhook")
+    subscriptions = relationship(
+        "WebhookSubscription", back_populates="webhook", cascade="all, delete-orphan"
+    )
+
+
+class WebhookSubscription(Base):
+    """One row per (webhook, event type) of an active webhook, used for routing"""
+
+    __tablename__ = "webhook_subscriptions"
+
+    webhook_id: Mapped[UUID] = mapped_column(
+        ForeignKey("webhooks.id", ondelete="CASCADE"), primary_key=True
+    )
+    event_type = Column(String, primary_key=True)
+    user_id: Mapped[UUID] = mapped_column(ForeignKey("users.id"))
+
+    webhook = relationship("Webhook", back_populates="subscriptions")
+
+    __table_args__ = (
+        Index("ix_webhook_subscriptions_user_event", "user_id", "event_type"),
+    )
 
 
 class WebhookDelivery(Base, PrimaryKeyUuidMixin):
@@ -64,24 +120,62 @@ class WebhookDelivery(Base, PrimaryKeyUuidMixin):
 
     webhook_id: Mapped[UUID] = mapped_column(ForeignKey("webhooks.id"))
     event_id: Mapped[UUID]
-    payload = Column(JSON, nullable=False)
-    status = Column(String, default="pending")  # pending, delivered, failed
+    # Built from the event row, only stored for events without one
+    payload: Mapped[Optional[Dict[str, Any]]] = mapped_column(JSON)
+    status = Column(String, default="pending")  # pending, delivered, failed, deferred
     attempts = Column(Integer, default=0)
     last_attempt = Column(DateTime(timezone=True))
     next_attempt = Column(DateTime(timezone=True))
     response_status = Column(Integer)
     response_body = Column(Text)
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    response_time_ms = Column(Integer)
+    # Partition key, the created_at of the event, see app/db/partitions.py
+    created_at = Column(
+        DateTime(timezone=True), primary_key=True, server_default=func.now()
+    )
 
     webhook = relationship("Webhook", back_populates="deliveries")
 
+    __table_args__ = (
+        # Due deliveries are polled by the retry scheduler, delivered and
+        # exhausted ones have no next_attempt and stay out of the index.
+        Index(
+            "ix_webhook_deliveries_next_attempt",
+            "next_attempt",
+            postgresql_where=text("next_attempt IS NOT NULL"),
+        ),
+        # One delivery per webhook and event, redelivered tasks conflict here.
+        # Unique indexes of partitioned tables must contain the partition key.
+        Index(
+            "uq_webhook_deliveries_webhook_event",
+            "webhook_id",
+            "event_id",
+            "created_at",
+            unique=True,
+        ),
+    )
+
 
 class WebhookEvent(Base, PrimaryKeyUuidMixin):
     __tablename__ = "webhook_events"
 
-    event_id = Column(String, unique=True, index=True, nullable=False)
+    event_id = Column(String, nullable=False)
     event_type = Column(String, nullable=False)
     user_id: Mapped[UUID] = mapped_column(ForeignKey("users.id"))
     data = Column(JSON, nullable=False)
     processed = Column(Boolean, default=False)
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    # Set once the event is enqueued, unpublished rows form the outbox
+    published_at = Column(DateTime(timezone=True))
+    # Partition key, see app/db/partitions.py
+    created_at = Column(
+        DateTime(timezone=True), primary_key=True, server_default=func.now()
+    )
+
+    __table_args__ = (
+        Index("ix_webhook_events_event_id", "event_id", "created_at", unique=True),
+        Index(
+            "ix_webhook_events_unpublished",
+            "created_at",
+            postgresql_where=text("published_at IS NULL"),
+        ),
+    )
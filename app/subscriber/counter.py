@@ -0,0 +1,195 @@
+import hashlib
+import time
+import uuid
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import structlog
+from redis.exceptions import RedisError
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.core import config
+from app.db.cache import get_redis, get_sync_redis
+from app.db.session import AsyncSessionLocal
+from app.models import Subscriber
+
+logger = structlog.get_logger()
+
+# Only adjust counters that are cached, a missing key is recounted on read.
+INCR_IF_EXISTS = """
+if redis.call('EXISTS', KEYS[1]) == 1 then
+    return redis.call('INCRBY', KEYS[1], ARGV[1])
+end
+return nil
+"""
+
+
+class SubscriberCounter:
+    """Per-user subscriber counts kept in Redis.
+
+    Counts are adjusted incrementally when subscribers are created or deleted
+    and expire after SUBSCRIBER_COUNT_TTL seconds, at which point the next
+    read reconciles them with a COUNT(*) against the database.
+    """
+
+    def __init__(self, ttl: int = config.SUBSCRIBER_COUNT_TTL):
+        self.ttl = ttl
+
+    def _key(self, user_id: uuid.UUID) -> str:
+        return f"subscriber_count:{user_id}"
+
+    async def get_many(
+        self, db: AsyncSession, user_ids: Iterable[uuid.UUID]
+    ) -> Dict[uuid.UUID, int]:
+        user_ids = list(user_ids)
+        cache = get_redis()
+        try:
+            cached = await cache.mget([self._key(user_id) for user_id in user_ids])
+        except RedisError as e:
+            logger.warning("Subscriber count cache unavailable", error=str(e))
+            cached = [None] * len(user_ids)
+
+        counts = {
+            user_id: int(value)
+            for user_id, value in zip(user_ids, cached)
+            if value is not None
+        }
+        missing = [user_id for user_id in user_ids if user_id not in counts]
+        if missing:
+            result = await db.execute(self._count_query(missing))
+            recounted = self._with_zeros(missing, result.all())
+            try:
+                async with cache.pipeline(transaction=False) as pipe:
+                    for user_id, count in recounted.items():
+                        pipe.set(self._key(user_id), count, ex=self.ttl, nx=True)
+                    await pipe.execute()
+            except RedisError as e:
+                logger.warning("Failed to cache subscriber counts", error=str(e))
+            counts.update(recounted)
+        return counts
+
+    def get_many_sync(
+        self, db: Session, user_ids: Iterable[uuid.UUID]
+    ) -> Dict[uuid.UUID, int]:
+        user_ids = list(user_ids)
+        cache = get_sync_redis()
+        try:
+            cached = cache.mget([self._key(user_id) for user_id in user_ids])
+        except RedisError as e:
+            logger.warning("Subscriber count cache unavailable", error=str(e))
+            cached = [None] * len(user_ids)
+
+        counts = {
+            user_id: int(value)
+            for user_id, value in zip(user_ids, cached)
+            if value is not None
+        }
+        missing = [user_id for user_id in user_ids if user_id not in counts]
+        if missing:
+            recounted = self._with_zeros(
+                missing, db.execute(self._count_query(missing)).all()
+            )
+            try:
+                with cache.pipeline(transaction=False) as pipe:
+                    for user_id, count in recounted.items():
+                        pipe.set(self._key(user_id), count, ex=self.ttl, nx=True)
+                    pipe.execute()
+            except RedisError as e:
+                logger.warning("Failed to cache subscriber counts", error=str(e))
+            counts.update(recounted)
+        return counts
+
+    async def incr(self, user_id: uuid.UUID, amount: int = 1):
+        """Adjust a cached count, use a negative amount on delete"""
+        cache = get_redis()
+        try:
+            await cache.eval(INCR_IF_EXISTS, 1, self._key(user_id), amount)
+        except RedisError as e:
+            # The count is reconciled when the key expires
+            logger.warning(
+                "Failed to update subscriber count", user_id=user_id, error=str(e)
+            )
+
+    def _count_query(self, user_ids: List[uuid.UUID]):
+        return (
+            select(Subscriber.user_id, func.count())
+            .where(Subscriber.user_id.in_(user_ids))
+            .group_by(Subscriber.user_id)
+        )
+
+    def _with_zeros(self, user_ids: List[uuid.UUID], rows) -> Dict[uuid.UUID, int]:
+        counts = {user_id: 0 for user_id in user_ids}
+        counts.update({user_id: count for user_id, count in rows})
+        return counts
+
+
+class SubscriberTotals:
+    """Totals of filtered subscriber listings kept in Redis.
+
+    A cached total is served as is; once older than SUBSCRIBER_TOTAL_REFRESH
+    seconds the first request to read it also schedules a recount in the
+    background, so only the first listing of a filter waits for its COUNT(*).
+    """
+
+    def __init__(
+        self,
+        refresh: int = config.SUBSCRIBER_TOTAL_REFRESH,
+        ttl: int = config.SUBSCRIBER_TOTAL_TTL,
+    ):
+        self.refresh = refresh
+        self.ttl = ttl
+
+    def key(
+        self,
+        user_id: uuid.UUID,
+        search: Optional[str],
+        status: Optional[str],
+        search_prefix: bool = False,
+    ) -> str:
+        terms = f"{search or ''}\0{status or ''}"
+        if search_prefix:
+            terms += "\0prefix"
+        digest = hashlib.sha1(terms.encode()).hexdigest()
+        return f"subscriber_total:{user_id}:{digest[:16]}"
+
+    async def get(self, db: AsyncSession, key: str, count_query) -> Tuple[int, bool]:
+        """The total and whether the caller should recount it with recount()"""
+        cache = get_redis()
+        try:
+            cached = await cache.get(key)
+        except RedisError as e:
+            logger.warning("Subscriber total cache unavailable", error=str(e))
+            return (await db.execute(count_query)).scalar_one(), False
+
+        if cached is None:
+            total = (await db.execute(count_query)).scalar_one()
+            await self._store(key, total)
+            return total, False
+
+        total, counted_at = (int(value) for value in cached.split(b":"))
+        if time.time() - counted_at < self.refresh:
+            return total, False
+        try:
+            # One recount per key at a time
+            claimed = await cache.set(f"{key}:recount", 1, ex=self.refresh, nx=True)
+        except RedisError as e:
+            logger.warning("Failed to claim subscriber total recount", error=str(e))
+            claimed = False
+        return total, bool(claimed)
+
+    async def recount(self, key: str, count_query):
+        """Run outside of the request, with a session of its own"""
+        async with AsyncSessionLocal() as db:
+            total = (await db.execute(count_query)).scalar_one()
+        await self._store(key, total)
+
+    async def _store(self, key: str, total: int):
+        try:
+            await get_redis().set(key, f"{total}:{int(time.time())}", ex=self.ttl)
+        except RedisError as e:
+            logger.warning("Failed to cache subscriber total", error=str(e))
+
+
+subscriber_counter = SubscriberCounter()
+subscriber_totals = SubscriberTotals()
@@ -0,0 +1,382 @@
+# app/subscriber/importer.py
+"""Bulk subscriber import.
+
+The request body is read as it streams in, either NDJSON (one subscriber
+object per line) or CSV (a header record, then one subscriber per record, a
+quoted field may span lines). Records are validated with SubscriberCreate in
+batches, in worker processes since email validation is CPU bound, and the
+valid rows are COPYed into a temporary staging table, so memory holds a few
+batches whatever the size of the file. One statement then moves the new rows into `subscribers`, skipping
+emails the user already has, and stages a subscriber.created event per
+inserted row for the outbox relay.
+"""
+
+import asyncio
+import csv
+import io
+import multiprocessing
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, AsyncIterator, Deque, Dict, List, Optional, Sequence, Tuple
+from uuid import UUID
+
+import orjson
+import structlog
+from fastapi import HTTPException, status
+from pydantic import ValidationError
+from sqlalchemy import (
+    JSON,
+    Column,
+    MetaData,
+    String,
+    Table,
+    func,
+    insert,
+    literal,
+    select,
+)
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core import config
+from app.models import Subscriber, WebhookEvent
+from app.subscriber.counter import subscriber_counter
+from app.subscriber.schema import (
+    SubscriberCreate,
+    SubscriberImportError,
+    SubscriberImportResponse,
+)
+
+logger = structlog.get_logger()
+
+NDJSON = "application/x-ndjson"
+CSV = "text/csv"
+FORMATS = (NDJSON, CSV)
+
+# Longer lines are rejected instead of buffered
+MAX_LINE_BYTES = 64 * 1024
+CSV_FIELDS = ("email", "first_name", "last_name", "status")
+# Columns of exported files that are set by the import itself
+CSV_IGNORED = ("id", "user_id", "source", "created_at", "updated_at")
+CSV_TAG_SEPARATOR = ";"
+
+staging = Table(
+    "subscriber_import",
+    MetaData(),
+    Column("email", String),
+    Column("first_name", String),
+    Column("last_name", String),
+    Column("tags", JSON),
+    Column("custom_fields", JSON),
+    Column("status", String),
+    prefixes=["TEMPORARY"],
+    postgresql_on_commit="DROP",
+)
+STAGING_COLUMNS = [column.name for column in staging.columns]
+
+Record = Tuple[str, Optional[str], Optional[str], str, str, str]
+LineError = Tuple[int, str]
+
+
+async def iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    buffer = b""
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            yield line
+        if len(buffer) > MAX_LINE_BYTES:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Lines must not be longer than {MAX_LINE_BYTES} bytes",
+            )
+    if buffer:
+        yield buffer
+
+
+async def iter_records(
+    content_type: str, chunks: AsyncIterator[bytes]
+) -> AsyncIterator[Tuple[int, bytes]]:
+    """The records of the body with the number of their first line. A CSV
+    record goes on while a quoted field is open, its fields may hold newlines."""
+    parts: List[bytes] = []
+    first_line = number = quotes = size = 0
+    async for line in iter_lines(chunks):
+        number += 1
+        if not parts:
+            first_line = number
+        parts.append(line)
+        if content_type == CSV:
+            quotes += line.count(b'"')
+            size += len(line) + 1
+            if quotes % 2:
+                if size > MAX_LINE_BYTES:
+                    raise HTTPException(
+                        status_code=status.HTTP_400_BAD_REQUEST,
+                        detail=(
+                            f"Records must not be longer than {MAX_LINE_BYTES} bytes"
+                        ),
+                    )
+                continue
+        yield first_line, b"\n".join(parts)
+        parts = []
+        quotes = size = 0
+    if parts:
+        yield first_line, b"\n".join(parts)
+
+
+def parse_csv_line(line: bytes) -> List[str]:
+    return next(csv.reader(io.StringIO(line.decode(), newline="")), [])
+
+
+def csv_row(header: Sequence[str], values: Sequence[str]) -> Dict[str, Any]:
+    """A subscriber from a CSV record, other columns become custom fields"""
+    row: Dict[str, Any] = {"custom_fields": {}}
+    for name, value in zip(header, values):
+        if name in CSV_FIELDS:
+            if value:
+                row[name] = value
+        elif name == "tags":
+            row["tags"] = [
+                tag.strip() for tag in value.split(CSV_TAG_SEPARATOR) if tag.strip()
+            ]
+        elif name == "custom_fields":
+            # A JSON object, as exported
+            if value:
+                fields = orjson.loads(value)
+                if not isinstance(fields, dict):
+                    raise ValueError("custom_fields must be a JSON object")
+                row["custom_fields"].update(fields)
+        elif name in CSV_IGNORED:
+            continue
+        elif value:
+            row["custom_fields"][name] = value
+    return row
+
+
+def validate_lines(
+    content_type: str,
+    header: Optional[List[str]],
+    user_id: UUID,
+    lines: List[Tuple[int, bytes]],
+) -> Tuple[List[Record], List[LineError]]:
+    """The valid (line number, record) lines of a batch as staging records,
+    and the errors of the others. Runs in the import processes."""
+    records: List[Record] = []
+    errors: List[LineError] = []
+    for number, line in lines:
+        if not line.strip():
+            continue
+        try:
+            if content_type == CSV:
+                row = csv_row(header or [], parse_csv_line(line))
+            else:
+                row = orjson.loads(line)
+            if not isinstance(row, dict):
+                raise ValueError("Expected a JSON object")
+            # Rows always belong to the importing user
+            subscriber = SubscriberCreate(**{**row, "user_id": user_id})
+        except ValidationError as e:
+            errors.append(
+                (
+                    number,
+                    "; ".join(
+                        f"{'.'.join(map(str, error['loc']))}: {error['msg']}"
+                        for error in e.errors()
+                    ),
+                )
+            )
+            continue
+        except (ValueError, csv.Error) as e:
+            errors.append((number, str(e)))
+            continue
+        records.append(
+            (
+                subscriber.email,
+                subscriber.first_name,
+                subscriber.last_name,
+                orjson.dumps(subscriber.tags).decode(),
+                orjson.dumps(subscriber.custom_fields).decode(),
+                subscriber.status.value,
+            )
+        )
+    return records, errors
+
+
+class SubscriberImport:
+    def __init__(self, db: AsyncSession, user_id: UUID, content_type: str):
+        self.db = db
+        self.user_id = user_id
+        self.content_type = content_type
+        self.header: Optional[List[str]] = None
+        self.received = 0
+        self.invalid = 0
+        self.errors: List[SubscriberImportError] = []
+
+    async def run(self, chunks: AsyncIterator[bytes]) -> SubscriberImportResponse:
+        conn = await self.db.connection()
+        await conn.run_sync(staging.create)
+        raw = await conn.get_raw_connection()
+        await raw.driver_connection.copy_records_to_table(  # type: ignore
+            staging.name, records=self._records(chunks), columns=STAGING_COLUMNS
+        )
+        result = await self.db.execute(self._merge())
+        imported = result.rowcount
+        await self.db.commit()
+        if imported:
+            await subscriber_counter.incr(self.user_id, imported)
+
+        logger.info(
+            "Subscribers imported",
+            user_id=self.user_id,
+            received=self.received,
+            imported=imported,
+            invalid=self.invalid,
+        )
+        return SubscriberImportResponse(
+            received=self.received,
+            imported=imported,
+            duplicates=self.received - self.invalid - imported,
+            invalid=self.invalid,
+            errors=self.errors,
+        )
+
+    async def _batches(
+        self, chunks: AsyncIterator[bytes]
+    ) -> AsyncIterator[List[Tuple[int, bytes]]]:
+        lines: List[Tuple[int, bytes]] = []
+        async for number, line in iter_records(self.content_type, chunks):
+            if self.content_type == CSV and self.header is None:
+                if line.strip():
+                    self.header = self._parse_header(line)
+                continue
+            lines.append((number, line))
+            if len(lines) >= config.SUBSCRIBER_IMPORT_BATCH_SIZE:
+                yield lines
+                lines = []
+        if lines:
+            yield lines
+
+    def _parse_header(self, line: bytes) -> List[str]:
+        try:
+            return [
+                name.strip()
+                for name in parse_csv_line(line.removeprefix(b"\xef\xbb\xbf"))
+            ]
+        except (ValueError, csv.Error):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid CSV header"
+            )
+
+    async def _records(self, chunks: AsyncIterator[bytes]) -> AsyncIterator[Record]:
+        # Without processes batches are validated in a thread, off the event loop
+        pool = get_import_pool()
+        loop = asyncio.get_running_loop()
+        pending: Deque[asyncio.Future] = deque()
+        try:
+            async for lines in self._batches(chunks):
+                pending.append(
+                    loop.run_in_executor(
+                        pool,
+                        validate_lines,
+                        self.content_type,
+                        self.header,
+                        self.user_id,
+                        lines,
+                    )
+                )
+                # Parse ahead while the processes validate, a few batches at most
+                if len(pending) > max(config.SUBSCRIBER_IMPORT_PROCESSES, 1):
+                    for record in self._collect(await pending.popleft()):
+                        yield record
+            while pending:
+                for record in self._collect(await pending.popleft()):
+                    yield record
+        finally:
+            for future in pending:
+                future.cancel()
+
+    def _collect(self, result: Tuple[List[Record], List[LineError]]) -> List[Record]:
+        records, errors = result
+        self.received += len(records) + len(errors)
+        self.invalid += len(errors)
+        room = max(config.SUBSCRIBER_IMPORT_MAX_ERRORS - len(self.errors), 0)
+        self.errors.extend(
+            SubscriberImportError(line=line, error=error)
+            for line, error in errors[:room]
+        )
+        return records
+
+    def _merge(self):
+        """Insert the staged subscribers the user does not have yet, and a
+        subscriber.created event for each of them"""
+        inserted = (
+            pg_insert(Subscriber)
+            .from_select(
+                [*STAGING_COLUMNS, "source", "user_id"],
+                select(*staging.columns, literal("import"), literal(self.user_id)),
+            )
+            .on_conflict_do_nothing(index_elements=["user_id", "email"])
+            .returning(
+                Subscriber.id,
+                Subscriber.email,
+                Subscriber.first_name,
+                Subscriber.last_name,
+                Subscriber.status,
+                Subscriber.created_at,
+            )
+            .cte("inserted")
+        )
+        subscriber = func.json_build_object(
+            *(arg for column in inserted.columns for arg in (column.name, column))
+        )
+        return insert(WebhookEvent).from_select(
+            ["event_id", "event_type", "user_id", "data", "processed", "created_at"],
+            select(
+                func.gen_random_uuid().cast(String),
+                literal("subscriber.created"),
+                literal(self.user_id),
+                func.json_build_object("subscriber", subscriber),
+                literal(False),
+                func.now(),
+            ).select_from(inserted),
+        )
+
+
+async def import_subscribers(
+    db: AsyncSession,
+    user_id: UUID,
+    content_type: str,
+    chunks: AsyncIterator[bytes],
+) -> SubscriberImportResponse:
+    """Import the subscribers of a streamed NDJSON or CSV body"""
+    return await SubscriberImport(db, user_id, content_type).run(chunks)
+
+
+_pool: Optional[ProcessPoolExecutor] = None
+_owner_pid: Optional[int] = None
+
+
+def get_import_pool() -> Optional[ProcessPoolExecutor]:
+    """The validation processes of this API process, None without any"""
+    global _pool, _owner_pid
+    if config.SUBSCRIBER_IMPORT_PROCESSES <= 0:
+        return None
+    if _owner_pid != os.getpid() or _pool is None:
+        # Spawned, forking a process with a running event loop and open
+        # connections is not safe
+        _pool = ProcessPoolExecutor(
+            config.SUBSCRIBER_IMPORT_PROCESSES,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+        _owner_pid = os.getpid()
+    return _pool
+
+
+def shutdown_import_pool():
+    global _pool, _owner_pid
+    if _owner_pid != os.getpid() or _pool is None:
+        return
+    _pool.shutdown(cancel_futures=True)
+    _pool, _owner_pid = None, None
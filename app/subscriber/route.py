@@ -1,14 +1,20 @@
-from fastapi import APIRouter, Query
+from fastapi import APIRouter, BackgroundTasks, HTTPException, Query, Request, status
+from fastapi.responses import StreamingResponse
 from typing import Optional
 
 from app.auth.deps import CurrentUser
 from app.db.session import DbSession
+from app.subscriber.exporter import MEDIA_TYPES, accepts_gzip, export_subscribers
+from app.subscriber.importer import FORMATS, import_subscribers
 from app.subscriber.service import create_new_subscriber, get_subscribers
 from app.subscriber.schema import (
+    ExportFormat,
     PaginatedResponse,
     SubscriberCreate,
+    SubscriberImportResponse,
     SubscriberResponse,
     SubscriberStatus,
+    TotalMode,
 )
 
 
@@ -19,12 +25,22 @@ router = APIRouter()
 async def list_subscribers(
     db: DbSession,
     current_user: CurrentUser,
+    background_tasks: BackgroundTasks,
     page: int = Query(1, ge=1),
     per_page: int = Query(50, ge=1, le=100),
     search: Optional[str] = None,
     status: Optional[SubscriberStatus] = None,
+    cursor: Optional[str] = None,
+    total: TotalMode = TotalMode.EXACT,
+    search_prefix: bool = False,
 ):
-    """List subscribers with pagination and filtering"""
+    """List subscribers with pagination and filtering.
+
+    Pass the next_cursor of a page as cursor to get the next one, which stays
+    fast on deep pages; page is then ignored. total=cached serves the total
+    from a cache refreshed in the background, total=none skips it. search
+    matches anywhere in the email, or only its start with search_prefix.
+    """
     return await get_subscribers(
         db=db,
         user_id=current_user.id,
@@ -32,6 +48,37 @@ async def list_subscribers(
         per_page=per_page,
         search=search,
         status=status,
+        cursor=cursor,
+        total=total,
+        background_tasks=background_tasks,
+        search_prefix=search_prefix,
+    )
+
+
+@router.get("/subscribers/export")
+async def export_subscriber_list(
+    request: Request,
+    current_user: CurrentUser,
+    export_format: ExportFormat = Query(ExportFormat.NDJSON, alias="format"),
+    status: Optional[SubscriberStatus] = None,
+):
+    """Export all subscribers as NDJSON or CSV, streamed as they are read.
+
+    The response is gzip compressed for clients sending Accept-Encoding: gzip.
+    """
+    gzip = accepts_gzip(request.headers.get("accept-encoding", ""))
+    headers = {
+        "Content-Disposition": (
+            f'attachment; filename="subscribers.{export_format.value}"'
+        ),
+        "Vary": "Accept-Encoding",
+    }
+    if gzip:
+        headers["Content-Encoding"] = "gzip"
+    return StreamingResponse(
+        export_subscribers(current_user.id, export_format, gzip, status),
+        media_type=MEDIA_TYPES[export_format],
+        headers=headers,
     )
 
 
@@ -42,3 +89,24 @@ async def create_subscriber(
 ):
     """Create a new subscriber"""
     return await create_new_subscriber(db, subscriber)
+
+
+@router.post("/subscribers/import", response_model=SubscriberImportResponse)
+async def import_subscriber_list(
+    request: Request,
+    db: DbSession,
+    current_user: CurrentUser,
+):
+    """Import subscribers from an NDJSON (application/x-ndjson) or CSV
+    (text/csv) body, which is read as it is uploaded.
+
+    Emails the user already has are skipped, invalid lines are counted and
+    the first ones reported back.
+    """
+    content_type = request.headers.get("content-type", "").split(";")[0].strip()
+    if content_type not in FORMATS:
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail=f"Send one of {', '.join(FORMATS)}",
+        )
+    return await import_subscribers(db, current_user.id, content_type, request.stream())
@@ -11,6 +11,17 @@ class SubscriberStatus(str, Enum):
     BOUNCED = "bounced"
 
 
+class TotalMode(str, Enum):
+    EXACT = "exact"  # COUNT(*) on every call
+    CACHED = "cached"  # cached in Redis, may lag behind recent changes
+    NONE = "none"
+
+
+class ExportFormat(str, Enum):
+    NDJSON = "ndjson"
+    CSV = "csv"
+
+
 class SubscriberBase(BaseModel):
     email: EmailStr
     first_name: Optional[str] = None
@@ -45,8 +56,22 @@ class SubscriberResponse(SubscriberBase):
 
 class PaginatedResponse(BaseModel):
     items: List[Any] | Sequence[Any]
-    total: int
-    page: int
+    total: Optional[int] = None
+    page: Optional[int] = None  # None when paging by cursor
     per_page: int
     has_next: bool
     has_prev: bool
+    next_cursor: Optional[str] = None
+
+
+class SubscriberImportError(BaseModel):
+    line: int
+    error: str
+
+
+class SubscriberImportResponse(BaseModel):
+    received: int
+    imported: int
+    duplicates: int  # already subscribed, or repeated in the import
+    invalid: int
+    errors: List[SubscriberImportError]  # the first invalid lines
@@ -1,17 +1,23 @@
+import base64
 from datetime import datetime
 from uuid import UUID
-from fastapi import HTTPException, status
+import orjson
+from fastapi import BackgroundTasks, HTTPException, status
+from sqlalchemy import tuple_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession as DbSession
 from sqlalchemy.future import select
 from sqlalchemy.sql import func
-from typing import Optional
+from typing import Optional, Tuple
 
 from app.models import Subscriber
+from app.subscriber.counter import subscriber_counter, subscriber_totals
 from app.subscriber.schema import (
     SubscriberCreate,
     SubscriberStatus,
     SubscriberResponse,
     PaginatedResponse,
+    TotalMode,
 )
 from app.webhook.webhook_notifier import WebhookNotifier
 
@@ -19,6 +25,40 @@ from app.webhook.webhook_notifier import WebhookNotifier
 webhook_notifier = WebhookNotifier()
 
 
+def encode_cursor(subscriber: Subscriber) -> str:
+    """Opaque position after a subscriber in (created_at, id) order"""
+    raw = orjson.dumps([subscriber.created_at.isoformat(), str(subscriber.id)])
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, UUID]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, subscriber_id = orjson.loads(raw)
+        return datetime.fromisoformat(created_at), UUID(subscriber_id)
+    except (ValueError, TypeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor"
+        )
+
+
+def search_filter(search: str, prefix: bool = False):
+    """Case-insensitive email match that the search indexes can serve.
+
+    Terms match anywhere in the email, through the trigram index once they
+    are 3 characters or more; shorter ones have no trigram to look up and
+    are matched over the user's rows. With prefix they only match the start
+    of the email, which the (user_id, lower(email)) prefix index serves for
+    terms of any length, such as the first keystrokes of a search box.
+    """
+    term = search.strip().lower()
+    escaped = term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    email = func.lower(Subscriber.email)
+    if prefix:
+        return email.like(f"{escaped}%", escape="\\")
+    return email.like(f"%{escaped}%", escape="\\")
+
+
 async def get_subscribers(
     db: DbSession,
     user_id: UUID,
@@ -26,30 +66,49 @@ async def get_subscribers(
     per_page: int,
     search: Optional[str] = None,
     status: Optional[SubscriberStatus] = None,
+    cursor: Optional[str] = None,
+    total: TotalMode = TotalMode.EXACT,
+    background_tasks: Optional[BackgroundTasks] = None,
+    search_prefix: bool = False,
 ) -> PaginatedResponse:
     """
     Fetch subscribers with pagination and filtering.
+
+    Pages are numbered, or follow a cursor from the next_cursor of the
+    previous page. A cursor is a position in (created_at, id) order served by
+    the (user_id, created_at, id) index, so every page costs the same however
+    deep it is, while a page number skips the rows before it.
     """
     # Base query
     query = select(Subscriber).where(Subscriber.user_id == user_id)
 
     # Apply search filter if provided
     if search:
-        query = query.where(Subscriber.email.ilike(f"%{search}%"))
+        query = query.where(search_filter(search, search_prefix))
 
     # Apply status filter if provided
     if status:
         query = query.where(Subscriber.status == status)
 
     # Count total subscribers
-    count_query = select(func.count()).select_from(query.subquery())
-    total_result = await db.execute(count_query)
-    total = total_result.scalar_one()
+    count = await count_subscribers(
+        db, query, user_id, search, status, total, background_tasks, search_prefix
+    )
 
-    # Fetch paginated subscribers
-    query = query.offset((page - 1) * per_page).limit(per_page)
+    if cursor:
+        created_at, subscriber_id = decode_cursor(cursor)
+        query = query.where(
+            tuple_(Subscriber.created_at, Subscriber.id) > (created_at, subscriber_id)
+        )
+    else:
+        query = query.offset((page - 1) * per_page)
+
+    # Fetch paginated subscribers, one more tells whether there is a next page
+    query = query.order_by(Subscriber.created_at, Subscriber.id).limit(per_page + 1)
     result = await db.execute(query)
     subscribers = result.scalars().all()
+    has_next = len(subscribers) > per_page
+    subscribers = subscribers[:per_page]
 
     # Convert SQLAlchemy models to Pydantic models
     subscribers_response = [
@@ -58,41 +117,69 @@ async def get_subscribers(
 
     return PaginatedResponse(
         items=subscribers_response,
-        total=total,
-        page=page,
+        total=count,
+        page=None if cursor else page,
         per_page=per_page,
-        has_next=page * per_page < total,
-        has_prev=page > 1,
+        has_next=has_next,
+        has_prev=bool(cursor) or page > 1,
+        next_cursor=encode_cursor(subscribers[-1]) if has_next else None,
     )
 
 
+async def count_subscribers(
+    db: DbSession,
+    query,
+    user_id: UUID,
+    search: Optional[str],
+    status: Optional[SubscriberStatus],
+    total: TotalMode,
+    background_tasks: Optional[BackgroundTasks],
+    search_prefix: bool = False,
+) -> Optional[int]:
+    if total == TotalMode.NONE:
+        return None
+    if total == TotalMode.CACHED and not search and not status:
+        # Kept up to date on create, no recount needed
+        counts = await subscriber_counter.get_many(db, [user_id])
+        return counts[user_id]
+
+    count_query = select(func.count()).select_from(query.subquery())
+    if total == TotalMode.EXACT or background_tasks is None:
+        return (await db.execute(count_query)).scalar_one()
+
+    key = subscriber_totals.key(user_id, search, status, search_prefix)
+    count, stale = await subscriber_totals.get(db, key, count_query)
+    if stale:
+        background_tasks.add_task(subscriber_totals.recount, key, count_query)
+    return count
+
+
 async def create_new_subscriber(
     db: DbSession, subscriber: SubscriberCreate
-) -> Subscriber:
+) -> SubscriberResponse:
     """
     Create a new subscriber.
+
+    One INSERT returns the row with its server defaults, the unique
+    (user_id, email) constraint turns a duplicate into no row at all.
     """
-    # Check if subscriber already exists
-    existing_query = select(Subscriber).where(
-        Subscriber.email == subscriber.email, Subscriber.user_id == subscriber.user_id
+    result = await db.execute(
+        pg_insert(Subscriber)
+        .values(**subscriber.model_dump(), source="manual")
+        .on_conflict_do_nothing(index_elements=["user_id", "email"])
+        .returning(Subscriber)
     )
-    existing_result = await db.execute(existing_query)
-    existing = existing_result.scalar_one_or_none()
+    db_subscriber = result.scalar_one_or_none()
 
-    if existing:
+    if db_subscriber is None:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Subscriber with this email already exists",
         )
 
-    # Create new subscriber
-    db_subscriber = Subscriber(**subscriber.model_dump(), source="manual")
-    db.add(db_subscriber)
-    await db.commit()
-    await db.refresh(db_subscriber)
-
-    # Trigger webhook event
-    webhook_notifier.publish_event(
+    # Trigger webhook event, written to the outbox in the same transaction
+    webhook_notifier.stage_event(
+        db,
         "subscriber.created",
         db_subscriber.user_id,
         {
@@ -108,5 +195,9 @@ async def create_new_subscriber(
             }
         },
     )
+    # Committing expires the ORM object, so build the response first
+    subscriber_response = SubscriberResponse.model_validate(db_subscriber)
+    await db.commit()
+    await subscriber_counter.incr(subscriber_response.user_id)
 
-    return db_subscriber
+    return subscriber_response
@@ -0,0 +1,71 @@
+"""Broker and database bytes per event with inline payloads and claim checks.
+
+Builds the Celery messages of --events events carrying --payload-bytes of
+data each, the way publish_events enqueues them:
+  - inline: the data is part of every message and of the webhook_events row
+  - claim check: the data is written to a local blob store once and only
+    the reference is enqueued and stored
+
+and reports the bytes pushed through Redis, the bytes of the JSON stored in
+webhook_events.data and the publishing time per event. Nothing is sent, so
+it runs anywhere.
+
+Usage:
+    python -m app.tests.benchmarks.bench_claim_check --events 1000 --payload-bytes 1000000
+"""
+
+import argparse
+import json
+import logging
+import tempfile
+import time
+import uuid
+from unittest.mock import patch
+
+import structlog
+
+from app.db.base_model import now
+from app.webhook.blobstore import LocalBlobStore, check_in
+from app.webhook.webhook_notifier import async_broker, process_webhook_event_batch
+
+
+def run(name: str, args, threshold: int, store: LocalBlobStore):
+    data = {"segment": "all", "subscribers": ["x" * 98] * (args.payload_bytes // 100)}
+    broker_bytes = db_bytes = 0
+    started = time.perf_counter()
+    with (
+        patch("app.webhook.blobstore.config.WEBHOOK_BLOB_THRESHOLD_BYTES", threshold),
+        patch("app.webhook.blobstore.get_blob_store", return_value=store),
+    ):
+        for _ in range(args.events):
+            event_id, created_at = str(uuid.uuid4()), now()
+            stored = check_in(event_id, created_at, data)
+            db_bytes += len(json.dumps(stored))
+            _, message = async_broker.build_message(
+                process_webhook_event_batch.name,
+                [[[event_id, "segment.exported", str(uuid.uuid4()), stored]]],
+                "webhooks",
+            )
+            broker_bytes += len(message)
+    elapsed = time.perf_counter() - started
+    print(
+        f"{name:>12}: broker {broker_bytes / 1024 / 1024:10.1f} MB  "
+        f"webhook_events.data {db_bytes / 1024 / 1024:10.1f} MB  "
+        f"{elapsed / args.events * 1000:8.2f} ms/event"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--events", type=int, default=1000)
+    parser.add_argument("--payload-bytes", type=int, default=1_000_000)
+    args = parser.parse_args()
+    structlog.configure(
+        wrapper_class=structlog.make_filtering_bound_logger(logging.WARNING)
+    )
+
+    print(f"{args.events} events of ~{args.payload_bytes} bytes of data")
+    with tempfile.TemporaryDirectory() as root:
+        store = LocalBlobStore(root)
+        run("inline", args, 0, store)
+        run("claim check", args, 64 * 1024, store)
@@ -0,0 +1,98 @@
+"""Load test POST /api/v1/subscribers against a running API server.
+
+Reports requests/sec and latency percentiles at a fixed concurrency. With
+--duplicates a share of the requests re-sends the email of an earlier one,
+which must be rejected with a 400 even while the two race. Run it once per
+build to compare, e.g. before and after a change:
+
+    uvicorn app.main:app --workers 1
+    python -m app.tests.benchmarks.bench_create_subscriber \\
+        --user-id 483c3ea2-5790-4d7f-a0fc-ee6b289cc0de --requests 5000 --concurrency 100
+"""
+
+import argparse
+import asyncio
+import random
+import statistics
+import time
+import uuid
+
+import httpx
+
+
+async def worker(
+    client: httpx.AsyncClient,
+    url: str,
+    user_id: str,
+    queue: asyncio.Queue,
+    latencies: list[float],
+    failures: list[int],
+    duplicates: list[int],
+):
+    while True:
+        try:
+            email = queue.get_nowait()
+        except asyncio.QueueEmpty:
+            return
+        subscriber = {
+            "email": email,
+            "first_name": "Load",
+            "last_name": "Test",
+            "user_id": user_id,
+        }
+        started = time.perf_counter()
+        response = await client.post(url, json=subscriber)
+        latencies.append(time.perf_counter() - started)
+        if response.status_code == 400:
+            duplicates.append(response.status_code)
+        elif response.status_code != 201:
+            failures.append(response.status_code)
+
+
+async def run(
+    url: str, user_id: str, requests: int, concurrency: int, duplicate_share: float
+):
+    queue: asyncio.Queue = asyncio.Queue()
+    emails: list[str] = []
+    for _ in range(requests):
+        if emails and random.random() < duplicate_share:
+            email = random.choice(emails[-concurrency:])
+        else:
+            email = f"{uuid.uuid4().hex[:12]}@example.com"
+            emails.append(email)
+        queue.put_nowait(email)
+    latencies: list[float] = []
+    failures: list[int] = []
+    duplicates: list[int] = []
+
+    limits = httpx.Limits(max_connections=concurrency)
+    async with httpx.AsyncClient(limits=limits, timeout=60.0) as client:
+        started = time.perf_counter()
+        await asyncio.gather(
+            *(
+                worker(client, url, user_id, queue, latencies, failures, duplicates)
+                for _ in range(concurrency)
+            )
+        )
+        elapsed = time.perf_counter() - started
+
+    quantiles = statistics.quantiles(latencies, n=100)
+    print(f"{requests} requests, concurrency {concurrency}")
+    print(f"  throughput: {requests / elapsed:8.1f} requests/sec")
+    print(f"  p50       : {quantiles[49] * 1000:8.1f} ms")
+    print(f"  p99       : {quantiles[98] * 1000:8.1f} ms")
+    print(f"  duplicates: {len(duplicates)} of {requests - len(emails)} expected")
+    print(f"  failures  : {len(failures)}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", default="http://localhost:8000/api/v1/subscribers")
+    parser.add_argument("--user-id", required=True)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--duplicates", type=float, default=0.0)
+    args = parser.parse_args()
+    asyncio.run(
+        run(args.url, args.user_id, args.requests, args.concurrency, args.duplicates)
+    )
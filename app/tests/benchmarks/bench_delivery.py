@@ -0,0 +1,125 @@
+"""Compare the serial delivery path with the concurrent DeliveryEngine.
+
+Starts a local stub HTTP server, then delivers the same events through:
+  - serial: a fresh httpx.Client per webhook, one webhook after another
+    (the behaviour of the original `_send_webhook_request` loop)
+  - engine: DeliveryEngine fan-out over one pooled httpx.AsyncClient
+
+Usage:
+    python -m app.tests.benchmarks.bench_delivery --events 200 --webhooks 5
+"""
+
+import argparse
+import asyncio
+import logging
+import statistics
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+import structlog
+
+from app.models import Webhook
+from app.webhook.delivery import DeliveryEngine
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+    latency = 0.02
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        time.sleep(self.latency)
+        body = b'{"ok":true}'
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_stub_server(latency: float) -> ThreadingHTTPServer:
+    StubHandler.latency = latency
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def build_webhooks(base_url: str, count: int) -> list[Webhook]:
+    return [
+        Webhook(id=uuid.uuid4(), url=f"{base_url}/hook/{i}", events=[])
+        for i in range(count)
+    ]
+
+
+def build_payload(i: int) -> dict:
+    return {
+        "event_id": str(uuid.uuid4()),
+        "event_type": "subscriber.created",
+        "data": {"subscriber": {"id": i, "email": f"user{i}@example.com"}},
+    }
+
+
+def run_serial(webhooks, events: int) -> list[float]:
+    latencies = []
+    for i in range(events):
+        payload = build_payload(i)
+        started = time.perf_counter()
+        for webhook in webhooks:
+            with httpx.Client(timeout=30.0) as client:
+                client.post(webhook.url, json=payload)
+        latencies.append(time.perf_counter() - started)
+    return latencies
+
+
+async def run_engine(webhooks, events: int) -> list[float]:
+    engine = DeliveryEngine()
+    latencies = []
+    try:
+        for i in range(events):
+            payload = build_payload(i)
+            started = time.perf_counter()
+            await engine.deliver(webhooks, payload)
+            latencies.append(time.perf_counter() - started)
+    finally:
+        await engine.aclose()
+    return latencies
+
+
+def report(name: str, latencies: list[float]):
+    total = sum(latencies)
+    quantiles = statistics.quantiles(latencies, n=100)
+    print(
+        f"{name:>8}: {len(latencies) / total:8.1f} events/sec  "
+        f"p50={statistics.median(latencies) * 1000:7.1f}ms  "
+        f"p99={quantiles[98] * 1000:7.1f}ms"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--events", type=int, default=200)
+    parser.add_argument("--webhooks", type=int, default=5)
+    parser.add_argument("--latency", type=float, default=0.02)
+    args = parser.parse_args()
+    structlog.configure(
+        wrapper_class=structlog.make_filtering_bound_logger(logging.WARNING)
+    )
+
+    server = start_stub_server(args.latency)
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    webhooks = build_webhooks(base_url, args.webhooks)
+
+    print(
+        f"{args.events} events x {args.webhooks} webhooks, "
+        f"endpoint latency {args.latency * 1000:.0f}ms"
+    )
+    report("serial", run_serial(webhooks, args.events))
+    report("engine", asyncio.run(run_engine(webhooks, args.events)))
+    server.shutdown()
@@ -0,0 +1,109 @@
+"""Size and insert throughput of webhook_deliveries with and without copied payloads.
+
+Creates two scratch copies of webhook_deliveries (same columns, defaults and
+indexes) and fills each with --deliveries synthetic rows, --webhooks per
+event, in transactions of --batch-events events:
+  - copied: every delivery stores the event payload (--payload-bytes of data)
+  - referenced: payload is NULL and built from webhook_events when retried
+
+Reports rows/sec and the total size of each table including indexes and
+TOAST. The scratch tables are dropped afterwards.
+
+Needs the Postgres configured in the environment (see README), with the
+migrations applied.
+
+Usage:
+    python -m app.tests.benchmarks.bench_delivery_storage --deliveries 10000000
+"""
+
+import argparse
+import time
+
+from sqlalchemy import text
+
+from app.db.session import engine
+
+TABLES = {"copied": "bench_deliveries_copied", "referenced": "bench_deliveries_ref"}
+
+PAYLOAD = """
+json_build_object(
+    'event_id', event_id::text,
+    'event_type', 'subscriber.created',
+    'timestamp', now(),
+    'data', json_build_object('subscriber', json_build_object(
+        'id', event_id::text, 'email', 'user@example.com',
+        'custom_fields', repeat('x', :payload_bytes)
+    ))
+)
+"""
+
+INSERT = """
+INSERT INTO {table} (id, webhook_id, event_id, payload, status, attempts)
+SELECT gen_random_uuid(), webhook_ids[w], event_id, {payload}, 'delivered', 1
+FROM (
+    SELECT gen_random_uuid() AS event_id FROM generate_series(1, :events)
+) events,
+generate_series(1, :webhooks) w,
+(SELECT array_agg(gen_random_uuid()) AS webhook_ids
+ FROM generate_series(1, :webhooks)) webhooks
+"""
+
+
+def fill(table: str, payload: str, args) -> float:
+    """Insert the dataset, returns rows/sec"""
+    events = args.deliveries // args.webhooks
+    statement = text(INSERT.format(table=table, payload=payload))
+    started = time.perf_counter()
+    for offset in range(0, events, args.batch_events):
+        with engine.begin() as conn:
+            conn.execute(
+                statement,
+                {
+                    "events": min(args.batch_events, events - offset),
+                    "webhooks": args.webhooks,
+                    "payload_bytes": args.payload_bytes,
+                },
+            )
+    return events * args.webhooks / (time.perf_counter() - started)
+
+
+def table_size_mb(table: str) -> float:
+    with engine.connect() as conn:
+        size = conn.execute(
+            text("SELECT pg_total_relation_size(CAST(:table AS regclass))"),
+            {"table": table},
+        ).scalar_one()
+    return size / 1024 / 1024
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--deliveries", type=int, default=10_000_000)
+    parser.add_argument("--webhooks", type=int, default=10)
+    parser.add_argument("--payload-bytes", type=int, default=500)
+    parser.add_argument("--batch-events", type=int, default=10000)
+    args = parser.parse_args()
+
+    print(
+        f"{args.deliveries} deliveries, {args.webhooks} webhooks per event, "
+        f"~{args.payload_bytes} byte payloads"
+    )
+    try:
+        with engine.begin() as conn:
+            for table in TABLES.values():
+                conn.execute(text(f"DROP TABLE IF EXISTS {table}"))
+                conn.execute(
+                    text(
+                        f"CREATE TABLE {table} (LIKE webhook_deliveries INCLUDING ALL)"
+                    )
+                )
+        for name, payload in (("copied", PAYLOAD), ("referenced", "NULL")):
+            rate = fill(TABLES[name], payload, args)
+            print(
+                f"{name:>10}: {rate:10.0f} rows/sec  "
+                f"{table_size_mb(TABLES[name]):10.1f} MB"
+            )
+    finally:
+        with engine.begin() as conn:
+            for table in TABLES.values():
+                conn.execute(text(f"DROP TABLE IF EXISTS {table}"))
@@ -0,0 +1,138 @@
+"""Simulate per-tenant delivery delay with a FIFO queue and with fair queueing.
+
+Replays one mixed workload against a fixed worker throughput on a single
+queue:
+  - whale: a burst of --whale-burst events plus a steady 50 events/sec
+  - hot: a small account with a spike of --hot-burst events
+  - small: --small-accounts accounts with 2 events/sec each (Poisson)
+
+and schedules it with:
+  - fifo: one shared queue served in arrival order (a plain Celery queue)
+  - drr: the DeficitRoundRobin used by the fair queue dispatcher
+
+No Redis or Celery is involved, so it runs anywhere.
+
+Usage:
+    python -m app.tests.benchmarks.bench_fair_queue --throughput 500
+"""
+
+import argparse
+import random
+import statistics
+from collections import deque
+from typing import Deque, Dict, List, Tuple
+
+from app.webhook.fairqueue import DeficitRoundRobin
+
+TICK = 0.01  # seconds
+
+# (arrival time, tenant)
+Arrival = Tuple[float, str]
+
+
+def tenant_group(tenant: str) -> str:
+    return tenant.split("-")[0]
+
+
+def build_workload(
+    duration: float, whale_burst: int, hot_burst: int, small_accounts: int
+) -> List[Arrival]:
+    rng = random.Random(42)
+    arrivals: List[Arrival] = []
+    arrivals += [(5.0, "whale")] * whale_burst
+    arrivals += [(10.0, "hot")] * hot_burst
+
+    def poisson(tenant: str, rate: float):
+        t = rng.expovariate(rate)
+        while t < duration:
+            arrivals.append((t, tenant))
+            t += rng.expovariate(rate)
+
+    poisson("whale", 50)
+    for i in range(small_accounts):
+        poisson(f"small-{i}", 2)
+    arrivals.sort()
+    return arrivals
+
+
+def simulate(
+    arrivals: List[Arrival], throughput: float, scheduler: str, quantum: int
+) -> Dict[str, List[float]]:
+    """Delay from arrival to the start of processing, per tenant"""
+    pending: Deque[Arrival] = deque(arrivals)
+    fifo: Deque[Arrival] = deque()
+    queues: Dict[str, Deque[float]] = {}
+    drr = DeficitRoundRobin(quantum=quantum)
+    delays: Dict[str, List[float]] = {}
+    capacity = 0.0
+    now = 0.0
+
+    while pending or fifo or any(queues.values()):
+        now += TICK
+        while pending and pending[0][0] <= now:
+            arrived_at, tenant = pending.popleft()
+            if scheduler == "fifo":
+                fifo.append((arrived_at, tenant))
+            else:
+                queues.setdefault(tenant, deque()).append(arrived_at)
+
+        capacity += throughput * TICK
+        budget = int(capacity)
+        capacity -= budget
+        if scheduler == "fifo":
+            for _ in range(min(budget, len(fifo))):
+                arrived_at, tenant = fifo.popleft()
+                delays.setdefault(tenant, []).append(now - arrived_at)
+        else:
+            backlogs = {tenant: len(queue) for tenant, queue in queues.items()}
+            for tenant, count in drr.schedule(backlogs, budget).items():
+                for _ in range(count):
+                    arrived_at = queues[tenant].popleft()
+                    delays.setdefault(tenant, []).append(now - arrived_at)
+    return delays
+
+
+def percentile(values: List[float], q: int) -> float:
+    if len(values) < 2:
+        return values[0]
+    return statistics.quantiles(values, n=100)[q - 1]
+
+
+def report(name: str, delays: Dict[str, List[float]]):
+    groups: Dict[str, List[float]] = {}
+    for tenant, values in delays.items():
+        groups.setdefault(tenant_group(tenant), []).extend(values)
+    worst_small = max(
+        percentile(values, 99)
+        for tenant, values in delays.items()
+        if tenant_group(tenant) == "small"
+    )
+    print(f"{name}:")
+    for group in ("whale", "hot", "small"):
+        values = groups[group]
+        print(
+            f"  {group:>6}: p50={statistics.median(values) * 1000:9.1f}ms  "
+            f"p99={percentile(values, 99) * 1000:9.1f}ms  ({len(values)} events)"
+        )
+    print(f"  worst small account p99={worst_small * 1000:9.1f}ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--throughput", type=float, default=500)
+    parser.add_argument("--duration", type=float, default=60)
+    parser.add_argument("--whale-burst", type=int, default=20000)
+    parser.add_argument("--hot-burst", type=int, default=3000)
+    parser.add_argument("--small-accounts", type=int, default=50)
+    parser.add_argument("--quantum", type=int, default=10)
+    args = parser.parse_args()
+
+    arrivals = build_workload(
+        args.duration, args.whale_burst, args.hot_burst, args.small_accounts
+    )
+    print(
+        f"{len(arrivals)} events over {args.duration:.0f}s, "
+        f"{args.throughput:.0f} events/sec of worker throughput"
+    )
+    report("fifo", simulate(arrivals, args.throughput, "fifo", args.quantum))
+    report("drr", simulate(arrivals, args.throughput, "drr", args.quantum))
@@ -0,0 +1,104 @@
+"""Bulk subscriber import throughput and memory.
+
+Creates a user and streams a generated NDJSON or CSV body of --rows
+subscribers (--duplicates of them repeated) through import_subscribers in
+64KB chunks, the way the API reads an upload, then reports rows/sec and the
+peak RSS of the importing process and of its validation processes. Needs the
+Postgres and Redis configured in the environment.
+
+Usage:
+    python -m app.tests.benchmarks.bench_import_subscribers --rows 1000000 --format csv
+"""
+
+import argparse
+import asyncio
+import logging
+import resource
+import time
+import uuid
+
+import structlog
+from sqlalchemy import text
+
+from app.db.session import AsyncSessionLocal, SessionLocal
+from app.subscriber.importer import CSV, NDJSON, get_import_pool, import_subscribers
+
+CHUNK_SIZE = 64 * 1024
+
+
+def create_user() -> uuid.UUID:
+    user_id = uuid.uuid4()
+    db = SessionLocal()
+    try:
+        db.execute(
+            text(
+                "INSERT INTO users (id, email, hashed_password, is_active) "
+                "VALUES (:id, :email, 'x', true)"
+            ),
+            {"id": user_id, "email": f"bench-{user_id}@example.com"},
+        )
+        db.commit()
+        return user_id
+    finally:
+        db.close()
+
+
+async def body(rows: int, duplicates: int, content_type: str):
+    """The upload, generated chunk by chunk so the benchmark holds none of it"""
+    buffer = bytearray(
+        b"email,first_name,last_name,tags,plan\n" if content_type == CSV else b""
+    )
+    for i in range(rows):
+        n = i % (rows - duplicates) if duplicates else i
+        if content_type == CSV:
+            buffer += b"sub%d@example.com,Ada,Lovelace,newsletter;vip,pro\n" % n
+        else:
+            buffer += (
+                b'{"email": "sub%d@example.com", "first_name": "Ada", '
+                b'"last_name": "Lovelace", "tags": ["newsletter", "vip"], '
+                b'"custom_fields": {"plan": "pro"}}\n' % n
+            )
+        if len(buffer) >= CHUNK_SIZE:
+            yield bytes(buffer)
+            buffer.clear()
+    if buffer:
+        yield bytes(buffer)
+
+
+async def main(args):
+    content_type = CSV if args.format == "csv" else NDJSON
+    user_id = create_user()
+    started = time.perf_counter()
+    async with AsyncSessionLocal() as db:
+        result = await import_subscribers(
+            db, user_id, content_type, body(args.rows, args.duplicates, content_type)
+        )
+    elapsed = time.perf_counter() - started
+    # Children count towards RUSAGE_CHILDREN once they have exited
+    pool = get_import_pool()
+    if pool is not None:
+        pool.shutdown()
+
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024
+    print(
+        f"{args.rows} {args.format} rows in {elapsed:.1f}s "
+        f"({args.rows / elapsed:.0f} rows/sec): imported {result.imported}, "
+        f"duplicates {result.duplicates}, invalid {result.invalid}"
+    )
+    print(
+        f"peak RSS: importer {own:.0f} MB, largest validation process {children:.0f} MB"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--duplicates", type=int, default=0)
+    parser.add_argument("--format", choices=["ndjson", "csv"], default="ndjson")
+    args = parser.parse_args()
+    structlog.configure(
+        wrapper_class=structlog.make_filtering_bound_logger(logging.WARNING)
+    )
+
+    asyncio.run(main(args))
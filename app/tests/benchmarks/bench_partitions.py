@@ -0,0 +1,181 @@
+"""Idempotency lookup latency on a plain and a day-partitioned webhook_deliveries.
+
+Creates two scratch copies of webhook_deliveries with the unique (webhook_id,
+event_id, created_at) index the delivery INSERT conflicts on:
+  - plain: one table, one index over every row
+  - partitioned: PARTITION BY RANGE (created_at), one partition per day
+
+fills the plain table with --deliveries synthetic rows spread evenly over
+--days days, copies them into the partitioned one, and then replays
+--lookups redelivered events of the last day: each is the
+INSERT ... ON CONFLICT DO NOTHING of a delivery that already exists, which is
+what a redelivered task costs. Reports p50/p99 latency and the size of the
+index each lookup walks. The scratch tables are dropped afterwards.
+
+Needs the Postgres configured in the environment (see README), with the
+migrations applied. 100M rows take a while and tens of GB of disk.
+
+Usage:
+    python -m app.tests.benchmarks.bench_partitions --deliveries 100000000
+"""
+
+import argparse
+import statistics
+import time
+from datetime import date, timedelta
+from typing import List, Tuple
+
+from sqlalchemy import text
+
+from app.db.partitions import day_start, partition_name
+from app.db.session import engine
+
+PLAIN = "bench_deliveries_plain"
+PARTITIONED = "bench_deliveries_part"
+
+FILL = """
+INSERT INTO {table} (id, webhook_id, event_id, status, attempts, created_at)
+SELECT gen_random_uuid(), webhook_ids[1 + i % :webhooks], gen_random_uuid(),
+       'delivered', 1,
+       CAST(:start AS timestamptz) + (i * CAST(:step AS interval))
+FROM generate_series(:offset, :offset + :rows - 1) i,
+(SELECT array_agg(gen_random_uuid()) AS webhook_ids
+ FROM generate_series(1, :webhooks)) webhooks
+"""
+
+LOOKUP = """
+INSERT INTO {table} (id, webhook_id, event_id, status, attempts, created_at)
+VALUES (gen_random_uuid(), :webhook_id, :event_id, 'pending', 0, :created_at)
+ON CONFLICT (webhook_id, event_id, created_at) DO NOTHING
+"""
+
+
+def create_tables(first_day: date, days: int):
+    with engine.begin() as conn:
+        drop_tables(conn)
+        conn.execute(
+            text(f"CREATE TABLE {PLAIN} (LIKE webhook_deliveries INCLUDING DEFAULTS)")
+        )
+        conn.execute(
+            text(
+                f"CREATE TABLE {PARTITIONED} "
+                "(LIKE webhook_deliveries INCLUDING DEFAULTS) "
+                "PARTITION BY RANGE (created_at)"
+            )
+        )
+        for offset in range(days):
+            day = first_day + timedelta(days=offset)
+            conn.execute(
+                text(
+                    f"CREATE TABLE {partition_name(PARTITIONED, day)} "
+                    f"PARTITION OF {PARTITIONED} "
+                    f"FOR VALUES FROM ('{day_start(day).isoformat()}') "
+                    f"TO ('{day_start(day + timedelta(days=1)).isoformat()}')"
+                )
+            )
+
+
+def drop_tables(conn):
+    for table in (PLAIN, PARTITIONED):
+        conn.execute(text(f"DROP TABLE IF EXISTS {table}"))
+
+
+def fill(first_day: date, args):
+    step = f"{args.days * 86400 / args.deliveries} seconds"
+    for offset in range(0, args.deliveries, args.batch):
+        with engine.begin() as conn:
+            conn.execute(
+                text(FILL.format(table=PLAIN)),
+                {
+                    "start": day_start(first_day),
+                    "step": step,
+                    "offset": offset,
+                    "rows": min(args.batch, args.deliveries - offset),
+                    "webhooks": args.webhooks,
+                },
+            )
+    with engine.begin() as conn:
+        conn.execute(text(f"INSERT INTO {PARTITIONED} SELECT * FROM {PLAIN}"))
+        for table in (PLAIN, PARTITIONED):
+            # Built after the fill, like an index that grew with the table
+            conn.execute(
+                text(
+                    f"CREATE UNIQUE INDEX ON {table} (webhook_id, event_id, created_at)"
+                )
+            )
+            conn.execute(text(f"ANALYZE {table}"))
+
+
+def sample_keys(last_day: date, lookups: int) -> List[Tuple]:
+    with engine.connect() as conn:
+        rows = conn.execute(
+            text(
+                f"SELECT webhook_id, event_id, created_at FROM {PLAIN} "
+                "WHERE created_at >= :since ORDER BY random() LIMIT :lookups"
+            ),
+            {"since": day_start(last_day), "lookups": lookups},
+        )
+        return [tuple(row) for row in rows]
+
+
+def time_lookups(table: str, keys: List[Tuple]) -> List[float]:
+    statement = text(LOOKUP.format(table=table))
+    latencies = []
+    with engine.connect() as conn:
+        for webhook_id, event_id, created_at in keys:
+            started = time.perf_counter()
+            conn.execute(
+                statement,
+                {
+                    "webhook_id": webhook_id,
+                    "event_id": event_id,
+                    "created_at": created_at,
+                },
+            )
+            conn.commit()
+            latencies.append(time.perf_counter() - started)
+    return latencies
+
+
+def index_size_mb(table: str) -> float:
+    with engine.connect() as conn:
+        size = conn.execute(
+            text("SELECT pg_indexes_size(CAST(:table AS regclass))"),
+            {"table": table},
+        ).scalar_one()
+    return size / 1024 / 1024
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--deliveries", type=int, default=100_000_000)
+    parser.add_argument("--days", type=int, default=30)
+    parser.add_argument("--webhooks", type=int, default=1000)
+    parser.add_argument("--lookups", type=int, default=2000)
+    parser.add_argument("--batch", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    first_day = date.today() - timedelta(days=args.days - 1)
+    last_day = first_day + timedelta(days=args.days - 1)
+    print(f"{args.deliveries} deliveries over {args.days} days")
+    try:
+        create_tables(first_day, args.days)
+        fill(first_day, args)
+        keys = sample_keys(last_day, args.lookups)
+        indexes = {
+            "plain": index_size_mb(PLAIN),
+            # A lookup only walks the index of its day's partition
+            "partitioned": index_size_mb(partition_name(PARTITIONED, last_day)),
+        }
+        for name, table in (("plain", PLAIN), ("partitioned", PARTITIONED)):
+            # Once to warm the cache, then timed
+            time_lookups(table, keys)
+            latencies = time_lookups(table, keys)
+            print(
+                f"{name:>12}: p50={statistics.median(latencies) * 1000:7.3f}ms  "
+                f"p99={statistics.quantiles(latencies, n=100)[98] * 1000:7.3f}ms  "
+                f"index {indexes[name]:10.1f} MB"
+            )
+    finally:
+        with engine.begin() as conn:
+            drop_tables(conn)
@@ -0,0 +1,78 @@
+"""Cost of encoding and signing one event for all of its webhooks.
+
+Compares, per event fanned out to --webhooks webhooks:
+  - per-webhook: json.dumps for every request, as httpx's `json=` did
+  - once: a single orjson encoding shared by every request
+  - once+sign: the shared encoding plus an HMAC-SHA256 signature per webhook
+
+No services are needed, so it runs anywhere.
+
+Usage:
+    python -m app.tests.benchmarks.bench_payload_encoding --webhooks 10
+"""
+
+import argparse
+import json
+import time
+import uuid
+from datetime import datetime
+
+from app.webhook.delivery import encode_payload, signature_headers
+
+
+def build_payload(fields: int) -> dict:
+    return {
+        "event_id": str(uuid.uuid4()),
+        "event_type": "subscriber.created",
+        "timestamp": datetime.utcnow().isoformat(),
+        "data": {
+            "subscriber": {
+                "id": str(uuid.uuid4()),
+                "email": "user@example.com",
+                "custom_fields": {f"field_{i}": f"value {i}" for i in range(fields)},
+            }
+        },
+    }
+
+
+def per_webhook(payload: dict, secrets: list) -> None:
+    for _ in secrets:
+        json.dumps(payload).encode()
+
+
+def once(payload: dict, secrets: list) -> None:
+    encode_payload(payload)
+
+
+def once_signed(payload: dict, secrets: list) -> None:
+    body = encode_payload(payload)
+    for secret in secrets:
+        signature_headers(secret, body)
+
+
+def bench(fn, payload: dict, secrets: list, events: int) -> float:
+    """Microseconds per event"""
+    started = time.perf_counter()
+    for _ in range(events):
+        fn(payload, secrets)
+    return (time.perf_counter() - started) / events * 1e6
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--events", type=int, default=20000)
+    parser.add_argument("--webhooks", type=int, default=10)
+    parser.add_argument("--fields", type=int, default=20)
+    args = parser.parse_args()
+
+    payload = build_payload(args.fields)
+    secrets = [uuid.uuid4().hex for _ in range(args.webhooks)]
+    print(
+        f"{len(encode_payload(payload))} byte payload, {args.webhooks} webhooks per event"
+    )
+    for name, fn in (
+        ("per-webhook", per_webhook),
+        ("once", once),
+        ("once+sign", once_signed),
+    ):
+        print(f"{name:>12}: {bench(fn, payload, secrets, args.events):8.1f} us/event")
@@ -0,0 +1,83 @@
+"""Event publishing throughput at different batch sizes.
+
+Needs the Postgres and Redis configured in the environment (see README);
+events are enqueued to the real Celery queues, so run it against a
+disposable environment without workers, or purge the queues afterwards.
+
+Usage:
+    python -m app.tests.benchmarks.bench_publish --events 10000
+"""
+
+import argparse
+import logging
+import time
+import uuid
+
+import structlog
+
+from app.core.security import get_password_hash
+from app.db.session import SessionLocal
+from app.models import User
+from app.webhook.webhook_notifier import WebhookNotifier
+
+
+def create_user() -> uuid.UUID:
+    db = SessionLocal()
+    try:
+        user = User(
+            email=f"bench-{uuid.uuid4().hex[:8]}@example.com",
+            hashed_password=get_password_hash("password"),
+        )
+        db.add(user)
+        db.commit()
+        return user.id
+    finally:
+        db.close()
+
+
+def event_data(i: int) -> dict:
+    return {"subscriber": {"id": str(uuid.uuid4()), "email": f"user{i}@example.com"}}
+
+
+def bench_single(notifier: WebhookNotifier, user_id: uuid.UUID, events: int) -> float:
+    started = time.perf_counter()
+    for i in range(events):
+        notifier.publish_event("subscriber.created", user_id, event_data(i))
+    return events / (time.perf_counter() - started)
+
+
+def bench_batch(
+    notifier: WebhookNotifier, user_id: uuid.UUID, events: int, batch_size: int
+) -> float:
+    started = time.perf_counter()
+    for offset in range(0, events, batch_size):
+        notifier.publish_events(
+            [
+                ("subscriber.created", user_id, event_data(i))
+                for i in range(offset, min(offset + batch_size, events))
+            ]
+        )
+    return events / (time.perf_counter() - started)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--events", type=int, default=10000)
+    args = parser.parse_args()
+    structlog.configure(
+        wrapper_class=structlog.make_filtering_bound_logger(logging.WARNING)
+    )
+
+    notifier = WebhookNotifier()
+    user_id = create_user()
+
+    # The single-event path is slow, so it is measured on a smaller sample
+    single_events = min(args.events, 1000)
+    print(
+        f"publish_event          : "
+        f"{bench_single(notifier, user_id, single_events):10.1f} events/sec"
+    )
+    for batch_size in (1, 100, 10000):
+        events = single_events if batch_size == 1 else args.events
+        rate = bench_batch(notifier, user_id, events, batch_size)
+        print(f"publish_events({batch_size:>5}) : {rate:10.1f} events/sec")
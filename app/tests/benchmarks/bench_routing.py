@@ -0,0 +1,131 @@
+"""Routing query latency: JSON events scan vs webhook_subscriptions lookup.
+
+Seeds --users users with --webhooks-per-user webhooks each (1M webhooks
+across 100k users by default), every webhook subscribed to two of the
+supported event types, then times the old `events::jsonb @>` filter
+against the indexed webhook_subscriptions join for random users. Needs the
+migrated Postgres configured in the environment.
+
+Usage:
+    python -m app.tests.benchmarks.bench_routing --users 100000 --webhooks-per-user 10
+"""
+
+import argparse
+import random
+import statistics
+import time
+import uuid
+
+from sqlalchemy import text
+
+from app.db.session import SessionLocal
+
+EVENT_TYPES = ["subscriber.created", "subscriber.updated", "subscriber.deleted"]
+
+OLD_QUERY = text(
+    "SELECT id, url, secret FROM webhooks "
+    "WHERE user_id = :user_id AND is_active "
+    "AND webhooks.events::jsonb @> :event_type"
+)
+NEW_QUERY = text(
+    "SELECT w.id, w.url, w.secret FROM webhooks w "
+    "JOIN webhook_subscriptions s ON s.webhook_id = w.id "
+    "WHERE s.user_id = :user_id AND s.event_type = :event_type AND w.is_active"
+)
+
+
+def seed(users: int, webhooks_per_user: int) -> list:
+    # Tag the seeded users so reruns do not mix in earlier data
+    prefix = f"route-{uuid.uuid4().hex[:8]}-"
+    db = SessionLocal()
+    try:
+        user_ids = (
+            db.execute(
+                text(
+                    "INSERT INTO users (id, email, hashed_password, is_active) "
+                    "SELECT gen_random_uuid(), :prefix || i || '@example.com', "
+                    "'x', true "
+                    "FROM generate_series(1, :users) AS i RETURNING id"
+                ),
+                {"users": users, "prefix": prefix},
+            )
+            .scalars()
+            .all()
+        )
+        db.execute(
+            text(
+                "INSERT INTO webhooks (id, url, events, secret, is_active, user_id) "
+                "SELECT gen_random_uuid(), 'https://example.com/' || i, "
+                "json_build_array((:events)[1 + i % 3], (:events)[1 + (i + 1) % 3]), "
+                "'secret', true, u.id "
+                "FROM users u CROSS JOIN generate_series(1, :per_user) AS i "
+                "WHERE u.email LIKE :pattern"
+            ),
+            {
+                "events": EVENT_TYPES,
+                "per_user": webhooks_per_user,
+                "pattern": prefix + "%",
+            },
+        )
+        db.execute(
+            text(
+                "INSERT INTO webhook_subscriptions (webhook_id, event_type, user_id) "
+                "SELECT w.id, e.event_type, w.user_id FROM webhooks w "
+                "CROSS JOIN LATERAL json_array_elements_text(w.events) AS e(event_type) "
+                "JOIN users u ON u.id = w.user_id "
+                "WHERE u.email LIKE :pattern ON CONFLICT DO NOTHING"
+            ),
+            {"pattern": prefix + "%"},
+        )
+        db.commit()
+        db.execute(text("ANALYZE webhooks"))
+        db.execute(text("ANALYZE webhook_subscriptions"))
+        return [str(user_id) for user_id in user_ids]
+    finally:
+        db.close()
+
+
+def time_query(query, params: list[dict]) -> list[float]:
+    db = SessionLocal()
+    try:
+        latencies = []
+        for p in params:
+            started = time.perf_counter()
+            db.execute(query, p).all()
+            latencies.append(time.perf_counter() - started)
+        return latencies
+    finally:
+        db.close()
+
+
+def report(name: str, latencies: list[float]):
+    quantiles = statistics.quantiles(latencies, n=100)
+    print(
+        f"{name:>22}: p50={statistics.median(latencies) * 1000:8.3f}ms  "
+        f"p99={quantiles[98] * 1000:8.3f}ms"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=100000)
+    parser.add_argument("--webhooks-per-user", type=int, default=10)
+    parser.add_argument("--lookups", type=int, default=1000)
+    args = parser.parse_args()
+
+    user_ids = seed(args.users, args.webhooks_per_user)
+    samples = [
+        (random.choice(user_ids), random.choice(EVENT_TYPES))
+        for _ in range(args.lookups)
+    ]
+    report(
+        "events::jsonb @>",
+        time_query(
+            OLD_QUERY,
+            [{"user_id": u, "event_type": f'["{e}"]'} for u, e in samples],
+        ),
+    )
+    report(
+        "webhook_subscriptions",
+        time_query(NEW_QUERY, [{"user_id": u, "event_type": e} for u, e in samples]),
+    )
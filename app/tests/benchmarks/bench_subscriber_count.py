@@ -0,0 +1,82 @@
+"""publish_event latency by account size, with and without the cached count.
+
+Seeds one user per size with that many subscribers (generate_series), then
+times publish_event with the Redis counter evicted before every call (the
+old COUNT(*) per event) and with a warm counter. Needs the Postgres and
+Redis configured in the environment; seeding 1M rows takes a while.
+
+Usage:
+    python -m app.tests.benchmarks.bench_subscriber_count --sizes 1000 100000 1000000
+"""
+
+import argparse
+import logging
+import statistics
+import time
+import uuid
+
+import structlog
+from sqlalchemy import text
+
+from app.db.cache import get_sync_redis
+from app.db.session import SessionLocal
+from app.webhook.webhook_notifier import WebhookNotifier
+
+
+def seed_account(size: int) -> uuid.UUID:
+    user_id = uuid.uuid4()
+    db = SessionLocal()
+    try:
+        db.execute(
+            text(
+                "INSERT INTO users (id, email, hashed_password, is_active) "
+                "VALUES (:id, :email, 'x', true)"
+            ),
+            {"id": user_id, "email": f"bench-{user_id}@example.com"},
+        )
+        db.execute(
+            text(
+                "INSERT INTO subscribers (id, email, status, source, user_id) "
+                "SELECT gen_random_uuid(), 'sub' || i || '@example.com', "
+                "'active', 'bench', :user_id FROM generate_series(1, :size) AS i"
+            ),
+            {"user_id": user_id, "size": size},
+        )
+        db.commit()
+        db.execute(text("ANALYZE subscribers"))
+        return user_id
+    finally:
+        db.close()
+
+
+def time_publish(notifier, user_id: uuid.UUID, runs: int, cold: bool) -> list[float]:
+    cache = get_sync_redis()
+    latencies = []
+    for i in range(runs):
+        if cold:
+            cache.delete(f"subscriber_count:{user_id}")
+        started = time.perf_counter()
+        notifier.publish_event("subscriber.created", user_id, {"n": i})
+        latencies.append(time.perf_counter() - started)
+    return latencies
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 100000, 1000000])
+    parser.add_argument("--runs", type=int, default=50)
+    args = parser.parse_args()
+    structlog.configure(
+        wrapper_class=structlog.make_filtering_bound_logger(logging.WARNING)
+    )
+
+    notifier = WebhookNotifier()
+    for size in args.sizes:
+        user_id = seed_account(size)
+        for label, cold in (("COUNT(*)", True), ("cached", False)):
+            latencies = time_publish(notifier, user_id, args.runs, cold)
+            print(
+                f"{size:>9} subscribers, {label:>8}: "
+                f"p50={statistics.median(latencies) * 1000:8.2f}ms  "
+                f"max={max(latencies) * 1000:8.2f}ms"
+            )
@@ -0,0 +1,124 @@
+"""GET /subscribers page latency by depth, paging by offset and by cursor.
+
+Seeds one user with --size subscribers (generate_series, one second apart),
+then times get_subscribers for pages 1, 1,000 and 10,000 of --per-page rows:
+  - offset: page number with an exact COUNT(*), the old behaviour
+  - cursor: the cursor of the previous page with an exact COUNT(*)
+  - cursor, cached total: the cursor with total=cached, no count query
+
+The cursor of a deep page is looked up once before timing. Needs the Postgres
+and Redis configured in the environment; seeding 500k rows takes a while.
+
+Usage:
+    python -m app.tests.benchmarks.bench_subscriber_pages --size 500000 --pages 1 1000 10000
+"""
+
+import argparse
+import asyncio
+import logging
+import statistics
+import time
+import uuid
+from typing import Optional
+
+import structlog
+from sqlalchemy import select, text
+
+from app.db.session import AsyncSessionLocal, SessionLocal
+from app.models import Subscriber
+from app.subscriber.schema import TotalMode
+from app.subscriber.service import encode_cursor, get_subscribers
+
+
+def seed_account(size: int) -> uuid.UUID:
+    user_id = uuid.uuid4()
+    db = SessionLocal()
+    try:
+        db.execute(
+            text(
+                "INSERT INTO users (id, email, hashed_password, is_active) "
+                "VALUES (:id, :email, 'x', true)"
+            ),
+            {"id": user_id, "email": f"bench-{user_id}@example.com"},
+        )
+        db.execute(
+            text(
+                "INSERT INTO subscribers (id, email, status, source, user_id, created_at) "
+                "SELECT gen_random_uuid(), 'sub' || i || '@example.com', "
+                "'active', 'bench', :user_id, "
+                "now() - make_interval(secs => :size - i) "
+                "FROM generate_series(1, :size) AS i"
+            ),
+            {"user_id": user_id, "size": size},
+        )
+        db.commit()
+        db.execute(text("ANALYZE subscribers"))
+        return user_id
+    finally:
+        db.close()
+
+
+async def cursor_before(user_id: uuid.UUID, page: int, per_page: int) -> Optional[str]:
+    if page == 1:
+        return None
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(
+            select(Subscriber)
+            .where(Subscriber.user_id == user_id)
+            .order_by(Subscriber.created_at, Subscriber.id)
+            .offset((page - 1) * per_page - 1)
+            .limit(1)
+        )
+        return encode_cursor(result.scalar_one())
+
+
+async def time_page(
+    user_id: uuid.UUID,
+    page: int,
+    per_page: int,
+    cursor: Optional[str],
+    total: TotalMode,
+    runs: int,
+) -> list[float]:
+    latencies = []
+    for _ in range(runs):
+        async with AsyncSessionLocal() as db:
+            started = time.perf_counter()
+            await get_subscribers(
+                db, user_id, page, per_page, cursor=cursor, total=total
+            )
+            latencies.append(time.perf_counter() - started)
+    return latencies
+
+
+async def main(args):
+    user_id = seed_account(args.size)
+    for page in args.pages:
+        cursor = await cursor_before(user_id, page, args.per_page)
+        for label, page_cursor, total in (
+            ("offset", None, TotalMode.EXACT),
+            ("cursor", cursor, TotalMode.EXACT),
+            ("cursor, cached total", cursor, TotalMode.CACHED),
+        ):
+            latencies = await time_page(
+                user_id, page, args.per_page, page_cursor, total, args.runs
+            )
+            print(
+                f"page {page:>6} {label:>21}: "
+                f"p50={statistics.median(latencies) * 1000:8.2f}ms  "
+                f"max={max(latencies) * 1000:8.2f}ms"
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--size", type=int, default=500_000)
+    parser.add_argument("--per-page", type=int, default=50)
+    parser.add_argument("--pages", type=int, nargs="+", default=[1, 1000, 10000])
+    parser.add_argument("--runs", type=int, default=20)
+    args = parser.parse_args()
+    structlog.configure(
+        wrapper_class=structlog.make_filtering_bound_logger(logging.WARNING)
+    )
+
+    asyncio.run(main(args))
@@ -0,0 +1,116 @@
+"""Subscriber email search latency on a large account, old and indexed filter.
+
+Seeds one user with --size subscribers (generate_series, random looking local
+parts over a few domains), then times the first page of a search listing for
+terms of each shape the UI sends:
+  - a 2 character term, the first keystrokes, as a substring and as a
+    prefix (search_prefix)
+  - a common substring (a domain) and a rare one
+  - a whole email
+with the old ``email ILIKE '%term%'`` filter and with search_filter, which
+uses the trigram and prefix indexes. Needs the Postgres configured in the
+environment; seeding 1M rows takes a while.
+
+Usage:
+    python -m app.tests.benchmarks.bench_subscriber_search --size 1000000
+"""
+
+import argparse
+import logging
+import statistics
+import time
+import uuid
+
+import structlog
+from sqlalchemy import select, text
+
+from app.db.session import SessionLocal
+from app.models import Subscriber
+from app.subscriber.service import search_filter
+
+
+def seed_account(size: int) -> uuid.UUID:
+    user_id = uuid.uuid4()
+    db = SessionLocal()
+    try:
+        db.execute(
+            text(
+                "INSERT INTO users (id, email, hashed_password, is_active) "
+                "VALUES (:id, :email, 'x', true)"
+            ),
+            {"id": user_id, "email": f"bench-{user_id}@example.com"},
+        )
+        db.execute(
+            text(
+                "INSERT INTO subscribers (id, email, status, source, user_id) "
+                "SELECT gen_random_uuid(), "
+                "substr(md5(i::text), 1, 10) || '.' || i || '@' || "
+                "(ARRAY['gmail.com', 'yahoo.com', 'example.com', 'acme.io'])[1 + i % 4], "
+                "'active', 'bench', :user_id FROM generate_series(1, :size) AS i"
+            ),
+            {"user_id": user_id, "size": size},
+        )
+        db.commit()
+        db.execute(text("ANALYZE subscribers"))
+        return user_id
+    finally:
+        db.close()
+
+
+def time_search(user_id: uuid.UUID, condition, runs: int) -> list[float]:
+    query = (
+        select(Subscriber)
+        .where(Subscriber.user_id == user_id, condition)
+        .order_by(Subscriber.created_at, Subscriber.id)
+        .limit(51)
+    )
+    latencies = []
+    db = SessionLocal()
+    try:
+        for _ in range(runs):
+            started = time.perf_counter()
+            db.execute(query).all()
+            latencies.append(time.perf_counter() - started)
+    finally:
+        db.close()
+    return latencies
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--size", type=int, default=1_000_000)
+    parser.add_argument("--runs", type=int, default=20)
+    args = parser.parse_args()
+    structlog.configure(
+        wrapper_class=structlog.make_filtering_bound_logger(logging.WARNING)
+    )
+
+    user_id = seed_account(args.size)
+    middle = args.size // 2
+    terms = {
+        "short": "a1",
+        "prefix": "a1",
+        "common": "gmail",
+        "rare": f".{middle}@",
+    }
+    db = SessionLocal()
+    try:
+        terms["email"] = db.execute(
+            select(Subscriber.email).where(
+                Subscriber.user_id == user_id, Subscriber.email.contains(f".{middle}@")
+            )
+        ).scalar_one()
+    finally:
+        db.close()
+
+    for shape, term in terms.items():
+        for label, condition in (
+            ("ILIKE", Subscriber.email.ilike(f"%{term}%")),
+            ("indexed", search_filter(term, prefix=shape == "prefix")),
+        ):
+            latencies = time_search(user_id, condition, args.runs)
+            print(
+                f"{shape:>6} {term!r:>32} {label:>7}: "
+                f"p50={statistics.median(latencies) * 1000:8.2f}ms  "
+                f"max={max(latencies) * 1000:8.2f}ms"
+            )
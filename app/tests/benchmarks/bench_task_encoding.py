@@ -0,0 +1,117 @@
+"""Redis memory and throughput of queued delivery tasks per encoding.
+
+Builds --events process_webhook_event_batch messages, one subscriber.created
+event each (the shape publish_events enqueues), under every combination of
+  - serializer: json, msgpack (if installed)
+  - compression: none, gzip, zstd (if installed) above --threshold bytes
+
+pushes them onto a scratch Redis list and reports the memory the list takes,
+scaled to 1M queued events, then enqueue (build + LPUSH) and dequeue
+(RPOP + decode) messages/sec. The scratch list is deleted afterwards.
+
+Needs the Redis configured in the environment (see README).
+
+Usage:
+    python -m app.tests.benchmarks.bench_task_encoding --events 100000
+"""
+
+import argparse
+import time
+import uuid
+from typing import List, Tuple
+from unittest.mock import patch
+
+from kombu import compression  # type: ignore
+from kombu.serialization import registry  # type: ignore
+
+from app.db.cache import get_sync_redis
+from app.webhook.webhook_notifier import (
+    async_broker,
+    celery_app,
+    process_webhook_event_batch,
+)
+
+QUEUE = "bench:task_encoding"
+PIPELINE = 1000
+
+
+def event_args(i: int) -> List:
+    data = {
+        "subscriber": {
+            "id": str(uuid.uuid4()),
+            "email": f"subscriber-{i}@example.com",
+            "first_name": "Ada",
+            "last_name": "Lovelace",
+            "status": "active",
+            "tags": ["newsletter", "customer", "vip"],
+            "custom_fields": {"plan": "pro", "company": "Example Inc."},
+            "created_at": "2026-10-18T12:00:00+00:00",
+        }
+    }
+    event = [str(uuid.uuid4()), "subscriber.created", uuid.uuid4(), data]
+    return [[event + ["2026-10-18T12:00:00+00:00"]]]
+
+
+def settings() -> List[Tuple[str, str]]:
+    serializers = ["json"]
+    if "msgpack" in registry._encoders:
+        serializers.append("msgpack")
+    compressions = [""] + [
+        method for method in ("gzip", "zstd") if method in compression._aliases
+    ]
+    return [(s, c) for s in serializers for c in compressions]
+
+
+def run(serializer: str, method: str, args):
+    client = get_sync_redis()
+    client.delete(QUEUE)
+    celery_app.conf.task_serializer = serializer
+    with (
+        patch("app.webhook.serialization.config.CELERY_TASK_COMPRESSION", method),
+        patch(
+            "app.webhook.serialization.config.CELERY_COMPRESSION_THRESHOLD_BYTES",
+            args.threshold,
+        ),
+    ):
+        started = time.perf_counter()
+        for offset in range(0, args.events, PIPELINE):
+            with client.pipeline(transaction=False) as pipe:
+                for i in range(offset, min(offset + PIPELINE, args.events)):
+                    _, message = async_broker.build_message(
+                        process_webhook_event_batch.name, event_args(i), "webhooks"
+                    )
+                    pipe.lpush(QUEUE, message)
+                pipe.execute()
+        enqueue_rate = args.events / (time.perf_counter() - started)
+        memory = client.memory_usage(QUEUE, samples=0) or 0
+
+        started = time.perf_counter()
+        while True:
+            messages = client.rpop(QUEUE, PIPELINE)
+            if not messages:
+                break
+            for raw in messages:
+                async_broker.decode_message(raw)
+        dequeue_rate = args.events / (time.perf_counter() - started)
+
+    client.delete(QUEUE)
+    per_million = memory / args.events * 1_000_000 / 1024 / 1024
+    print(
+        f"{serializer:>8} {method or 'none':>5}: {per_million:9.1f} MB per 1M events  "
+        f"enqueue {enqueue_rate:9.0f}/sec  dequeue {dequeue_rate:9.0f}/sec"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--events", type=int, default=100_000)
+    parser.add_argument("--threshold", type=int, default=256)
+    args = parser.parse_args()
+
+    print(f"{args.events} queued events, compressed above {args.threshold} bytes")
+    try:
+        for serializer, method in settings():
+            run(serializer, method, args)
+    finally:
+        celery_app.conf.task_serializer = "json"
+        get_sync_redis().delete(QUEUE)
@@ -0,0 +1,204 @@
+"""Compare the prefork Celery worker with the asyncio worker.
+
+Seeds a user with --webhooks webhooks pointing at a local stub HTTP server,
+enqueues --events events onto the `webhooks` queue and starts one of:
+  - celery: `celery -A app.webhook.webhook_notifier.celery_app worker`
+    with --concurrency processes
+  - asyncio: `python -m app.webhook.supervisor` with --processes worker
+    processes of --async-concurrency tasks each
+
+then reports deliveries/sec until every delivery is recorded, and the peak
+RSS of the whole worker (all of its processes). Rate limits are disabled for
+the workers, since all webhooks share the stub's host.
+
+Needs the Postgres and Redis configured in the environment (see README) and
+no other workers consuming the queues.
+
+Usage:
+    python -m app.tests.benchmarks.bench_worker --events 2000 --webhooks 5
+"""
+
+import argparse
+import logging
+import os
+import subprocess
+import sys
+import time
+import uuid
+from typing import Dict, List
+
+import structlog
+from sqlalchemy import func, select
+
+from app.core.security import get_password_hash
+from app.db.cache import get_sync_redis
+from app.db.session import SessionLocal
+from app.models import User, Webhook, WebhookDelivery, WebhookSubscription
+from app.tests.benchmarks.bench_delivery import start_stub_server
+from app.webhook.webhook_notifier import async_broker, process_webhook_event
+
+EVENT_TYPE = "subscriber.created"
+
+
+def seed_user(base_url: str, webhooks: int) -> uuid.UUID:
+    db = SessionLocal()
+    try:
+        user = User(
+            email=f"bench-{uuid.uuid4().hex[:8]}@example.com",
+            hashed_password=get_password_hash("password"),
+        )
+        db.add(user)
+        db.flush()
+        for i in range(webhooks):
+            webhook = Webhook(
+                url=f"{base_url}/hook/{i}", events=[EVENT_TYPE], user_id=user.id
+            )
+            db.add(webhook)
+            db.flush()
+            db.add(
+                WebhookSubscription(
+                    webhook_id=webhook.id, event_type=EVENT_TYPE, user_id=user.id
+                )
+            )
+        db.commit()
+        return user.id
+    finally:
+        db.close()
+
+
+def enqueue_events(user_id: uuid.UUID, events: int) -> List[str]:
+    event_ids = [str(uuid.uuid4()) for _ in range(events)]
+    with get_sync_redis().pipeline(transaction=False) as pipe:
+        for i, event_id in enumerate(event_ids):
+            _, message = async_broker.build_message(
+                process_webhook_event.name,
+                [event_id, EVENT_TYPE, str(user_id), {"subscriber": {"id": i}}],
+                "webhooks",
+            )
+            pipe.lpush("webhooks", message)
+        pipe.execute()
+    return event_ids
+
+
+def count_deliveries(user_id: uuid.UUID) -> int:
+    db = SessionLocal()
+    try:
+        return db.execute(
+            select(func.count())
+            .select_from(WebhookDelivery)
+            .join(Webhook, Webhook.id == WebhookDelivery.webhook_id)
+            .where(Webhook.user_id == user_id, WebhookDelivery.status == "delivered")
+        ).scalar_one()
+    finally:
+        db.close()
+
+
+def tree_rss_mb(root_pid: int) -> float:
+    """Resident memory of a process and all of its descendants, from /proc"""
+    children: Dict[int, List[int]] = {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+        except (OSError, IndexError):
+            continue
+        children.setdefault(ppid, []).append(int(entry))
+
+    total_kb = 0
+    stack = [root_pid]
+    while stack:
+        pid = stack.pop()
+        stack.extend(children.get(pid, []))
+        try:
+            with open(f"/proc/{pid}/status") as f:
+                for line in f:
+                    if line.startswith("VmRSS:"):
+                        total_kb += int(line.split()[1])
+        except OSError:
+            continue
+    return total_kb / 1024
+
+
+def worker_command(args) -> List[str]:
+    if args.worker == "celery":
+        return [
+            "celery",
+            "-A",
+            "app.webhook.webhook_notifier.celery_app",
+            "worker",
+            "--loglevel=warning",
+            "--queues=webhooks",
+            f"--concurrency={args.concurrency}",
+        ]
+    return [
+        sys.executable,
+        "-m",
+        "app.webhook.supervisor",
+        f"--processes={args.processes}",
+        f"--concurrency={args.async_concurrency}",
+    ]
+
+
+def run(args, user_id: uuid.UUID):
+    expected = args.events * args.webhooks
+    env = {
+        **os.environ,
+        "WEBHOOK_RATE_LIMIT_HOST_RATE": "0",
+        "WEBHOOK_RATE_LIMIT_WEBHOOK_RATE": "0",
+    }
+    enqueue_events(user_id, args.events)
+    worker = subprocess.Popen(
+        worker_command(args),
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    peak_rss = 0.0
+    delivered = 0
+    started = time.perf_counter()
+    try:
+        while delivered < expected:
+            if time.perf_counter() - started > args.timeout:
+                print(f"timed out with {delivered}/{expected} deliveries")
+                break
+            time.sleep(0.5)
+            peak_rss = max(peak_rss, tree_rss_mb(worker.pid))
+            delivered = count_deliveries(user_id)
+        elapsed = time.perf_counter() - started
+    finally:
+        worker.terminate()
+        worker.wait()
+
+    # Startup is included, the same for both workers
+    print(
+        f"{args.worker:>8}: {delivered / elapsed:10.1f} deliveries/sec  "
+        f"peak RSS {peak_rss:8.1f} MB  ({delivered} deliveries in {elapsed:.1f}s)"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--worker", choices=["celery", "asyncio"], default=None)
+    parser.add_argument("--events", type=int, default=2000)
+    parser.add_argument("--webhooks", type=int, default=5)
+    parser.add_argument("--latency", type=float, default=0.1)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--processes", type=int, default=1)
+    parser.add_argument("--async-concurrency", type=int, default=1000)
+    parser.add_argument("--timeout", type=float, default=600)
+    args = parser.parse_args()
+    structlog.configure(
+        wrapper_class=structlog.make_filtering_bound_logger(logging.WARNING)
+    )
+
+    server = start_stub_server(args.latency)
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    print(
+        f"{args.events} events x {args.webhooks} webhooks, "
+        f"{args.latency * 1000:.0f}ms endpoint latency"
+    )
+    for worker in [args.worker] if args.worker else ["celery", "asyncio"]:
+        args.worker = worker
+        run(args, seed_user(base_url, args.webhooks))
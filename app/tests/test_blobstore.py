@@ -0,0 +1,115 @@
+import os
+import tempfile
+from datetime import date, datetime, timezone
+from unittest import IsolatedAsyncioTestCase
+from unittest.mock import patch
+
+import orjson
+from pydantic import ValidationError
+
+from app.webhook.blobstore import (
+    CLAIM_CHECK_KEY,
+    LocalBlobStore,
+    check_in,
+    create_blob_store,
+    is_claim_check,
+)
+from app.webhook.delivery import encode_body
+from app.webhook.schema import WebhookEventCreate
+
+
+class TestLocalBlobStore(IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        self.root = tempfile.TemporaryDirectory()
+        self.store = LocalBlobStore(self.root.name)
+
+    def tearDown(self) -> None:
+        self.root.cleanup()
+
+    async def test_put_and_stream(self):
+        data = os.urandom(200 * 1024)
+        self.store.put("events/2026/10/18/a.json", data)
+
+        chunks = [
+            chunk async for chunk in self.store.stream("events/2026/10/18/a.json")
+        ]
+
+        self.assertGreater(len(chunks), 1)
+        self.assertEqual(b"".join(chunks), data)
+
+    def test_delete_before(self):
+        for day in ("2026/10/16", "2026/10/17", "2026/10/18"):
+            self.store.put(f"events/{day}/a.json", b"{}")
+
+        removed = self.store.delete_before(date(2026, 10, 18))
+
+        self.assertEqual(removed, 2)
+        self.assertEqual(
+            os.listdir(os.path.join(self.root.name, "events/2026/10")), ["18"]
+        )
+
+    def test_check_in_above_threshold(self):
+        created_at = datetime(2026, 10, 18, tzinfo=timezone.utc)
+        small, large = {"n": 1}, {"blob": "x" * 2000}
+
+        with (
+            patch("app.webhook.blobstore.config.WEBHOOK_BLOB_THRESHOLD_BYTES", 1000),
+            patch("app.webhook.blobstore.get_blob_store", return_value=self.store),
+        ):
+            self.assertIs(check_in("small", created_at, small), small)
+            reference = check_in("large", created_at, large)
+
+        self.assertEqual(
+            reference,
+            {
+                CLAIM_CHECK_KEY: "events/2026/10/18/large.json",
+                "size": len(orjson.dumps(large)),
+            },
+        )
+        path = os.path.join(self.root.name, reference[CLAIM_CHECK_KEY])
+        with open(path, "rb") as f:
+            self.assertEqual(orjson.loads(f.read()), large)
+
+    async def test_keys_stay_in_the_store(self):
+        for key in ("/etc/hostname", "../outside.json", "events/../../x.json"):
+            with self.assertRaises(ValueError):
+                async for _ in self.store.stream(key):
+                    pass
+
+    def test_check_in_rejects_the_reserved_key(self):
+        created_at = datetime(2026, 10, 18, tzinfo=timezone.utc)
+
+        with self.assertRaises(ValueError):
+            check_in("e", created_at, {CLAIM_CHECK_KEY: "/etc/hostname", "size": 1})
+
+    def test_published_data_cannot_hold_a_claim_check(self):
+        with self.assertRaises(ValidationError):
+            WebhookEventCreate(
+                event_type="subscriber.created",
+                data={CLAIM_CHECK_KEY: "/app/.env", "size": 100},
+            )
+
+
+def test_only_event_blobs_are_claim_checks():
+    reference = {CLAIM_CHECK_KEY: "events/2026/10/18/e-1.json", "size": 10}
+
+    with patch("app.webhook.blobstore.config.WEBHOOK_BLOB_THRESHOLD_BYTES", 1000):
+        assert is_claim_check(reference)
+        for key in ("/etc/hostname", "events/2026/10/18/../../../x.json", 1):
+            assert not is_claim_check({CLAIM_CHECK_KEY: key, "size": 10})
+        assert not is_claim_check({**reference, "size": "10"})
+    # Offloading off, the data is sent as it is
+    with patch("app.webhook.blobstore.config.WEBHOOK_BLOB_THRESHOLD_BYTES", 0):
+        assert not is_claim_check(reference)
+        assert encode_body({"data": reference}) == orjson.dumps({"data": reference})
+
+
+def test_create_blob_store_from_url():
+    store = create_blob_store("file:///var/lib/blobs")
+    assert isinstance(store, LocalBlobStore)
+    assert store.root == "/var/lib/blobs"
+
+
+def test_events_without_data_are_encoded_inline():
+    payload = {"event_id": "e", "event_type": "subscriber.deleted", "data": None}
+    assert encode_body(payload) == orjson.dumps(payload)
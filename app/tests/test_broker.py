@@ -0,0 +1,117 @@
+import base64
+import uuid
+from unittest import IsolatedAsyncioTestCase
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from kombu.serialization import loads  # type: ignore
+from kombu.utils import json  # type: ignore
+
+from app.webhook.broker import AsyncBroker
+from app.webhook.webhook_notifier import celery_app, process_webhook_event
+
+
+class TestAsyncBroker(IsolatedAsyncioTestCase):
+    def test_build_message(self):
+        """The message matches what a Celery worker expects from kombu's Redis transport."""
+        broker = AsyncBroker(celery_app)
+        user_id = uuid.uuid4()
+        args = ["event-1", "subscriber.created", user_id, {"key": "value"}]
+
+        task_id, raw = broker.build_message(
+            process_webhook_event.name, args, queue="webhooks", countdown=5
+        )
+
+        envelope = json.loads(raw)
+        self.assertEqual(envelope["headers"]["task"], process_webhook_event.name)
+        self.assertEqual(envelope["headers"]["id"], task_id)
+        self.assertIsNotNone(envelope["headers"]["eta"])
+        self.assertEqual(
+            envelope["properties"]["delivery_info"]["routing_key"], "webhooks"
+        )
+        body = loads(
+            base64.b64decode(envelope["body"]),
+            envelope["content-type"],
+            envelope["content-encoding"],
+        )
+        self.assertEqual(body[0], args)
+        self.assertEqual(body[1], {})
+
+    def test_decode_message(self):
+        """Messages read back from a queue give the task and its arguments."""
+        broker = AsyncBroker(celery_app)
+        args = ["event-1", "subscriber.created", str(uuid.uuid4()), {"key": "value"}]
+        task_id, raw = broker.build_message(
+            process_webhook_event.name, args, queue="webhooks"
+        )
+
+        message = broker.decode_message(raw.encode())
+
+        self.assertEqual(message.task_id, task_id)
+        self.assertEqual(message.task_name, process_webhook_event.name)
+        self.assertEqual(message.args, args)
+        self.assertEqual(message.kwargs, {})
+        self.assertIsNone(message.eta)
+
+    def test_large_bodies_are_compressed(self):
+        """Bodies over the threshold are compressed and read back."""
+        broker = AsyncBroker(celery_app)
+        args = ["event-1", "subscriber.created", str(uuid.uuid4()), {"x": "y" * 5000}]
+
+        with (
+            patch("app.webhook.serialization.config.CELERY_TASK_COMPRESSION", "gzip"),
+            patch(
+                "app.webhook.serialization.config.CELERY_COMPRESSION_THRESHOLD_BYTES",
+                1024,
+            ),
+        ):
+            _, small = broker.build_message(
+                process_webhook_event.name, args[:3] + [{}], queue="webhooks"
+            )
+            _, large = broker.build_message(
+                process_webhook_event.name, args, queue="webhooks"
+            )
+
+        self.assertNotIn("compression", json.loads(small)["headers"])
+        envelope = json.loads(large)
+        self.assertEqual(envelope["headers"]["compression"], "application/x-gzip")
+        self.assertLess(len(envelope["body"]), 500)
+        self.assertEqual(broker.decode_message(large.encode()).args, args)
+
+    def test_msgpack_serializer(self):
+        """msgpack messages carry user ids as text, like JSON."""
+        try:
+            import msgpack  # type: ignore  # noqa: F401
+        except ImportError:
+            self.skipTest("msgpack is not installed")
+        broker = AsyncBroker(celery_app)
+        user_id = uuid.uuid4()
+
+        celery_app.conf.task_serializer = "msgpack"
+        try:
+            _, raw = broker.build_message(
+                process_webhook_event.name,
+                ["event-1", "subscriber.created", user_id, {"key": "value"}],
+                queue="webhooks",
+            )
+        finally:
+            celery_app.conf.task_serializer = "json"
+
+        self.assertEqual(json.loads(raw)["content-type"], "application/x-msgpack")
+        self.assertEqual(
+            broker.decode_message(raw.encode()).args,
+            ["event-1", "subscriber.created", str(user_id), {"key": "value"}],
+        )
+
+    async def test_send_task(self):
+        broker = AsyncBroker(celery_app)
+        client = MagicMock()
+        client.lpush = AsyncMock()
+
+        task_id = await broker.send_task(
+            process_webhook_event.name, ["event-1"], queue="webhooks", client=client
+        )
+
+        client.lpush.assert_awaited_once()
+        queue, raw = client.lpush.call_args.args
+        self.assertEqual(queue, "webhooks")
+        self.assertEqual(json.loads(raw)["headers"]["id"], task_id)
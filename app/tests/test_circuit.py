@@ -0,0 +1,161 @@
+import uuid
+from datetime import datetime, timezone
+from unittest import IsolatedAsyncioTestCase
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import httpx
+import respx
+from redis.exceptions import ConnectionError
+
+from app.models import Webhook
+from app.webhook.circuit import CIRCUIT_STATE, CircuitBreaker, collect_circuit_metrics
+from app.webhook.delivery import DeliveryEngine
+
+
+class TestCircuitBreaker(IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.breaker = CircuitBreaker(
+            failure_threshold=3, failure_window=60, cooldown=30, probe_timeout=10
+        )
+        self.cache = MagicMock()
+        self.pipe = MagicMock()
+        self.pipe.execute = AsyncMock()
+        self.cache.pipeline.return_value.__aenter__.return_value = self.pipe
+        patcher = patch("app.webhook.circuit.get_redis", return_value=self.cache)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    async def test_closed_circuit_allows_request(self):
+        self.cache.eval = AsyncMock(return_value=0)
+
+        self.assertEqual(await self.breaker.check("down.example.com"), (None, True))
+
+    async def test_host_without_failures(self):
+        self.cache.eval = AsyncMock(return_value=-1)
+
+        self.assertEqual(await self.breaker.check("up.example.com"), (None, False))
+
+    async def test_open_circuit_defers_request(self):
+        self.cache.eval = AsyncMock(return_value=25000)
+
+        retry_at = await self.breaker.retry_at("down.example.com")
+
+        self.assertIsNotNone(retry_at)
+        keys = self.cache.eval.call_args.args[2:4]
+        self.assertEqual(
+            keys, ("circuit:down.example.com", "circuit:down.example.com:probe")
+        )
+
+    async def test_redis_unavailable_allows_request(self):
+        """The breaker fails open rather than stopping deliveries."""
+        self.cache.eval = AsyncMock(side_effect=ConnectionError("down"))
+
+        self.assertIsNone(await self.breaker.retry_at("down.example.com"))
+
+    async def test_record_success_closes_circuit(self):
+        await self.breaker.record_success("down.example.com")
+
+        self.pipe.delete.assert_called_once_with(
+            "circuit:down.example.com", "circuit:down.example.com:probe"
+        )
+        self.pipe.srem.assert_called_once_with("circuit:hosts", "down.example.com")
+
+    async def test_collect_circuit_metrics(self):
+        self.cache.smembers = AsyncMock(return_value={b"down.example.com", b"gone.io"})
+        self.cache.srem = AsyncMock()
+        self.pipe.execute = AsyncMock(
+            return_value=[{b"failures": b"5", b"open_until": b"99999999999999"}, {}]
+        )
+
+        await collect_circuit_metrics()
+
+        self.assertEqual(CIRCUIT_STATE.labels(host="down.example.com")._value.get(), 1)
+        self.cache.srem.assert_awaited_once_with("circuit:hosts", "gone.io")
+
+
+class TestDeliveryEngineCircuit(IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:
+        self.breaker = MagicMock()
+        self.breaker.record_success = AsyncMock()
+        self.breaker.record_failure = AsyncMock()
+        self.engine = DeliveryEngine(timeout=1.0, circuit_breaker=self.breaker)
+        self.webhook = Webhook(id=uuid.uuid4(), url="https://down.example.com/hook")
+
+    async def asyncTearDown(self) -> None:
+        await self.engine.aclose()
+
+    @respx.mock
+    async def test_open_circuit_defers_without_sending(self):
+        route = respx.post("https://down.example.com/hook")
+        retry_at = datetime(2025, 1, 1, tzinfo=timezone.utc)
+        self.breaker.check = AsyncMock(return_value=(retry_at, True))
+
+        result = await self.engine.send(self.webhook, b"{}")
+
+        self.assertTrue(result.deferred)
+        self.assertFalse(result.success)
+        self.assertEqual(result.retry_at, retry_at)
+        self.assertEqual(route.call_count, 0)
+
+    @respx.mock
+    async def test_server_errors_are_recorded(self):
+        respx.post("https://down.example.com/hook").mock(
+            return_value=httpx.Response(503)
+        )
+        self.breaker.check = AsyncMock(return_value=(None, False))
+
+        result = await self.engine.send(self.webhook, b"{}")
+
+        self.assertFalse(result.deferred)
+        self.breaker.record_failure.assert_awaited_once_with("down.example.com")
+
+    @respx.mock
+    async def test_client_errors_keep_circuit_closed(self):
+        respx.post("https://down.example.com/hook").mock(
+            return_value=httpx.Response(404)
+        )
+        self.breaker.check = AsyncMock(return_value=(None, True))
+
+        await self.engine.send(self.webhook, b"{}")
+
+        self.breaker.record_success.assert_awaited_once_with("down.example.com")
+
+    @respx.mock
+    async def test_success_without_failures_skips_redis(self):
+        respx.post("https://down.example.com/hook").mock(
+            return_value=httpx.Response(200)
+        )
+        self.breaker.check = AsyncMock(return_value=(None, False))
+
+        await self.engine.send(self.webhook, b"{}")
+
+        self.breaker.record_success.assert_not_awaited()
+
+    @respx.mock
+    async def test_rate_limited_request_is_deferred(self):
+        route = respx.post("https://down.example.com/hook")
+        limiter = MagicMock()
+        limiter.retry_at = AsyncMock(
+            return_value=datetime(2025, 1, 1, tzinfo=timezone.utc)
+        )
+        self.engine.rate_limiter = limiter
+        self.breaker.check = AsyncMock(return_value=(None, False))
+
+        result = await self.engine.send(self.webhook, b"{}")
+
+        self.assertTrue(result.deferred)
+        self.assertEqual(route.call_count, 0)
+
+    @respx.mock
+    async def test_open_circuit_takes_no_rate_limit_token(self):
+        limiter = MagicMock()
+        limiter.retry_at = AsyncMock(return_value=None)
+        self.engine.rate_limiter = limiter
+        self.breaker.check = AsyncMock(
+            return_value=(datetime(2025, 1, 1, tzinfo=timezone.utc), True)
+        )
+
+        result = await self.engine.send(self.webhook, b"{}")
+
+        self.assertTrue(result.deferred)
+        limiter.retry_at.assert_not_awaited()
@@ -0,0 +1,84 @@
+import asyncio
+from unittest import IsolatedAsyncioTestCase
+
+from app.webhook.concurrency import AdaptiveLimit
+from app.webhook.delivery import DeliveryEngine
+
+
+class TestAdaptiveLimit(IsolatedAsyncioTestCase):
+    def test_fast_responses_raise_the_limit(self):
+        limit = AdaptiveLimit(initial_limit=4, min_limit=1, max_limit=6)
+
+        for _ in range(20):
+            limit.in_flight = int(limit.limit)
+            limit.release(0.05)
+
+        self.assertEqual(limit.limit, 6)
+
+    def test_limit_grows_by_one_per_round(self):
+        """A round of ``limit`` requests in time raises the limit by about one."""
+        limit = AdaptiveLimit(initial_limit=10, min_limit=1, max_limit=100)
+
+        for _ in range(10):
+            limit.in_flight = 10
+            limit.release(0.05)
+
+        self.assertAlmostEqual(limit.limit, 11, delta=0.1)
+
+    def test_slow_responses_lower_the_limit(self):
+        limit = AdaptiveLimit(initial_limit=10, min_limit=1, max_limit=20)
+        limit.in_flight = 1
+        limit.release(0.05)
+        before = limit.limit
+
+        limit.in_flight = 1
+        limit.release(1.0)
+
+        self.assertAlmostEqual(limit.limit, before * 0.9)
+
+    def test_failures_back_off_to_the_minimum(self):
+        limit = AdaptiveLimit(initial_limit=4, min_limit=2, max_limit=10)
+
+        for _ in range(20):
+            limit.in_flight = 1
+            limit.release(0.05, dropped=True)
+
+        self.assertEqual(limit.limit, 2)
+        self.assertIsNone(limit.baseline_latency)
+
+    def test_idle_limit_does_not_grow(self):
+        limit = AdaptiveLimit(initial_limit=8, min_limit=1, max_limit=20)
+
+        limit.in_flight = 1
+        limit.release(0.05)
+
+        self.assertEqual(limit.limit, 8)
+
+    async def test_acquire_waits_for_a_free_slot(self):
+        limit = AdaptiveLimit(initial_limit=1, min_limit=1, max_limit=1)
+        await limit.acquire()
+
+        waiter = asyncio.create_task(limit.acquire())
+        await asyncio.sleep(0)
+        self.assertFalse(waiter.done())
+
+        limit.release(0.05)
+        await asyncio.wait_for(waiter, timeout=1)
+        self.assertEqual(limit.in_flight, 1)
+
+
+class TestSeededLimits(IsolatedAsyncioTestCase):
+    def test_hosts_start_from_recorded_latency(self):
+        engine = DeliveryEngine(max_connections_per_host=32)
+        engine.seed_host_limits(
+            [("fast.example.com", 50), ("usual.example.com", 200), ("slow.io", 800)]
+        )
+
+        fast = engine._host_limit("fast.example.com")
+        slow = engine._host_limit("slow.io")
+        unknown = engine._host_limit("new.example.com")
+
+        self.assertEqual(fast.baseline_latency, 0.05)
+        self.assertGreater(fast.limit, unknown.limit)
+        self.assertLess(slow.limit, unknown.limit)
+        self.assertIsNone(unknown.baseline_latency)
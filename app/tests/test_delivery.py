@@ -0,0 +1,146 @@
+import hashlib
+import hmac
+import tempfile
+import uuid
+from unittest import IsolatedAsyncioTestCase
+from unittest.mock import patch
+
+import httpx
+import orjson
+import respx
+
+from app.models import Webhook
+from app.webhook.blobstore import CLAIM_CHECK_KEY, LocalBlobStore
+from app.webhook.delivery import SIGNATURE_HEADER, DeliveryEngine, encode_payload
+
+
+class TestDeliveryEngine(IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:
+        self.engine = DeliveryEngine(timeout=1.0)
+        self.payload = {"event_id": "test_123", "event_type": "subscriber.created"}
+
+    async def asyncTearDown(self) -> None:
+        await self.engine.aclose()
+
+    @respx.mock
+    async def test_deliver_fans_out_to_all_webhooks(self):
+        """Every webhook gets the payload and results keep the input order."""
+        ok = respx.post("https://ok.example.com/hook").mock(
+            return_value=httpx.Response(201, text="created")
+        )
+        failing = respx.post("https://down.example.com/hook").mock(
+            return_value=httpx.Response(500, text="boom")
+        )
+        webhooks = [
+            Webhook(id=uuid.uuid4(), url="https://ok.example.com/hook"),
+            Webhook(id=uuid.uuid4(), url="https://down.example.com/hook"),
+        ]
+
+        results = await self.engine.deliver(webhooks, self.payload)
+
+        self.assertEqual([r.webhook_id for r in results], [w.id for w in webhooks])
+        self.assertTrue(results[0].success)
+        self.assertEqual(results[0].status_code, 201)
+        self.assertFalse(results[1].success)
+        self.assertEqual(results[1].response_body, "boom")
+        self.assertEqual(ok.call_count, 1)
+        self.assertEqual(failing.call_count, 1)
+
+    @respx.mock
+    async def test_deliver_reuses_client(self):
+        """The pooled client survives across events."""
+        respx.post("https://ok.example.com/hook").mock(return_value=httpx.Response(200))
+        webhook = Webhook(id=uuid.uuid4(), url="https://ok.example.com/hook")
+
+        await self.engine.deliver([webhook], self.payload)
+        client = self.engine.client
+        await self.engine.deliver([webhook], self.payload)
+
+        self.assertIs(self.engine.client, client)
+
+    @respx.mock
+    async def test_send_network_error(self):
+        """Transport errors become failed results instead of exceptions."""
+        respx.post("https://down.example.com/hook").mock(
+            side_effect=httpx.ConnectError("connection refused")
+        )
+        webhook = Webhook(id=uuid.uuid4(), url="https://down.example.com/hook")
+
+        result = await self.engine.send(webhook, encode_payload(self.payload))
+
+        self.assertFalse(result.success)
+        self.assertIsNone(result.status_code)
+        self.assertIn("connection refused", result.response_body)
+
+    @respx.mock
+    async def test_payload_encoded_once_and_signed_per_webhook(self):
+        """Every webhook gets the same bytes, signed with its own secret."""
+        route = respx.post("https://ok.example.com/hook").mock(
+            return_value=httpx.Response(200)
+        )
+        webhooks = [
+            Webhook(id=uuid.uuid4(), url="https://ok.example.com/hook", secret="a"),
+            Webhook(id=uuid.uuid4(), url="https://ok.example.com/hook", secret="b"),
+            Webhook(id=uuid.uuid4(), url="https://ok.example.com/hook"),
+        ]
+
+        with patch(
+            "app.webhook.delivery.encode_payload", wraps=encode_payload
+        ) as encode:
+            await self.engine.deliver(webhooks, self.payload)
+
+        encode.assert_called_once_with(self.payload)
+        requests = [call.request for call in route.calls]
+        body = orjson.dumps(self.payload)
+        self.assertTrue(all(request.content == body for request in requests))
+        signatures = {request.headers.get(SIGNATURE_HEADER) for request in requests}
+        self.assertEqual(
+            signatures,
+            {
+                "sha256=" + hmac.new(secret, body, hashlib.sha256).hexdigest()
+                for secret in (b"a", b"b")
+            }
+            | {None},
+        )
+
+    @respx.mock
+    async def test_claim_check_payload_is_streamed_from_the_blob_store(self):
+        """The data is read from the store and the body signed as sent."""
+        route = respx.post("https://ok.example.com/hook").mock(
+            return_value=httpx.Response(200)
+        )
+        data = {"subscribers": ["x" * 100] * 2000}
+        payload = {
+            "event_id": "test_123",
+            "event_type": "segment.exported",
+            "data": {CLAIM_CHECK_KEY: "events/2026/10/18/a.json", "size": 0},
+        }
+        webhooks = [
+            Webhook(id=uuid.uuid4(), url="https://ok.example.com/hook", secret="a"),
+            Webhook(id=uuid.uuid4(), url="https://ok.example.com/hook", secret="b"),
+        ]
+        with tempfile.TemporaryDirectory() as root:
+            store = LocalBlobStore(root)
+            encoded = orjson.dumps(data)
+            store.put("events/2026/10/18/a.json", encoded)
+            payload["data"]["size"] = len(encoded)
+
+            with (
+                patch("app.webhook.delivery.get_blob_store", return_value=store),
+                patch("app.webhook.blobstore.config.WEBHOOK_BLOB_THRESHOLD_BYTES", 1),
+            ):
+                results = await self.engine.deliver(webhooks, payload)
+
+        self.assertTrue(all(result.success for result in results))
+        body = orjson.dumps({**payload, "data": data})
+        requests = [call.request for call in route.calls]
+        for request in requests:
+            self.assertEqual(request.headers["Content-Length"], str(len(body)))
+            self.assertEqual(await request.aread(), body)
+        self.assertEqual(
+            {request.headers[SIGNATURE_HEADER] for request in requests},
+            {
+                "sha256=" + hmac.new(secret, body, hashlib.sha256).hexdigest()
+                for secret in (b"a", b"b")
+            },
+        )
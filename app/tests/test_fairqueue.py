@@ -0,0 +1,96 @@
+import uuid
+from unittest import IsolatedAsyncioTestCase, TestCase
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from app.webhook.fairqueue import DeficitRoundRobin, FairDispatcher, FairQueue
+
+
+class TestDeficitRoundRobin(TestCase):
+    def test_backlog_does_not_buy_a_larger_share(self):
+        drr = DeficitRoundRobin(quantum=10)
+
+        plan = drr.schedule({"whale": 100000, "small": 5, "other": 50}, budget=25)
+
+        self.assertEqual(plan, {"whale": 10, "small": 5, "other": 10})
+
+    def test_turn_cut_short_is_resumed(self):
+        drr = DeficitRoundRobin(quantum=10)
+
+        first = drr.schedule({"a": 100, "b": 100}, budget=15)
+        second = drr.schedule({"a": 100, "b": 85}, budget=10)
+
+        self.assertEqual(first, {"a": 10, "b": 5})
+        # b finishes its turn before a is served again
+        self.assertEqual(second, {"b": 5, "a": 5})
+
+    def test_weights_scale_the_share(self):
+        drr = DeficitRoundRobin(quantum=10)
+
+        plan = drr.schedule({"a": 100, "b": 100}, budget=30, weights={"a": 2})
+
+        self.assertEqual(plan, {"a": 20, "b": 10})
+
+    def test_drained_tenants_leave_the_rotation(self):
+        drr = DeficitRoundRobin(quantum=10)
+        drr.schedule({"a": 3, "b": 100}, budget=100)
+
+        plan = drr.schedule({"b": 100}, budget=20)
+
+        self.assertEqual(plan, {"b": 20})
+        self.assertNotIn("a", drr._deficits)
+
+    def test_no_budget(self):
+        drr = DeficitRoundRobin(quantum=10)
+
+        self.assertEqual(drr.schedule({"a": 100}, budget=0), {})
+
+
+class TestFairQueue(IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.cache = MagicMock()
+        self.pipe = MagicMock()
+        self.pipe.execute = AsyncMock()
+        self.cache.pipeline.return_value.__aenter__.return_value = self.pipe
+        patcher = patch("app.webhook.fairqueue.get_redis", return_value=self.cache)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    async def test_enqueue_per_tenant(self):
+        broker = MagicMock()
+        broker.build_message.return_value = ("task-id", "message")
+        user_id = uuid.uuid4()
+
+        await FairQueue(broker).enqueue(
+            [("webhooks_priority", str(user_id), "task", ["event"])]
+        )
+
+        broker.build_message.assert_called_once_with(
+            "task", ["event"], "webhooks_priority"
+        )
+        self.pipe.lpush.assert_called_once_with(
+            f"fairq:webhooks_priority:{user_id}", "message"
+        )
+        self.pipe.sadd.assert_called_once_with(
+            "fairq:webhooks_priority:active", str(user_id)
+        )
+
+    async def test_dispatch_tops_up_celery_queue(self):
+        self.cache.smembers = AsyncMock(return_value={b"whale", b"small", b"gone"})
+        # Celery queue depth, then the backlog of gone, small and whale
+        self.pipe.execute = AsyncMock(side_effect=[[80, 0, 3, 5000], [3, 17, 0]])
+        dispatcher = FairDispatcher(lanes=["webhooks"], queue_depth=100)
+        dispatcher.schedulers["webhooks"].quantum = 10
+
+        moved = await dispatcher.dispatch("webhooks")
+
+        self.assertEqual(moved, 20)
+        moves = [(call.args[2], call.args[5]) for call in self.pipe.eval.call_args_list]
+        self.assertEqual(
+            moves,
+            [
+                ("fairq:webhooks:small", 3),
+                # Alone after small drained, whale takes the rest of the budget
+                ("fairq:webhooks:whale", 17),
+                ("fairq:webhooks:gone", 0),
+            ],
+        )
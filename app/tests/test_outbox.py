@@ -0,0 +1,88 @@
+import uuid
+from unittest import IsolatedAsyncioTestCase
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from app.db.base_model import now
+from app.models import WebhookEvent
+from app.webhook.webhook_notifier import (
+    WebhookNotifier,
+    process_webhook_event,
+    process_webhook_event_high_priority,
+)
+
+
+class TestOutbox(IsolatedAsyncioTestCase):
+    def test_stage_event(self):
+        """Staging only adds the event to the caller's transaction."""
+        notifier = WebhookNotifier()
+        db = MagicMock()
+
+        event_id = notifier.stage_event(
+            db, "subscriber.created", uuid.uuid4(), {"key": "value"}
+        )
+
+        event = db.add.call_args.args[0]
+        self.assertEqual(event.event_id, event_id)
+        self.assertIsNone(event.published_at)
+        db.commit.assert_not_called()
+
+    async def test_publish_outbox(self):
+        notifier = WebhookNotifier()
+        whale, small = uuid.uuid4(), uuid.uuid4()
+        events = [
+            WebhookEvent(
+                id=uuid.uuid4(),
+                event_id=str(uuid.uuid4()),
+                event_type="subscriber.created",
+                user_id=user_id,
+                data={},
+                created_at=now(),
+            )
+            for user_id in (small, whale)
+        ]
+        db = MagicMock()
+        db.execute = AsyncMock(return_value=MagicMock())
+        db.execute.return_value.scalars.return_value.all.return_value = events
+        db.commit = AsyncMock()
+        notifier._get_subscriber_counts_async = AsyncMock(
+            return_value={whale: 500000, small: 10}
+        )
+
+        with patch(
+            "app.webhook.webhook_notifier.fair_queue.enqueue",
+            new_callable=AsyncMock,
+        ) as enqueue:
+            published = await notifier.publish_outbox(db, batch_size=100)
+
+        self.assertEqual(published, 2)
+        enqueue.assert_awaited_once()
+        tasks = enqueue.call_args.args[0]
+        self.assertEqual(
+            [(queue, user_id, name) for queue, user_id, name, _ in tasks],
+            [
+                (
+                    "webhooks_priority",
+                    str(small),
+                    process_webhook_event_high_priority.name,
+                ),
+                ("webhooks", str(whale), process_webhook_event.name),
+            ],
+        )
+        # select batch, then mark it published within its partitions
+        self.assertEqual(db.execute.await_count, 2)
+        self.assertIn(
+            "webhook_events.created_at IN", str(db.execute.await_args.args[0])
+        )
+        db.commit.assert_awaited_once()
+
+    async def test_publish_outbox_empty(self):
+        notifier = WebhookNotifier()
+        db = MagicMock()
+        db.execute = AsyncMock(return_value=MagicMock())
+        db.execute.return_value.scalars.return_value.all.return_value = []
+        db.rollback = AsyncMock()
+
+        published = await notifier.publish_outbox(db, batch_size=100)
+
+        self.assertEqual(published, 0)
+        db.rollback.assert_awaited_once()
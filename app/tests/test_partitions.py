@@ -0,0 +1,109 @@
+from datetime import date, datetime, timezone
+from unittest.mock import MagicMock, patch
+
+from app.db.partitions import (
+    drop_expired_partitions,
+    ensure_partitions,
+    maintain_partitions,
+    parse_bound,
+)
+
+
+def executed(conn) -> list:
+    return [str(call.args[0]) for call in conn.execute.call_args_list]
+
+
+def test_parse_bound():
+    assert parse_bound(
+        "FOR VALUES FROM ('2026-10-18 00:00:00+00') TO ('2026-10-19 00:00:00+00')"
+    ) == datetime(2026, 10, 19, tzinfo=timezone.utc)
+    assert parse_bound(
+        "FOR VALUES FROM (MINVALUE) TO ('2026-10-19 02:00:00+02')"
+    ) == datetime(2026, 10, 19, tzinfo=timezone.utc)
+    assert parse_bound("DEFAULT") is None
+
+
+@patch("app.db.partitions.partitions")
+def test_ensure_partitions_skips_covered_days(mock_partitions):
+    # Rows before partitioning are kept in one partition up to the 19th
+    mock_partitions.return_value = [
+        ("webhook_events_legacy", datetime(2026, 10, 19, tzinfo=timezone.utc)),
+        ("webhook_events_p20261019", datetime(2026, 10, 20, tzinfo=timezone.utc)),
+    ]
+    conn = MagicMock()
+
+    created = ensure_partitions(conn, "webhook_events", date(2026, 10, 18), 3)
+
+    assert created == ["webhook_events_p20261020", "webhook_events_p20261021"]
+    assert executed(conn)[0] == (
+        "CREATE TABLE IF NOT EXISTS webhook_events_p20261020 "
+        "PARTITION OF webhook_events "
+        "FOR VALUES FROM ('2026-10-20T00:00:00+00:00') "
+        "TO ('2026-10-21T00:00:00+00:00')"
+    )
+
+
+@patch("app.db.partitions.partitions")
+def test_ensure_partitions_moves_rows_out_of_default(mock_partitions):
+    mock_partitions.return_value = [
+        ("webhook_events_default", None),
+        ("webhook_events_p20261018", datetime(2026, 10, 19, tzinfo=timezone.utc)),
+    ]
+    conn = MagicMock()
+    # Maintenance stalled, rows of the 10th went to the DEFAULT partition
+    conn.execute.return_value.all.return_value = [(date(2026, 10, 10),)]
+
+    created = ensure_partitions(conn, "webhook_events", date(2026, 10, 18), 2)
+
+    assert created == [
+        "webhook_events_p20261010",
+        "webhook_events_p20261019",
+        "webhook_events_p20261020",
+    ]
+    statements = executed(conn)
+    assert statements[1].startswith("CREATE TABLE webhook_events_p20261010 (LIKE")
+    assert "DELETE FROM webhook_events_default" in statements[2]
+    assert statements[3] == (
+        "ALTER TABLE webhook_events ATTACH PARTITION webhook_events_p20261010 "
+        "FOR VALUES FROM ('2026-10-10T00:00:00+00:00') "
+        "TO ('2026-10-11T00:00:00+00:00')"
+    )
+    assert statements[4].startswith(
+        "CREATE TABLE IF NOT EXISTS webhook_events_p20261019 PARTITION OF"
+    )
+
+
+@patch("app.db.partitions.partitions")
+def test_drop_expired_partitions(mock_partitions):
+    mock_partitions.return_value = [
+        ("webhook_deliveries_legacy", datetime(2026, 9, 1, tzinfo=timezone.utc)),
+        ("webhook_deliveries_p20260918", datetime(2026, 9, 19, tzinfo=timezone.utc)),
+        ("webhook_deliveries_p20260919", datetime(2026, 9, 20, tzinfo=timezone.utc)),
+    ]
+    conn = MagicMock()
+
+    dropped = drop_expired_partitions(
+        conn, "webhook_deliveries", datetime(2026, 9, 19, tzinfo=timezone.utc)
+    )
+
+    assert dropped == ["webhook_deliveries_legacy", "webhook_deliveries_p20260918"]
+    assert executed(conn) == [
+        "DROP TABLE webhook_deliveries_legacy",
+        "DROP TABLE webhook_deliveries_p20260918",
+    ]
+
+
+@patch("app.db.partitions.drop_expired_partitions", return_value=[])
+@patch("app.db.partitions.ensure_partitions", return_value=[])
+@patch("app.db.partitions.is_partitioned", side_effect=[True, False])
+def test_maintain_partitions_skips_plain_tables(_, mock_ensure, mock_drop):
+    conn = MagicMock()
+
+    maintain_partitions(
+        conn, today=date(2026, 10, 18), premake_days=7, retention_days=30
+    )
+
+    mock_ensure.assert_called_once_with(conn, "webhook_events", date(2026, 10, 18), 7)
+    mock_drop.assert_called_once_with(
+        conn, "webhook_events", datetime(2026, 9, 18, tzinfo=timezone.utc)
+    )
@@ -0,0 +1,65 @@
+import uuid
+from unittest import IsolatedAsyncioTestCase
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from redis.exceptions import ConnectionError
+
+from app.webhook.ratelimit import RateLimiter
+
+
+class TestRateLimiter(IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.limiter = RateLimiter(
+            host_rate=50, host_burst=100, webhook_rate=10, webhook_burst=20, max_wait=1
+        )
+        self.webhook_id = uuid.uuid4()
+        self.cache = MagicMock()
+        patcher = patch("app.webhook.ratelimit.get_redis", return_value=self.cache)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    async def test_takes_from_host_and_webhook_buckets(self):
+        self.cache.eval = AsyncMock(return_value=0)
+
+        retry_at = await self.limiter.retry_at("api.example.com", self.webhook_id)
+
+        self.assertIsNone(retry_at)
+        args = self.cache.eval.call_args.args
+        self.assertEqual(args[1], 2)
+        self.assertEqual(
+            args[2:4],
+            ("ratelimit:host:api.example.com", f"ratelimit:webhook:{self.webhook_id}"),
+        )
+        self.assertEqual(args[5:], (50, 100, 10, 20))
+
+    @patch("app.webhook.ratelimit.asyncio.sleep", new_callable=AsyncMock)
+    async def test_short_wait_is_slept_through(self, mock_sleep):
+        self.cache.eval = AsyncMock(side_effect=[200, 0])
+
+        retry_at = await self.limiter.retry_at("api.example.com", self.webhook_id)
+
+        self.assertIsNone(retry_at)
+        mock_sleep.assert_awaited_once_with(0.2)
+
+    @patch("app.webhook.ratelimit.asyncio.sleep", new_callable=AsyncMock)
+    async def test_long_wait_defers(self, mock_sleep):
+        self.cache.eval = AsyncMock(return_value=5000)
+
+        retry_at = await self.limiter.retry_at("api.example.com", self.webhook_id)
+
+        self.assertIsNotNone(retry_at)
+        mock_sleep.assert_not_awaited()
+
+    async def test_disabled_buckets_skip_redis(self):
+        limiter = RateLimiter(host_rate=0, webhook_rate=0)
+        self.cache.eval = AsyncMock()
+
+        self.assertIsNone(await limiter.retry_at("api.example.com", self.webhook_id))
+        self.cache.eval.assert_not_awaited()
+
+    async def test_redis_unavailable_allows_request(self):
+        self.cache.eval = AsyncMock(side_effect=ConnectionError("down"))
+
+        self.assertIsNone(
+            await self.limiter.retry_at("api.example.com", self.webhook_id)
+        )
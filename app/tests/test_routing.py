@@ -0,0 +1,59 @@
+import uuid
+from unittest import TestCase
+from unittest.mock import patch
+
+from app.webhook.routing import RoutingCache
+from app.webhook.schema import WebhookTarget
+
+
+class TestRoutingCache(TestCase):
+    def setUp(self):
+        self.cache = RoutingCache(maxsize=2, ttl=60)
+        self.user_id = uuid.uuid4()
+        self.targets = [WebhookTarget(id=uuid.uuid4(), url="https://example.com")]
+
+    def store(self, user_id, event_type):
+        self.cache.set(
+            user_id, event_type, self.targets, self.cache.generation(user_id)
+        )
+
+    def test_get_set(self):
+        self.assertIsNone(self.cache.get(self.user_id, "subscriber.created"))
+        self.store(self.user_id, "subscriber.created")
+        self.assertEqual(
+            self.cache.get(self.user_id, "subscriber.created"), self.targets
+        )
+
+    def test_ttl_expiry(self):
+        self.store(self.user_id, "subscriber.created")
+        with patch("app.webhook.routing.time.monotonic", return_value=1e12):
+            self.assertIsNone(self.cache.get(self.user_id, "subscriber.created"))
+
+    def test_lru_eviction(self):
+        self.store(self.user_id, "subscriber.created")
+        self.store(self.user_id, "subscriber.updated")
+        # Touch the oldest entry so the other one is evicted
+        self.cache.get(self.user_id, "subscriber.created")
+        self.store(self.user_id, "subscriber.deleted")
+
+        self.assertIsNotNone(self.cache.get(self.user_id, "subscriber.created"))
+        self.assertIsNone(self.cache.get(self.user_id, "subscriber.updated"))
+        self.assertIsNotNone(self.cache.get(self.user_id, "subscriber.deleted"))
+
+    def test_invalidate_user(self):
+        other_user = uuid.uuid4()
+        self.store(self.user_id, "subscriber.created")
+        self.store(other_user, "subscriber.created")
+
+        self.cache.invalidate_user(str(self.user_id))
+
+        self.assertIsNone(self.cache.get(self.user_id, "subscriber.created"))
+        self.assertIsNotNone(self.cache.get(other_user, "subscriber.created"))
+
+    def test_stale_load_is_not_stored(self):
+        """A lookup that started before an invalidation is discarded."""
+        generation = self.cache.generation(self.user_id)
+        self.cache.invalidate_user(str(self.user_id))
+        self.cache.set(self.user_id, "subscriber.created", self.targets, generation)
+
+        self.assertIsNone(self.cache.get(self.user_id, "subscriber.created"))
@@ -0,0 +1,87 @@
+import uuid
+from unittest import IsolatedAsyncioTestCase, TestCase
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from app.webhook.fairqueue import FairDispatcher
+from app.webhook.sharding import assign_shards, shard_of, shard_queue, tenant_queue
+from app.webhook.supervisor import Supervisor
+
+
+class TestSharding(TestCase):
+    def test_shard_of_is_stable(self):
+        user_id = uuid.uuid4()
+
+        self.assertEqual(shard_of(str(user_id), 64), shard_of(user_id, 64))
+        self.assertTrue(0 <= shard_of(user_id, 64) < 64)
+
+    def test_tenant_queue_without_shards(self):
+        self.assertEqual(tenant_queue("webhooks", "user", 0), "webhooks")
+        self.assertEqual(
+            tenant_queue("webhooks", "user", 8),
+            shard_queue("webhooks", shard_of("user", 8)),
+        )
+
+    def test_assign_shards_evenly(self):
+        self.assertEqual(assign_shards(5, [0, 2]), {0: [0, 2, 4], 2: [1, 3]})
+        self.assertEqual(assign_shards(5, []), {})
+
+
+class TestShardedDispatch(IsolatedAsyncioTestCase):
+    async def test_dispatch_to_shard_queues(self):
+        cache = MagicMock()
+        pipe = MagicMock()
+        cache.pipeline.return_value.__aenter__.return_value = pipe
+        tenants = ["a", "b"]
+        cache.smembers = AsyncMock(return_value={t.encode() for t in tenants})
+        queues = sorted({tenant_queue("webhooks", t, 4) for t in tenants})
+        # Depth of each shard queue, then the backlog of each tenant
+        pipe.execute = AsyncMock(side_effect=[[0] * len(queues) + [5, 5], [5, 5]])
+        dispatcher = FairDispatcher(lanes=["webhooks"], queue_depth=100, shards=4)
+
+        with patch("app.webhook.fairqueue.get_redis", return_value=cache):
+            moved = await dispatcher.dispatch("webhooks")
+
+        self.assertEqual(moved, 10)
+        destinations = {call.args[2]: call.args[3] for call in pipe.eval.call_args_list}
+        self.assertEqual(
+            destinations,
+            {f"fairq:webhooks:{t}": tenant_queue("webhooks", t, 4) for t in tenants},
+        )
+
+
+class TestSupervisor(TestCase):
+    def _child(self, alive=True, pid=100):
+        child = MagicMock()
+        child.is_alive.return_value = alive
+        child.pid = pid
+        return child
+
+    @patch("app.webhook.supervisor.requeue_sync", return_value=3)
+    def test_dead_worker_shards_move_until_restart(self, mock_requeue):
+        supervisor = Supervisor(processes=2, shards=4, restart_delay=60)
+        supervisor.children = {0: self._child(pid=100), 1: self._child(pid=101)}
+        supervisor.rebalance()
+        self.assertEqual(list(supervisor.owners), [0, 1, 0, 1])
+
+        supervisor.children[1].is_alive.return_value = False
+        supervisor.check()
+
+        self.assertEqual(list(supervisor.owners), [0, 0, 0, 0])
+        self.assertIn(1, supervisor.restarts)
+        self.assertTrue(mock_requeue.call_args.args[0].endswith(":101"))
+
+    @patch("app.webhook.supervisor.requeue_sync", return_value=0)
+    def test_restarted_worker_gets_shards_back(self, mock_requeue):
+        supervisor = Supervisor(processes=2, shards=4)
+        supervisor.children = {0: self._child()}
+        supervisor.restarts = {1: 0.0}
+
+        with patch.object(
+            supervisor,
+            "start_worker",
+            side_effect=lambda slot: supervisor.children.update({slot: self._child()}),
+        ):
+            supervisor.check()
+
+        self.assertEqual(supervisor.restarts, {})
+        self.assertEqual(list(supervisor.owners), [0, 1, 0, 1])
@@ -1,4 +1,11 @@
+import asyncio
+from datetime import timedelta
 from unittest import mock
+
+from sqlalchemy import func, select
+
+from app.core.security import create_access_token
+from app.models import Subscriber, WebhookEvent
 from app.tests.base import BaseTest, new_async_client
 
 
@@ -56,3 +63,193 @@ class TestSubscriber(BaseTest):
             "updated_at": None,
         }
         self.assertEqual(subscriber_data, expected_date)
+
+    async def create_subscribers(self, count: int):
+        for i in range(count):
+            await self.create_subscriber(f"sub{i}@example.com")
+
+    async def create_subscriber(self, email: str):
+        response = await self.client.post(
+            "/api/v1/subscribers", json={"email": email, "user_id": self.user["id"]}
+        )
+        self.assertEqual(response.status_code, 201)
+
+    def auth_headers(self):
+        token = create_access_token(self.user["id"], timedelta(minutes=5))
+        return {"Authorization": f"Bearer {token}"}
+
+    async def test_list_subscribers_by_cursor(self):
+        """Following next_cursor returns every subscriber once, oldest first."""
+        await self.create_subscribers(5)
+
+        response = await self.client.get(
+            "/api/v1/subscribers", params={"per_page": 2}, headers=self.auth_headers()
+        )
+        self.assertEqual(response.status_code, 200)
+        page = response.json()
+        self.assertEqual(page["total"], 5)
+        self.assertEqual(page["page"], 1)
+        emails = [item["email"] for item in page["items"]]
+
+        while page["next_cursor"]:
+            response = await self.client.get(
+                "/api/v1/subscribers",
+                params={"per_page": 2, "cursor": page["next_cursor"], "total": "none"},
+                headers=self.auth_headers(),
+            )
+            self.assertEqual(response.status_code, 200)
+            page = response.json()
+            self.assertIsNone(page["page"])
+            self.assertIsNone(page["total"])
+            self.assertTrue(page["has_prev"])
+            emails.extend(item["email"] for item in page["items"])
+
+        self.assertFalse(page["has_next"])
+        self.assertEqual(emails, [f"sub{i}@example.com" for i in range(5)])
+
+    async def test_list_subscribers_cached_total(self):
+        await self.create_subscribers(3)
+
+        response = await self.client.get(
+            "/api/v1/subscribers",
+            params={"search": "sub", "total": "cached"},
+            headers=self.auth_headers(),
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["total"], 3)
+
+    async def test_list_subscribers_invalid_cursor(self):
+        response = await self.client.get(
+            "/api/v1/subscribers",
+            params={"cursor": "not-a-cursor"},
+            headers=self.auth_headers(),
+        )
+
+        self.assertEqual(response.status_code, 400)
+
+    async def test_search_subscribers(self):
+        """Terms of any length match anywhere in the email, or its start with
+        search_prefix."""
+        await self.create_subscribers(3)
+        await self.create_subscriber("Xsub@example.com")
+
+        async def search(term, prefix=False):
+            response = await self.client.get(
+                "/api/v1/subscribers",
+                params={"search": term, "search_prefix": prefix},
+                headers=self.auth_headers(),
+            )
+            self.assertEqual(response.status_code, 200)
+            return sorted(item["email"] for item in response.json()["items"])
+
+        self.assertEqual(await search("UB1"), ["sub1@example.com"])
+        self.assertEqual(await search("xsu"), ["Xsub@example.com"])
+        self.assertEqual(
+            await search("su"),
+            [
+                "Xsub@example.com",
+                "sub0@example.com",
+                "sub1@example.com",
+                "sub2@example.com",
+            ],
+        )
+        self.assertEqual(await search("b1"), ["sub1@example.com"])
+        self.assertEqual(
+            await search("su", prefix=True),
+            ["sub0@example.com", "sub1@example.com", "sub2@example.com"],
+        )
+        # Wildcards are matched literally
+        self.assertEqual(await search("s_b"), [])
+
+    async def test_import_subscribers(self):
+        """New emails are imported with one event each, the rest is counted."""
+        await self.create_subscriber("sub0@example.com")
+        body = (
+            b'{"email": "sub0@example.com"}\n'
+            b'{"email": "sub1@example.com", "tags": ["vip"]}\n'
+            b'{"email": "sub1@example.com"}\n'
+            b"\n"
+            b'{"email": "invalid"}\n'
+            b'{"email": "sub2@example.com", "first_name": "Ada"}'
+        )
+
+        with mock.patch(
+            "app.subscriber.importer.config.SUBSCRIBER_IMPORT_PROCESSES", 0
+        ):
+            response = await self.client.post(
+                "/api/v1/subscribers/import",
+                content=body,
+                headers={**self.auth_headers(), "Content-Type": "application/x-ndjson"},
+            )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response.json(),
+            {
+                "received": 5,
+                "imported": 2,
+                "duplicates": 2,
+                "invalid": 1,
+                "errors": [{"line": 5, "error": mock.ANY}],
+            },
+        )
+        emails = await self.session.scalars(
+            select(Subscriber.email).where(Subscriber.source == "import")
+        )
+        self.assertEqual(sorted(emails), ["sub1@example.com", "sub2@example.com"])
+        events = await self.session.scalar(
+            select(func.count()).where(
+                WebhookEvent.event_type == "subscriber.created",
+                WebhookEvent.published_at.is_(None),
+            )
+        )
+        # The create above staged one event too
+        self.assertEqual(events, 3)
+
+    async def test_import_subscribers_unsupported_format(self):
+        response = await self.client.post(
+            "/api/v1/subscribers/import",
+            content=b"{}",
+            headers={**self.auth_headers(), "Content-Type": "application/json"},
+        )
+
+        self.assertEqual(response.status_code, 415)
+
+    async def test_export_subscribers(self):
+        await self.create_subscribers(3)
+
+        response = await self.client.get(
+            "/api/v1/subscribers/export",
+            params={"format": "csv"},
+            headers={**self.auth_headers(), "Accept-Encoding": "gzip"},
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers["content-encoding"], "gzip")
+        lines = response.text.splitlines()
+        self.assertTrue(lines[0].startswith("id,email,"))
+        self.assertEqual(
+            [line.split(",")[1] for line in lines[1:]],
+            [f"sub{i}@example.com" for i in range(3)],
+        )
+
+    async def test_create_duplicate_subscriber(self):
+        """Concurrent creates of one email make one subscriber and a 400."""
+        create_data = {"email": "fake@example.com", "user_id": self.user["id"]}
+
+        responses = await asyncio.gather(
+            *(
+                self.client.post("/api/v1/subscribers", json=create_data)
+                for _ in range(2)
+            )
+        )
+
+        self.assertEqual(
+            sorted(response.status_code for response in responses), [201, 400]
+        )
+        response = await self.client.post("/api/v1/subscribers", json=create_data)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(
+            response.json(), {"detail": "Subscriber with this email already exists"}
+        )
@@ -0,0 +1,100 @@
+import time
+import uuid
+from unittest import IsolatedAsyncioTestCase
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from app.subscriber.counter import SubscriberCounter, SubscriberTotals
+
+
+class TestSubscriberCounter(IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.counter = SubscriberCounter(ttl=60)
+        self.cache = MagicMock()
+        self.pipe = MagicMock()
+        self.pipe.execute = AsyncMock()
+        self.cache.pipeline.return_value.__aenter__.return_value = self.pipe
+        patcher = patch("app.subscriber.counter.get_redis", return_value=self.cache)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    async def test_get_many_cached(self):
+        """Cached counts are served without touching the database."""
+        user_id = uuid.uuid4()
+        self.cache.mget = AsyncMock(return_value=[b"150000"])
+        db = MagicMock()
+        db.execute = AsyncMock()
+
+        counts = await self.counter.get_many(db, [user_id])
+
+        self.assertEqual(counts, {user_id: 150000})
+        db.execute.assert_not_awaited()
+
+    async def test_get_many_recounts_missing(self):
+        """Missing counts are recounted in one query and cached."""
+        cached, missing, empty = uuid.uuid4(), uuid.uuid4(), uuid.uuid4()
+        self.cache.mget = AsyncMock(return_value=[b"3", None, None])
+        db = MagicMock()
+        db.execute = AsyncMock(return_value=MagicMock())
+        db.execute.return_value.all.return_value = [(missing, 42)]
+
+        counts = await self.counter.get_many(db, [cached, missing, empty])
+
+        self.assertEqual(counts, {cached: 3, missing: 42, empty: 0})
+        db.execute.assert_awaited_once()
+        self.pipe.set.assert_any_call(f"subscriber_count:{missing}", 42, ex=60, nx=True)
+        self.pipe.set.assert_any_call(f"subscriber_count:{empty}", 0, ex=60, nx=True)
+
+    async def test_incr_only_adjusts_cached_count(self):
+        user_id = uuid.uuid4()
+        self.cache.eval = AsyncMock()
+
+        await self.counter.incr(user_id)
+
+        script, numkeys, key, amount = self.cache.eval.call_args.args
+        self.assertIn("EXISTS", script)
+        self.assertEqual((numkeys, key, amount), (1, f"subscriber_count:{user_id}", 1))
+
+
+class TestSubscriberTotals(IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.totals = SubscriberTotals(refresh=60, ttl=3600)
+        self.cache = MagicMock()
+        self.cache.set = AsyncMock(return_value=True)
+        patcher = patch("app.subscriber.counter.get_redis", return_value=self.cache)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.db = MagicMock()
+        self.db.execute = AsyncMock(return_value=MagicMock())
+        self.db.execute.return_value.scalar_one.return_value = 42
+        self.key = self.totals.key(uuid.uuid4(), "example", None)
+
+    async def test_missing_total_is_counted_and_cached(self):
+        self.cache.get = AsyncMock(return_value=None)
+
+        total, recount = await self.totals.get(self.db, self.key, "count query")
+
+        self.assertEqual((total, recount), (42, False))
+        self.db.execute.assert_awaited_once_with("count query")
+        value = self.cache.set.call_args.args[1]
+        self.assertTrue(value.startswith("42:"))
+
+    async def test_fresh_total_is_served_from_cache(self):
+        self.cache.get = AsyncMock(return_value=f"7:{int(time.time())}".encode())
+
+        total, recount = await self.totals.get(self.db, self.key, "count query")
+
+        self.assertEqual((total, recount), (7, False))
+        self.db.execute.assert_not_awaited()
+
+    async def test_stale_total_is_served_and_recounted_once(self):
+        """A stale total is still served, one caller is asked to recount it."""
+        self.cache.get = AsyncMock(return_value=f"7:{int(time.time()) - 120}".encode())
+        self.cache.set = AsyncMock(side_effect=[True, None])
+
+        first = await self.totals.get(self.db, self.key, "count query")
+        second = await self.totals.get(self.db, self.key, "count query")
+
+        self.assertEqual(first, (7, True))
+        self.assertEqual(second, (7, False))
+        self.db.execute.assert_not_awaited()
+        self.cache.set.assert_any_await(f"{self.key}:recount", 1, ex=60, nx=True)
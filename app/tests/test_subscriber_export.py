@@ -0,0 +1,134 @@
+import csv
+import gzip
+import io
+import uuid
+import zlib
+from datetime import datetime, timezone
+from unittest import IsolatedAsyncioTestCase
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import orjson
+
+from app.subscriber.exporter import COLUMNS, accepts_gzip, export_subscribers
+from app.subscriber.importer import CSV, SubscriberImport, csv_row
+from app.subscriber.schema import ExportFormat
+
+
+def subscriber_row(i: int):
+    row = MagicMock()
+    values = {
+        "id": uuid.UUID(int=i),
+        "email": f"sub{i}@example.com",
+        "first_name": "Ada",
+        "last_name": None,
+        "status": "active",
+        "tags": ["vip", "customer"],
+        "custom_fields": {"plan": "pro"},
+        "source": "import",
+        "created_at": datetime(2026, 10, 18, tzinfo=timezone.utc),
+        "updated_at": None,
+    }
+    row.configure_mock(**values)
+    row._asdict.return_value = values
+    return row
+
+
+class TestSubscriberExport(IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.batches = [[subscriber_row(1), subscriber_row(2)], [subscriber_row(3)]]
+
+        async def partitions():
+            for batch in self.batches:
+                yield batch
+
+        result = MagicMock()
+        result.partitions = partitions
+        self.db = MagicMock()
+        self.db.stream = AsyncMock(return_value=result)
+        session = MagicMock()
+        session.return_value.__aenter__.return_value = self.db
+        patcher = patch("app.subscriber.exporter.AsyncSessionLocal", session)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    async def export(self, export_format: ExportFormat, gzip: bool = False):
+        return [
+            chunk
+            async for chunk in export_subscribers(uuid.uuid4(), export_format, gzip)
+        ]
+
+    async def test_export_ndjson_one_chunk_per_batch(self):
+        chunks = await self.export(ExportFormat.NDJSON)
+
+        self.assertEqual(len(chunks), 2)
+        lines = b"".join(chunks).splitlines()
+        self.assertEqual(
+            [orjson.loads(line)["email"] for line in lines],
+            ["sub1@example.com", "sub2@example.com", "sub3@example.com"],
+        )
+        self.assertEqual(orjson.loads(lines[0])["id"], str(uuid.UUID(int=1)))
+
+    async def test_export_csv_can_be_imported_back(self):
+        chunks = await self.export(ExportFormat.CSV)
+
+        reader = csv.reader(io.StringIO(b"".join(chunks).decode()))
+        header = next(reader)
+        self.assertEqual(header, [column.key for column in COLUMNS])
+        row = csv_row(header, next(reader))
+        self.assertEqual(
+            row,
+            {
+                "email": "sub1@example.com",
+                "first_name": "Ada",
+                "status": "active",
+                "tags": ["vip", "customer"],
+                "custom_fields": {"plan": "pro"},
+            },
+        )
+
+    async def test_export_csv_round_trips_multiline_fields(self):
+        first, second = self.batches[0]
+        first.first_name = "Ann\nMarie"
+        second.last_name = 'Line "one"\r\nline two'
+        body = b"".join(await self.export(ExportFormat.CSV))
+
+        async def stream():
+            # Chunks cut through the quoted fields
+            for i in range(0, len(body), 7):
+                yield body[i : i + 7]
+
+        importer = SubscriberImport(MagicMock(), uuid.uuid4(), CSV)
+        with patch("app.subscriber.importer.config.SUBSCRIBER_IMPORT_PROCESSES", 0):
+            records = [record async for record in importer._records(stream())]
+
+        self.assertEqual(importer.errors, [])
+        self.assertEqual(
+            [record[:3] for record in records],
+            [
+                ("sub1@example.com", "Ann\nMarie", None),
+                ("sub2@example.com", "Ada", 'Line "one"\r\nline two'),
+                ("sub3@example.com", "Ada", None),
+            ],
+        )
+
+    async def test_export_gzip(self):
+        chunks = await self.export(ExportFormat.NDJSON, gzip=True)
+
+        # Each batch is sent compressed as it is fetched, then the trailer
+        self.assertEqual(len(chunks), 3)
+        decompressor = zlib.decompressobj(wbits=16 + zlib.MAX_WBITS)
+        self.assertEqual(
+            decompressor.decompress(chunks[0]).splitlines()[0],
+            orjson.dumps(subscriber_row(1)._asdict()),
+        )
+
+        self.assertEqual(
+            gzip.decompress(b"".join(chunks)),
+            b"".join(await self.export(ExportFormat.NDJSON)),
+        )
+
+    def test_accepts_gzip(self):
+        self.assertTrue(accepts_gzip("gzip, deflate, br"))
+        self.assertTrue(accepts_gzip("br;q=1.0, gzip;q=0.8"))
+        self.assertFalse(accepts_gzip("identity"))
+        self.assertFalse(accepts_gzip(""))
@@ -0,0 +1,147 @@
+import uuid
+from unittest import IsolatedAsyncioTestCase
+from unittest.mock import MagicMock, patch
+
+import orjson
+from fastapi import HTTPException
+
+from app.subscriber.importer import (
+    CSV,
+    MAX_LINE_BYTES,
+    NDJSON,
+    SubscriberImport,
+    get_import_pool,
+    iter_lines,
+    iter_records,
+    shutdown_import_pool,
+    validate_lines,
+)
+
+
+async def stream(*chunks: bytes):
+    for chunk in chunks:
+        yield chunk
+
+
+class TestSubscriberImport(IsolatedAsyncioTestCase):
+    async def test_lines_split_across_chunks(self):
+        lines = [line async for line in iter_lines(stream(b"a\nb", b"c\n", b"d"))]
+
+        self.assertEqual(lines, [b"a", b"bc", b"d"])
+
+    async def test_long_lines_are_rejected(self):
+        with self.assertRaises(HTTPException) as raised:
+            async for _ in iter_lines(stream(b"x" * (MAX_LINE_BYTES + 1))):
+                pass
+
+        self.assertEqual(raised.exception.status_code, 400)
+
+    async def test_csv_records_span_quoted_newlines(self):
+        body = (
+            b'email,first_name\na@example.com,"Ann\nMarie"\n\nb@example.com,"""Bo"""\n'
+        )
+
+        records = [record async for record in iter_records(CSV, stream(body))]
+
+        self.assertEqual(
+            records,
+            [
+                (1, b"email,first_name"),
+                (2, b'a@example.com,"Ann\nMarie"'),
+                (4, b""),
+                (5, b'b@example.com,"""Bo"""'),
+            ],
+        )
+
+    async def test_unterminated_quotes_are_rejected(self):
+        body = b'email\n"a@example.com\n' + b"x\n" * MAX_LINE_BYTES
+
+        with self.assertRaises(HTTPException) as raised:
+            async for _ in iter_records(CSV, stream(body)):
+                pass
+
+        self.assertEqual(raised.exception.status_code, 400)
+
+    def test_validate_ndjson_lines(self):
+        user_id = uuid.uuid4()
+        lines = [
+            orjson.dumps({"email": "a@example.com", "tags": ["vip"]}),
+            b"",
+            b"{not json",
+            orjson.dumps({"email": "not an email"}),
+            orjson.dumps(["a@example.com"]),
+            # Rows of another user are imported for the importing one
+            orjson.dumps({"email": "b@example.com", "user_id": str(uuid.uuid4())}),
+        ]
+
+        records, errors = validate_lines(
+            NDJSON, None, user_id, list(enumerate(lines, 10))
+        )
+
+        self.assertEqual(
+            records,
+            [
+                ("a@example.com", None, None, '["vip"]', "{}", "active"),
+                ("b@example.com", None, None, "[]", "{}", "active"),
+            ],
+        )
+        self.assertEqual([line for line, _ in errors], [12, 13, 14])
+        self.assertIn("email", errors[1][1])
+
+    def test_validate_csv_lines(self):
+        header = ["email", "first_name", "tags", "plan"]
+        lines = [b'a@example.com,"Ada, Countess",vip; customer,pro\r', b",Bob,,"]
+
+        records, errors = validate_lines(
+            CSV, header, uuid.uuid4(), list(enumerate(lines, 2))
+        )
+
+        self.assertEqual(
+            records,
+            [
+                (
+                    "a@example.com",
+                    "Ada, Countess",
+                    None,
+                    '["vip","customer"]',
+                    '{"plan":"pro"}',
+                    "active",
+                )
+            ],
+        )
+        self.assertEqual(errors[0][0], 3)
+
+    async def test_batches_are_validated_in_order(self):
+        """Records keep the order of the file and errors their line numbers."""
+        importer = SubscriberImport(MagicMock(), uuid.uuid4(), CSV)
+        body = b"email\n" + b"".join(
+            f"sub{i}@example.com\n".encode() if i % 3 else b"invalid\n"
+            for i in range(10)
+        )
+
+        with (
+            patch("app.subscriber.importer.config.SUBSCRIBER_IMPORT_BATCH_SIZE", 4),
+            patch("app.subscriber.importer.config.SUBSCRIBER_IMPORT_PROCESSES", 0),
+            patch("app.subscriber.importer.config.SUBSCRIBER_IMPORT_MAX_ERRORS", 2),
+        ):
+            records = [record async for record in importer._records(stream(body))]
+
+        self.assertEqual(
+            [record[0] for record in records],
+            [f"sub{i}@example.com" for i in range(10) if i % 3],
+        )
+        self.assertEqual((importer.received, importer.invalid), (10, 4))
+        self.assertEqual([error.line for error in importer.errors], [2, 5])
+
+    def test_shutdown_import_pool(self):
+        with patch("app.subscriber.importer.config.SUBSCRIBER_IMPORT_PROCESSES", 1):
+            pool = get_import_pool()
+            self.assertIs(get_import_pool(), pool)
+
+            shutdown_import_pool()
+
+            with self.assertRaises(RuntimeError):
+                pool.submit(print)
+            replacement = get_import_pool()
+            self.assertIsNot(replacement, pool)
+            shutdown_import_pool()
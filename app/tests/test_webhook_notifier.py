@@ -1,14 +1,29 @@
 from unittest import mock
 import uuid
-from unittest.mock import MagicMock, patch
-from app.webhook.webhook_notifier import WebhookNotifier
+from datetime import datetime, timedelta, timezone
+from unittest.mock import AsyncMock, MagicMock, patch
+from sqlalchemy.dialects import postgresql
+from app.models import Webhook, WebhookDelivery
+from app.webhook.routing import RoutingCache
+from app.webhook.schema import DeliveryResult, WebhookTarget
+from app.webhook.webhook_notifier import (
+    WebhookNotifier,
+    _apply_delivery_result,
+    _delivery_outcome,
+    _get_webhook_targets,
+    _event_payloads,
+    _process_webhook_event_impl,
+    _record_delivery_outcomes,
+    _retry_requests,
+)
 
 
+@patch("app.webhook.webhook_notifier.fair_queue")
 @patch("app.webhook.webhook_notifier.SessionLocal")
 @patch("app.webhook.webhook_notifier.process_webhook_event")
 @patch("app.webhook.webhook_notifier.process_webhook_event_high_priority")
 def test_publish_event_low_priority(
-    mock_high_priority_task, mock_low_priority_task, mock_session
+    mock_high_priority_task, mock_low_priority_task, mock_session, mock_fair_queue
 ):
     # Arrange
     notifier = WebhookNotifier()
@@ -17,7 +32,6 @@ def test_publish_event_low_priority(
     notifier._get_subscriber_count = MagicMock(
         return_value=500000
     )  # High-subscriber account
-    notifier._calculate_delay = MagicMock(return_value=10)
 
     event_type = "test_event"
     user_id = uuid.uuid4()
@@ -27,10 +41,16 @@ def test_publish_event_low_priority(
         notifier.publish_event(event_type, user_id, data)
 
     # Assert
-    mock_low_priority_task.apply_async.assert_called_once_with(
-        args=[mock.ANY, event_type, user_id, data],
-        queue="webhooks",
-        countdown=10,
+    event = mock_db.add.call_args.args[0]
+    mock_fair_queue.enqueue_sync.assert_called_once_with(
+        [
+            (
+                "webhooks",
+                str(user_id),
+                mock_low_priority_task.name,
+                [mock.ANY, event_type, user_id, data, event.created_at.isoformat()],
+            )
+        ]
     )
     mock_high_priority_task.apply_async.assert_not_called()
     mock_db.add.assert_called_once()
@@ -38,11 +58,12 @@ def test_publish_event_low_priority(
     mock_db.close.assert_called_once()
 
 
+@patch("app.webhook.webhook_notifier.fair_queue")
 @patch("app.webhook.webhook_notifier.SessionLocal")
 @patch("app.webhook.webhook_notifier.process_webhook_event")
 @patch("app.webhook.webhook_notifier.process_webhook_event_high_priority")
 def test_publish_event_high_priority(
-    mock_high_priority_task, mock_low_priority_task, mock_session
+    mock_high_priority_task, mock_low_priority_task, mock_session, mock_fair_queue
 ):
     # Arrange
     notifier = WebhookNotifier()
@@ -60,11 +81,368 @@ def test_publish_event_high_priority(
     notifier.publish_event(event_type, user_id, data)
 
     # Assert
-    mock_high_priority_task.apply_async.assert_called_once_with(
-        args=[mock.ANY, event_type, user_id, data],
-        queue="webhooks_priority",
+    mock_fair_queue.enqueue_sync.assert_called_once_with(
+        [
+            (
+                "webhooks_priority",
+                str(user_id),
+                mock_high_priority_task.name,
+                [mock.ANY, event_type, user_id, data, mock.ANY],
+            )
+        ]
     )
     mock_low_priority_task.apply_async.assert_not_called()
     mock_db.add.assert_called_once()
     mock_db.commit.assert_called_once()
     mock_db.close.assert_called_once()
+
+
+def test_apply_delivery_result_schedules_retry():
+    delivery = WebhookDelivery(attempts=0)
+    attempted_at = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    result = DeliveryResult(
+        webhook_id=uuid.uuid4(),
+        success=False,
+        status_code=500,
+        attempted_at=attempted_at,
+    )
+
+    _apply_delivery_result(delivery, result)
+
+    assert delivery.status == "failed"
+    assert delivery.attempts == 1
+    assert delivery.next_attempt == attempted_at + timedelta(seconds=1)
+
+
+def test_apply_delivery_result_retries_exhausted():
+    delivery = WebhookDelivery(attempts=5)
+    result = DeliveryResult(
+        webhook_id=uuid.uuid4(),
+        success=False,
+        status_code=500,
+        attempted_at=datetime(2025, 1, 1, tzinfo=timezone.utc),
+    )
+
+    _apply_delivery_result(delivery, result)
+
+    assert delivery.status == "failed"
+    assert delivery.attempts == 6
+    assert delivery.next_attempt is None
+
+
+def test_apply_delivery_result_delivered():
+    delivery = WebhookDelivery(attempts=1, next_attempt=datetime.now(timezone.utc))
+    result = DeliveryResult(
+        webhook_id=uuid.uuid4(),
+        success=True,
+        status_code=200,
+        attempted_at=datetime(2025, 1, 1, tzinfo=timezone.utc),
+    )
+
+    _apply_delivery_result(delivery, result)
+
+    assert delivery.status == "delivered"
+    assert delivery.next_attempt is None
+
+
+def test_apply_delivery_result_deferred():
+    retry_at = datetime(2025, 1, 1, 0, 0, 30, tzinfo=timezone.utc)
+    delivery = WebhookDelivery(attempts=2, status="failed")
+    result = DeliveryResult(
+        webhook_id=uuid.uuid4(),
+        success=False,
+        attempted_at=datetime(2025, 1, 1, tzinfo=timezone.utc),
+        deferred=True,
+        retry_at=retry_at,
+    )
+
+    _apply_delivery_result(delivery, result)
+
+    assert delivery.status == "deferred"
+    assert delivery.attempts == 2
+    assert delivery.next_attempt == retry_at
+
+
+@patch("app.webhook.webhook_notifier.get_routing_cache", return_value=RoutingCache())
+@patch("app.webhook.webhook_notifier.get_delivery_engine")
+@patch("app.webhook.webhook_notifier.SessionLocal")
+def test_failed_webhook_does_not_retry_event(mock_session, mock_get_engine, _):
+    # Arrange
+    mock_db = MagicMock()
+    mock_session.return_value = mock_db
+    webhooks = [
+        Webhook(id=uuid.uuid4(), url="https://down.example.com"),
+        Webhook(id=uuid.uuid4(), url="https://ok.example.com"),
+    ]
+    mock_db.query.return_value.join.return_value.filter.return_value.all.return_value = webhooks
+    delivery_ids = [uuid.uuid4(), uuid.uuid4()]
+    mock_db.execute.return_value.all.return_value = [
+        (delivery_ids[0], webhooks[0].id),
+        (delivery_ids[1], webhooks[1].id),
+    ]
+    attempted_at = datetime.now(timezone.utc)
+    mock_get_engine.return_value.deliver = AsyncMock(
+        return_value=[
+            DeliveryResult(
+                webhook_id=webhooks[0].id,
+                success=False,
+                status_code=500,
+                attempted_at=attempted_at,
+            ),
+            DeliveryResult(
+                webhook_id=webhooks[1].id,
+                success=True,
+                status_code=200,
+                attempted_at=attempted_at,
+            ),
+        ]
+    )
+    task = MagicMock()
+
+    # Act
+    with patch("app.webhook.webhook_notifier._record_delivery_outcomes") as mock_record:
+        _process_webhook_event_impl(
+            task, str(uuid.uuid4()), "subscriber.created", uuid.uuid4(), {}
+        )
+
+    # Assert
+    task.retry.assert_not_called()
+    outcomes = mock_record.call_args.args[1]
+    assert [o["id"] for o in outcomes] == delivery_ids
+    assert [o["status"] for o in outcomes] == ["failed", "delivered"]
+    assert outcomes[0]["next_attempt"] == attempted_at + timedelta(seconds=1)
+    # Mark the event processed and insert its deliveries
+    assert mock_db.execute.call_count == 2
+    assert mock_db.commit.call_count == 2
+    mock_db.close.assert_called_once()
+
+
+@patch("app.webhook.webhook_notifier.get_routing_cache", return_value=RoutingCache())
+@patch("app.webhook.webhook_notifier.get_delivery_engine")
+@patch("app.webhook.webhook_notifier.SessionLocal")
+def test_existing_deliveries_are_not_resent(mock_session, mock_get_engine, _):
+    # Arrange
+    mock_db = MagicMock()
+    mock_session.return_value = mock_db
+    webhooks = [
+        Webhook(id=uuid.uuid4(), url="https://a.example.com"),
+        Webhook(id=uuid.uuid4(), url="https://b.example.com"),
+    ]
+    mock_db.query.return_value.join.return_value.filter.return_value.all.return_value = webhooks
+    # The first webhook's delivery conflicts with an existing row
+    mock_db.execute.return_value.all.return_value = [(uuid.uuid4(), webhooks[1].id)]
+    mock_get_engine.return_value.deliver = AsyncMock(return_value=[])
+
+    # Act
+    _process_webhook_event_impl(
+        MagicMock(), str(uuid.uuid4()), "subscriber.created", uuid.uuid4(), {}
+    )
+
+    # Assert
+    sent = mock_get_engine.return_value.deliver.call_args.args[0]
+    assert [webhook.id for webhook in sent] == [webhooks[1].id]
+
+
+@patch("app.webhook.webhook_notifier.get_routing_cache", return_value=RoutingCache())
+@patch("app.webhook.webhook_notifier.get_delivery_engine")
+@patch("app.webhook.webhook_notifier.SessionLocal")
+def test_event_without_row_or_created_at_is_dropped(mock_session, mock_get_engine, _):
+    # Arrange
+    mock_db = MagicMock()
+    mock_session.return_value = mock_db
+    mock_db.query.return_value.join.return_value.filter.return_value.all.return_value = [
+        Webhook(id=uuid.uuid4(), url="https://a.example.com")
+    ]
+    mock_db.execute.return_value.scalar.return_value = None
+
+    # Act
+    _process_webhook_event_impl(
+        MagicMock(), str(uuid.uuid4()), "subscriber.created", uuid.uuid4(), {}
+    )
+
+    # Assert: no deliveries keyed on a made up created_at
+    assert mock_db.execute.call_count == 1
+    mock_db.commit.assert_not_called()
+    mock_get_engine.return_value.deliver.assert_not_called()
+
+
+@patch("app.webhook.webhook_notifier.get_routing_cache", return_value=RoutingCache())
+@patch("app.webhook.webhook_notifier.get_delivery_engine")
+@patch("app.webhook.webhook_notifier.SessionLocal")
+def test_deliveries_reference_the_event(mock_session, mock_get_engine, _):
+    # Arrange
+    mock_db = MagicMock()
+    mock_session.return_value = mock_db
+    webhook = Webhook(id=uuid.uuid4(), url="https://a.example.com")
+    mock_db.query.return_value.join.return_value.filter.return_value.all.return_value = [
+        webhook
+    ]
+    created_at = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    mock_db.execute.return_value.scalar.return_value = created_at
+    mock_db.execute.return_value.all.return_value = [(uuid.uuid4(), webhook.id)]
+    mock_get_engine.return_value.deliver = AsyncMock(return_value=[])
+    event_id = str(uuid.uuid4())
+
+    # Act
+    _process_webhook_event_impl(
+        MagicMock(), event_id, "subscriber.created", uuid.uuid4(), {"key": "value"}
+    )
+
+    # Assert
+    insert = mock_db.execute.call_args_list[1].args[0]
+    params = insert.compile(dialect=postgresql.dialect()).params
+    assert params["payload_m0"] is None
+    payload = mock_get_engine.return_value.deliver.call_args.args[1]
+    assert payload == {
+        "event_id": event_id,
+        "event_type": "subscriber.created",
+        "timestamp": created_at.isoformat(),
+        "data": {"key": "value"},
+    }
+
+
+@patch("app.webhook.webhook_notifier.get_routing_cache", return_value=RoutingCache())
+@patch("app.webhook.webhook_notifier.get_delivery_engine")
+@patch("app.webhook.webhook_notifier.SessionLocal")
+def test_event_lookups_use_the_partition_key(mock_session, mock_get_engine, _):
+    # Arrange
+    mock_db = MagicMock()
+    mock_session.return_value = mock_db
+    webhook = Webhook(id=uuid.uuid4(), url="https://a.example.com")
+    mock_db.query.return_value.join.return_value.filter.return_value.all.return_value = [
+        webhook
+    ]
+    created_at = datetime(2025, 1, 1, 12, tzinfo=timezone.utc)
+    mock_db.execute.return_value.scalar.return_value = created_at
+    mock_db.execute.return_value.all.return_value = [(uuid.uuid4(), webhook.id)]
+    mock_get_engine.return_value.deliver = AsyncMock(
+        return_value=[
+            DeliveryResult(
+                webhook_id=webhook.id,
+                success=True,
+                status_code=200,
+                attempted_at=created_at,
+            )
+        ]
+    )
+
+    # Act
+    _process_webhook_event_impl(
+        MagicMock(),
+        str(uuid.uuid4()),
+        "subscriber.created",
+        uuid.uuid4(),
+        {},
+        created_at.isoformat(),
+    )
+
+    # Assert
+    dialect = postgresql.dialect()
+    mark, insert, outcome = [
+        call.args[0].compile(dialect=dialect) for call in mock_db.execute.call_args_list
+    ]
+    assert mark.params["created_at_1"] == created_at
+    assert insert.params["created_at_m0"] == created_at
+    assert "webhook_deliveries.created_at = CAST(outcomes.created_at" in str(outcome)
+
+
+def test_retry_rebuilds_payload_from_event():
+    event_id = uuid.uuid4()
+    created_at = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    webhook = Webhook(id=uuid.uuid4(), url="https://a.example.com", is_active=True)
+    deliveries = [
+        WebhookDelivery(event_id=event_id, webhook=webhook),
+        WebhookDelivery(event_id=event_id, webhook=webhook),
+        # Its event is gone
+        WebhookDelivery(event_id=uuid.uuid4(), webhook=webhook),
+    ]
+    payloads = _event_payloads(
+        [(str(event_id), "subscriber.created", {"key": "value"}, created_at)]
+    )
+
+    active, requests = _retry_requests(deliveries, payloads)
+
+    assert active == deliveries[:2]
+    # Both share one payload object, so it is encoded once
+    assert requests[0][1] is requests[1][1]
+    assert requests[0][1]["timestamp"] == created_at.isoformat()
+    assert deliveries[2].next_attempt is None
+
+
+def test_record_delivery_outcomes_single_update():
+    mock_db = MagicMock()
+    result = DeliveryResult(
+        webhook_id=uuid.uuid4(),
+        success=True,
+        status_code=200,
+        attempted_at=datetime(2025, 1, 1, tzinfo=timezone.utc),
+    )
+    outcomes = [
+        {"id": uuid.uuid4(), **_delivery_outcome(0, result, "event")} for _ in range(3)
+    ]
+
+    _record_delivery_outcomes(mock_db, outcomes)
+
+    mock_db.execute.assert_called_once()
+    sql = str(mock_db.execute.call_args.args[0].compile(dialect=postgresql.dialect()))
+    assert sql.startswith("UPDATE webhook_deliveries SET")
+    assert "FROM (VALUES" in sql
+
+
+@patch("app.webhook.webhook_notifier.fair_queue")
+@patch("app.webhook.webhook_notifier.SessionLocal")
+@patch("app.webhook.webhook_notifier.process_webhook_event_batch")
+@patch("app.webhook.webhook_notifier.process_webhook_event_batch_high_priority")
+def test_publish_events_batch(
+    mock_high_priority_task, mock_low_priority_task, mock_session, mock_fair_queue
+):
+    # Arrange
+    notifier = WebhookNotifier()
+    mock_db = MagicMock()
+    mock_session.return_value = mock_db
+    whale, small = uuid.uuid4(), uuid.uuid4()
+    notifier._get_subscriber_counts = MagicMock(return_value={whale: 500000, small: 10})
+    batch = [("subscriber.created", small, {"n": i}) for i in range(150)]
+    batch.append(("subscriber.created", whale, {"n": "whale"}))
+
+    # Act
+    result = notifier.publish_events(batch)
+
+    # Assert
+    assert result["status"] == "success"
+    assert len(result["event_ids"]) == 151
+    mock_db.execute.assert_called_once()
+    assert len(mock_db.execute.call_args.args[1]) == 151
+    mock_db.commit.assert_called_once()
+    notifier._get_subscriber_counts.assert_called_once_with(mock_db, {whale, small})
+    tasks = mock_fair_queue.enqueue_sync.call_args.args[0]
+    assert [(queue, user_id, len(args[0])) for queue, user_id, _, args in tasks] == [
+        ("webhooks_priority", str(small), 100),
+        ("webhooks_priority", str(small), 50),
+        ("webhooks", str(whale), 1),
+    ]
+    assert tasks[2] == (
+        "webhooks",
+        str(whale),
+        mock_low_priority_task.name,
+        [[[mock.ANY, "subscriber.created", whale, {"n": "whale"}, mock.ANY]]],
+    )
+    mock_db.close.assert_called_once()
+
+
+def test_get_webhook_targets_cached():
+    routing_cache = RoutingCache()
+    user_id = uuid.uuid4()
+    targets = [WebhookTarget(id=uuid.uuid4(), url="https://example.com")]
+    routing_cache.set(
+        user_id, "subscriber.created", targets, routing_cache.generation(user_id)
+    )
+    mock_db = MagicMock()
+
+    with patch(
+        "app.webhook.webhook_notifier.get_routing_cache", return_value=routing_cache
+    ):
+        result = _get_webhook_targets(mock_db, user_id, "subscriber.created")
+
+    assert result == targets
+    mock_db.query.assert_not_called()
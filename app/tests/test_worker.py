@@ -0,0 +1,123 @@
+import asyncio
+from unittest import IsolatedAsyncioTestCase
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from app.webhook.webhook_notifier import (
+    async_broker,
+    process_webhook_event,
+    retry_due_deliveries,
+)
+from app.webhook.worker import REQUEUE, AsyncWorker, heartbeat_key, processing_key
+
+
+def _message(task_name, args):
+    _, raw = async_broker.build_message(task_name, args, queue="webhooks")
+    return raw.encode()
+
+
+class TestAsyncWorker(IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.cache = MagicMock()
+        self.cache.lrem = AsyncMock()
+        self.cache.eval = AsyncMock(return_value=0)
+        patcher = patch("app.webhook.worker.get_redis", return_value=self.cache)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.worker = AsyncWorker(worker_id="host:1", concurrency=2)
+
+    async def test_fetch_prefers_the_priority_queue(self):
+        self.cache.eval = AsyncMock(return_value=[2, b"message"])
+
+        fetched = await self.worker.fetch()
+
+        self.assertEqual(fetched, ("webhooks", b"message"))
+        self.assertEqual(
+            self.cache.eval.call_args.args[1:],
+            (
+                4,
+                "webhooks_priority",
+                "webhooks",
+                "asyncworker:host:1:webhooks_priority",
+                "asyncworker:host:1:webhooks",
+            ),
+        )
+
+    async def test_poll_order_of_owned_shards(self):
+        worker = AsyncWorker(worker_id="host:1", shards=4, owners=[1, 0, 1, 1], slot=1)
+
+        first = worker.poll_order()
+        worker._fetches += 1
+        second = worker.poll_order()
+
+        self.assertEqual(
+            first,
+            [
+                "webhooks_priority:shard:0",
+                "webhooks_priority:shard:2",
+                "webhooks_priority:shard:3",
+                "webhooks_priority",
+                "webhooks:shard:0",
+                "webhooks:shard:2",
+                "webhooks:shard:3",
+                "webhooks",
+            ],
+        )
+        self.assertEqual(
+            second[:3], [f"webhooks_priority:shard:{n}" for n in (2, 3, 0)]
+        )
+
+    async def test_acks_after_the_task_ran(self):
+        raw = _message(process_webhook_event.name, ["event-1", "type", "user", {}])
+        handler = AsyncMock()
+        self.worker.handlers[process_webhook_event.name] = handler
+        await self.worker._slots.acquire()
+
+        await self.worker.handle("webhooks", raw)
+
+        handler.assert_awaited_once_with("event-1", "type", "user", {})
+        self.cache.lrem.assert_awaited_once_with(
+            processing_key("host:1", "webhooks"), 1, raw
+        )
+
+    async def test_failed_and_unknown_tasks_are_acked(self):
+        self.worker.handlers[retry_due_deliveries.name] = AsyncMock(
+            side_effect=ValueError("boom")
+        )
+
+        for raw in (
+            _message(retry_due_deliveries.name, []),
+            _message("app.unknown_task", []),
+        ):
+            await self.worker._slots.acquire()
+            await self.worker.handle("webhooks", raw)
+
+        self.assertEqual(self.cache.lrem.await_count, 2)
+
+    async def test_cancelled_task_is_not_acked(self):
+        raw = _message(retry_due_deliveries.name, [])
+        self.worker.handlers[retry_due_deliveries.name] = AsyncMock(
+            side_effect=asyncio.CancelledError
+        )
+        await self.worker._slots.acquire()
+
+        with self.assertRaises(asyncio.CancelledError):
+            await self.worker.handle("webhooks", raw)
+
+        self.cache.lrem.assert_not_awaited()
+
+    async def test_heartbeat_requeues_dead_workers(self):
+        pipe = MagicMock()
+        pipe.execute = AsyncMock(return_value=[0, 0])
+        self.cache.pipeline.return_value.__aenter__.return_value = pipe
+        self.cache.smembers = AsyncMock(return_value={b"host:1", b"host:2"})
+        self.cache.exists = AsyncMock(return_value=0)
+        self.cache.srem = AsyncMock()
+
+        await self.worker.heartbeat()
+
+        pipe.set.assert_called_once_with(heartbeat_key("host:1"), 1, ex=30)
+        self.cache.exists.assert_awaited_once_with(heartbeat_key("host:2"))
+        pipe.eval.assert_any_call(
+            REQUEUE, 2, processing_key("host:2", "webhooks"), "webhooks"
+        )
+        self.cache.srem.assert_awaited_once_with("asyncworker:workers", "host:2")
@@ -0,0 +1,220 @@
+# app/webhook/blobstore.py
+"""Claim checks for large event payloads.
+
+The data of an event larger than WEBHOOK_BLOB_THRESHOLD_BYTES is written once
+to a blob store and only a reference to it, the claim check, travels through
+Redis and is stored in webhook_events:
+
+    {"$claim_check": "events/2026/10/18/<event_id>.json", "size": 1048576}
+
+Deliveries stream the data from the store into the request body, see
+StreamedBody in app/webhook/delivery.py. The key is reserved: published data
+may not contain it, and references are only followed while offloading is on
+and when they name an event blob. The store is a directory
+(file:///path, shared by every worker) or an S3 compatible bucket such as
+MinIO (s3://bucket/prefix, needs boto3).
+"""
+
+import asyncio
+import os
+import re
+import shutil
+from abc import ABC, abstractmethod
+from datetime import date, datetime, timedelta
+from typing import Any, AsyncIterator, Dict, Optional, TypeGuard
+from urllib.parse import urlparse
+
+import orjson
+import structlog
+
+from app.core import config
+
+logger = structlog.get_logger()
+
+CLAIM_CHECK_KEY = "$claim_check"
+CHUNK_SIZE = 64 * 1024
+# The keys blob_key creates, nothing else is read from the store
+BLOB_KEY_PATTERN = re.compile(r"events/\d{4}/\d{2}/\d{2}/[\w-]+\.json")
+
+
+def is_claim_check(data: Any) -> TypeGuard[Dict[str, Any]]:
+    return (
+        config.WEBHOOK_BLOB_THRESHOLD_BYTES > 0
+        and isinstance(data, dict)
+        and isinstance(data.get(CLAIM_CHECK_KEY), str)
+        and BLOB_KEY_PATTERN.fullmatch(data[CLAIM_CHECK_KEY]) is not None
+        and isinstance(data.get("size"), int)
+    )
+
+
+def blob_key(event_id: str, created_at: datetime) -> str:
+    # Grouped per day so expired days are removed as a whole
+    return f"events/{created_at:%Y/%m/%d}/{event_id}.json"
+
+
+class BlobStoreError(Exception):
+    """A blob could not be written"""
+
+
+class BlobStore(ABC):
+    @abstractmethod
+    def put(self, key: str, data: bytes):
+        """Write a blob, raises BlobStoreError"""
+
+    @abstractmethod
+    def stream(self, key: str) -> AsyncIterator[bytes]:
+        """Read a blob in chunks"""
+
+    @abstractmethod
+    def delete_before(self, day: date) -> int:
+        """Remove the blobs of events created before day, returns how many
+        days were removed"""
+
+
+class LocalBlobStore(BlobStore):
+    """Blobs as files under a directory, a shared volume for several hosts"""
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def _path(self, key: str) -> str:
+        root = os.path.realpath(self.root)
+        path = os.path.realpath(os.path.join(root, key))
+        # Absolute keys and ../ would leave the store
+        if os.path.commonpath([root, path]) != root:
+            raise ValueError(f"Blob key outside of the store: {key}")
+        return path
+
+    def put(self, key: str, data: bytes):
+        path = self._path(key)
+        # Readers never see a partly written file
+        partial = f"{path}.{os.getpid()}.partial"
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(partial, "wb") as f:
+                f.write(data)
+            os.replace(partial, path)
+        except OSError as e:
+            raise BlobStoreError(str(e)) from e
+
+    async def stream(self, key: str) -> AsyncIterator[bytes]:
+        f = await asyncio.to_thread(open, self._path(key), "rb")
+        try:
+            while chunk := await asyncio.to_thread(f.read, CHUNK_SIZE):
+                yield chunk
+        finally:
+            f.close()
+
+    def delete_before(self, day: date) -> int:
+        removed = 0
+        events = self._path("events")
+        for year in _listdir(events):
+            for month in _listdir(os.path.join(events, year)):
+                for dom in _listdir(os.path.join(events, year, month)):
+                    try:
+                        expired = date(int(year), int(month), int(dom)) < day
+                    except ValueError:
+                        continue
+                    if expired:
+                        shutil.rmtree(os.path.join(events, year, month, dom))
+                        removed += 1
+        return removed
+
+
+def _listdir(path: str):
+    return sorted(os.listdir(path)) if os.path.isdir(path) else []
+
+
+class S3BlobStore(BlobStore):
+    """Blobs as objects of an S3 compatible bucket"""
+
+    def __init__(
+        self, bucket: str, prefix: str = "", endpoint_url: Optional[str] = None
+    ):
+        try:
+            import boto3  # type: ignore
+            from botocore.exceptions import BotoCoreError, ClientError  # type: ignore
+        except ImportError as e:
+            raise ImportError("The S3 blob store needs boto3: pip install boto3") from e
+        self.bucket = bucket
+        self.prefix = prefix
+        self.client = boto3.client("s3", endpoint_url=endpoint_url)
+        self.errors = (BotoCoreError, ClientError)
+
+    def put(self, key: str, data: bytes):
+        try:
+            self.client.put_object(Bucket=self.bucket, Key=self.prefix + key, Body=data)
+        except self.errors as e:
+            raise BlobStoreError(str(e)) from e
+
+    async def stream(self, key: str) -> AsyncIterator[bytes]:
+        response = await asyncio.to_thread(
+            self.client.get_object, Bucket=self.bucket, Key=self.prefix + key
+        )
+        body = response["Body"]
+        try:
+            while chunk := await asyncio.to_thread(body.read, CHUNK_SIZE):
+                yield chunk
+        finally:
+            body.close()
+
+    def delete_before(self, day: date) -> int:
+        # Left to an expiration lifecycle rule on the bucket, which deletes
+        # objects without listing them
+        return 0
+
+
+def create_blob_store(url: str) -> BlobStore:
+    parsed = urlparse(url)
+    if parsed.scheme == "file":
+        return LocalBlobStore(parsed.path)
+    if parsed.scheme == "s3":
+        prefix = parsed.path.lstrip("/")
+        if prefix and not prefix.endswith("/"):
+            prefix += "/"
+        return S3BlobStore(parsed.netloc, prefix, config.WEBHOOK_BLOB_S3_ENDPOINT_URL)
+    raise ValueError(f"Unsupported blob store URL: {url}")
+
+
+_blob_store: Optional[BlobStore] = None
+_owner_pid: Optional[int] = None
+
+
+def get_blob_store() -> BlobStore:
+    """The blob store of this process, clients are not shared across forks"""
+    global _blob_store, _owner_pid
+    if _owner_pid != os.getpid() or _blob_store is None:
+        _blob_store = create_blob_store(config.WEBHOOK_BLOB_STORE_URL)
+        _owner_pid = os.getpid()
+    return _blob_store
+
+
+def expire_blobs(
+    today: date, retention_days: int = config.WEBHOOK_RETENTION_DAYS
+) -> int:
+    """Remove the blobs of events past retention, along with their partitions"""
+    if retention_days <= 0 or config.WEBHOOK_BLOB_THRESHOLD_BYTES <= 0:
+        return 0
+    removed = get_blob_store().delete_before(today - timedelta(days=retention_days))
+    if removed:
+        logger.info("Expired event payload blobs", days=removed)
+    return removed
+
+
+def check_in(
+    event_id: str, created_at: datetime, data: Dict[str, Any]
+) -> Dict[str, Any]:
+    """The data to store and enqueue for an event: the data itself, or a claim
+    check once it is larger than WEBHOOK_BLOB_THRESHOLD_BYTES"""
+    if CLAIM_CHECK_KEY in data:
+        raise ValueError(f"{CLAIM_CHECK_KEY} is reserved for claim checks")
+    threshold = config.WEBHOOK_BLOB_THRESHOLD_BYTES
+    if threshold <= 0:
+        return data
+    encoded = orjson.dumps(data)
+    if len(encoded) <= threshold:
+        return data
+    key = blob_key(event_id, created_at)
+    get_blob_store().put(key, encoded)
+    logger.info("Event payload checked in", event_id=event_id, size=len(encoded))
+    return {CLAIM_CHECK_KEY: key, "size": len(encoded)}
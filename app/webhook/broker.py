@@ -0,0 +1,127 @@
+# app/webhook/broker.py
+import base64
+import uuid
+from dataclasses import dataclass
+from typing import Any, Awaitable, Dict, List, Optional, Sequence, Tuple, cast
+
+import redis.asyncio as redis
+from celery import Celery  # type: ignore
+from kombu.serialization import dumps, loads, prepare_accept_content  # type: ignore
+from kombu.utils import json  # type: ignore
+
+from app.db.cache import get_redis
+from app.webhook.serialization import compress_body, decompress_body
+
+
+@dataclass
+class TaskMessage:
+    """A task message as read back from a queue"""
+
+    task_id: str
+    task_name: str
+    args: List[Any]
+    kwargs: Dict[str, Any]
+    eta: Optional[str] = None
+
+
+class AsyncBroker:
+    """Enqueues Celery tasks without blocking the event loop.
+
+    Celery's apply_async talks to Redis synchronously. This client builds the
+    same protocol v2 message Celery would send and pushes it onto the queue's
+    Redis list through the shared redis.asyncio pool from app/db/cache.py,
+    where it is consumed by the regular Celery workers.
+    """
+
+    def __init__(self, app: Celery):
+        self.app = app
+
+    def build_message(
+        self,
+        task_name: str,
+        args: Sequence[Any],
+        queue: str,
+        countdown: Optional[int] = None,
+    ) -> Tuple[str, str]:
+        """Return the task id and the serialized message for a task"""
+        task_id = str(uuid.uuid4())
+        message = self.app.amqp.as_task_v2(
+            task_id, task_name, args=list(args), countdown=countdown
+        )
+        content_type, content_encoding, body = dumps(
+            message.body, serializer=self.app.conf.task_serializer
+        )
+        if isinstance(body, str):
+            body = body.encode(content_encoding)
+        headers = message.headers
+        body, compression = compress_body(body)
+        if compression:
+            # Where kombu's producer records it, workers decompress from it
+            headers = {**headers, "compression": compression}
+
+        # The envelope of kombu's Redis transport
+        envelope = {
+            "body": base64.b64encode(body).decode(),
+            "content-encoding": content_encoding,
+            "content-type": content_type,
+            "headers": headers,
+            "properties": {
+                **message.properties,
+                "delivery_mode": 2,
+                "delivery_info": {"exchange": "", "routing_key": queue},
+                "priority": 0,
+                "body_encoding": "base64",
+                "delivery_tag": str(uuid.uuid4()),
+            },
+        }
+        return task_id, json.dumps(envelope)
+
+    async def send_task(
+        self,
+        task_name: str,
+        args: Sequence[Any],
+        queue: str,
+        countdown: Optional[int] = None,
+        client: Optional[redis.Redis] = None,
+    ) -> str:
+        """Enqueue a single task, returns its id"""
+        task_id, message = self.build_message(task_name, args, queue, countdown)
+        conn: redis.Redis = client or get_redis()
+        # redis-py types list commands for sync and async clients alike
+        await cast(Awaitable[int], conn.lpush(queue, message))
+        return task_id
+
+    async def send_tasks(
+        self,
+        tasks: Sequence[Tuple[str, Sequence[Any], str, Optional[int]]],
+        client: Optional[redis.Redis] = None,
+    ) -> List[str]:
+        """Enqueue (task_name, args, queue, countdown) tasks in one round trip"""
+        task_ids = []
+        async with (client or get_redis()).pipeline(transaction=False) as pipe:
+            for task_name, args, queue, countdown in tasks:
+                task_id, message = self.build_message(task_name, args, queue, countdown)
+                pipe.lpush(queue, message)
+                task_ids.append(task_id)
+            await pipe.execute()
+        return task_ids
+
+    def decode_message(self, raw: bytes) -> TaskMessage:
+        """Read a message built by build_message, or sent by Celery itself"""
+        envelope = json.loads(raw)
+        headers = envelope["headers"]
+        args, kwargs, _ = loads(
+            decompress_body(
+                base64.b64decode(envelope["body"]), headers.get("compression")
+            ),
+            envelope["content-type"],
+            envelope["content-encoding"],
+            accept=prepare_accept_content(self.app.conf.accept_content),
+        )
+        return TaskMessage(
+            task_id=headers["id"],
+            task_name=headers["task"],
+            args=list(args),
+            kwargs=kwargs,
+            eta=headers.get("eta"),
+        )
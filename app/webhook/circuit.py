@@ -0,0 +1,201 @@
+# app/webhook/circuit.py
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional, Tuple
+from urllib.parse import urlsplit
+
+import structlog
+from prometheus_client import Gauge
+from redis.exceptions import RedisError
+
+from app.core import config
+from app.db.cache import get_redis
+
+logger = structlog.get_logger()
+
+CIRCUIT_HOSTS_KEY = "circuit:hosts"
+
+CIRCUIT_STATE = Gauge(
+    "webhook_circuit_state",
+    "Webhook endpoint circuit state (0 closed, 1 open, 2 half-open)",
+    ["host"],
+)
+CIRCUIT_FAILURES = Gauge(
+    "webhook_circuit_failures",
+    "Recent consecutive delivery failures per webhook endpoint",
+    ["host"],
+)
+
+# Returns 0 when a request may be sent, otherwise the milliseconds to wait,
+# and -1 for hosts without recent failures, whose successes need no write.
+# Once the cooldown is over the circuit is half-open and a single worker gets
+# to send a probe, the others wait for its outcome.
+CHECK = """
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    return -1
+end
+local open_until = tonumber(redis.call('HGET', KEYS[1], 'open_until') or '0')
+if open_until == 0 then
+    return 0
+end
+local now = tonumber(ARGV[1])
+if now < open_until then
+    return open_until - now
+end
+if redis.call('SET', KEYS[2], '1', 'NX', 'PX', ARGV[2]) then
+    return 0
+end
+return math.max(redis.call('PTTL', KEYS[2]), 1)
+"""
+
+# Counts a failure, opening the circuit at the threshold. A failure while the
+# circuit is (half-)open, such as a failed probe, starts a new cooldown.
+RECORD_FAILURE = """
+local open_until = tonumber(redis.call('HGET', KEYS[1], 'open_until') or '0')
+local failures = redis.call('HINCRBY', KEYS[1], 'failures', 1)
+redis.call('SADD', KEYS[3], ARGV[5])
+if open_until > 0 or failures >= tonumber(ARGV[2]) then
+    redis.call('HSET', KEYS[1], 'open_until', tonumber(ARGV[1]) + tonumber(ARGV[4]))
+    redis.call('DEL', KEYS[2])
+    redis.call('PEXPIRE', KEYS[1], tonumber(ARGV[4]) + tonumber(ARGV[3]))
+elseif failures == 1 then
+    redis.call('PEXPIRE', KEYS[1], ARGV[3])
+end
+return failures
+"""
+
+
+def circuit_host(url: str) -> str:
+    return urlsplit(url).netloc
+
+
+class CircuitBreaker:
+    """Per-host circuit breaker whose state is shared through Redis.
+
+    After ``failure_threshold`` failed requests within ``failure_window``
+    seconds the host's circuit opens and deliveries are deferred for
+    ``cooldown`` seconds. Then one probe request is let through, closing the
+    circuit on success or opening it again on failure. When Redis is
+    unavailable requests are allowed.
+    """
+
+    def __init__(
+        self,
+        failure_threshold: int = config.WEBHOOK_CIRCUIT_FAILURE_THRESHOLD,
+        failure_window: float = config.WEBHOOK_CIRCUIT_FAILURE_WINDOW,
+        cooldown: float = config.WEBHOOK_CIRCUIT_COOLDOWN,
+        probe_timeout: float = config.WEBHOOK_REQUEST_TIMEOUT,
+    ):
+        self.failure_threshold = failure_threshold
+        self.failure_window_ms = int(failure_window * 1000)
+        self.cooldown_ms = int(cooldown * 1000)
+        # A probe is abandoned if its worker dies without recording it
+        self.probe_lease_ms = int((probe_timeout + 5) * 1000)
+
+    def _key(self, host: str) -> str:
+        return f"circuit:{host}"
+
+    def _probe_key(self, host: str) -> str:
+        return f"circuit:{host}:probe"
+
+    async def retry_at(self, host: str) -> Optional[datetime]:
+        """None if a request to the host may be sent, else when to try again"""
+        retry_at, _ = await self.check(host)
+        return retry_at
+
+    async def check(self, host: str) -> Tuple[Optional[datetime], bool]:
+        """As retry_at, and whether the host has failures on record, without
+        any a success has nothing to reset"""
+        try:
+            wait_ms = await get_redis().eval(
+                CHECK,
+                2,
+                self._key(host),
+                self._probe_key(host),
+                _now_ms(),
+                self.probe_lease_ms,
+            )
+        except RedisError as e:
+            logger.warning("Circuit breaker unavailable", host=host, error=str(e))
+            return None, True
+        wait_ms = int(wait_ms)
+        if wait_ms <= 0:
+            return None, wait_ms == 0
+        return datetime.now(timezone.utc) + timedelta(milliseconds=wait_ms), True
+
+    async def record_success(self, host: str):
+        try:
+            async with get_redis().pipeline(transaction=False) as pipe:
+                pipe.delete(self._key(host), self._probe_key(host))
+                pipe.srem(CIRCUIT_HOSTS_KEY, host)
+                await pipe.execute()
+        except RedisError as e:
+            logger.warning("Failed to close circuit", host=host, error=str(e))
+
+    async def record_failure(self, host: str):
+        try:
+            failures = await get_redis().eval(
+                RECORD_FAILURE,
+                3,
+                self._key(host),
+                self._probe_key(host),
+                CIRCUIT_HOSTS_KEY,
+                _now_ms(),
+                self.failure_threshold,
+                self.failure_window_ms,
+                self.cooldown_ms,
+                host,
+            )
+        except RedisError as e:
+            logger.warning("Failed to record endpoint failure", host=host, error=str(e))
+            return
+        if int(failures) == self.failure_threshold:
+            logger.warning("Circuit opened", host=host, failures=failures)
+
+
+async def collect_circuit_metrics():
+    """Refresh the circuit gauges from Redis, called when /metrics is scraped"""
+    cache = get_redis()
+    try:
+        hosts = sorted(
+            member.decode() for member in await cache.smembers(CIRCUIT_HOSTS_KEY)
+        )
+        async with cache.pipeline(transaction=False) as pipe:
+            for host in hosts:
+                pipe.hgetall(f"circuit:{host}")
+            circuits = await pipe.execute()
+    except RedisError as e:
+        logger.warning("Failed to collect circuit metrics", error=str(e))
+        return
+
+    now_ms = _now_ms()
+    CIRCUIT_STATE.clear()
+    CIRCUIT_FAILURES.clear()
+    expired = []
+    for host, circuit in zip(hosts, circuits):
+        if not circuit:
+            expired.append(host)
+            continue
+        state = _decode(circuit)
+        open_until = int(state.get("open_until", 0))
+        if open_until == 0:
+            CIRCUIT_STATE.labels(host=host).set(0)
+        elif now_ms < open_until:
+            CIRCUIT_STATE.labels(host=host).set(1)
+        else:
+            CIRCUIT_STATE.labels(host=host).set(2)
+        CIRCUIT_FAILURES.labels(host=host).set(int(state.get("failures", 0)))
+
+    if expired:
+        try:
+            await cache.srem(CIRCUIT_HOSTS_KEY, *expired)
+        except RedisError:
+            pass
+
+
+def _decode(circuit: Dict[bytes, bytes]) -> Dict[str, str]:
+    return {key.decode(): value.decode() for key, value in circuit.items()}
+
+
+def _now_ms() -> int:
+    return int(time.time() * 1000)
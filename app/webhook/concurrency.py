@@ -0,0 +1,108 @@
+# app/webhook/concurrency.py
+import asyncio
+from collections import deque
+from datetime import timedelta
+from typing import Deque, Optional
+
+from sqlalchemy import func, select
+
+from app.core import config
+from app.models import Webhook, WebhookDelivery
+
+
+class AdaptiveLimit:
+    """Concurrency limit for one destination that adapts to its latency (AIMD).
+
+    Every request that completes in time while the limit is in use raises the
+    limit by 1/limit, so about one per round of ``limit`` requests, up to
+    ``max_limit``. Errors, 5xx responses and responses slower than
+    ``latency_tolerance`` times the host's usual latency cut it by
+    ``backoff_ratio``, down to ``min_limit``. The usual latency is a slow
+    moving average of past requests, starting from ``baseline_latency`` when
+    the host's latency is already known, so fast hosts end up with many
+    requests in flight and slow ones with few.
+    """
+
+    def __init__(
+        self,
+        initial_limit: int = config.WEBHOOK_INITIAL_CONNECTIONS_PER_HOST,
+        min_limit: int = config.WEBHOOK_MIN_CONNECTIONS_PER_HOST,
+        max_limit: int = config.WEBHOOK_MAX_CONNECTIONS_PER_HOST,
+        backoff_ratio: float = 0.9,
+        latency_tolerance: float = 2.0,
+        smoothing: float = 0.05,
+        baseline_latency: Optional[float] = None,
+    ):
+        self.limit = float(min(max(initial_limit, min_limit), max_limit))
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.backoff_ratio = backoff_ratio
+        self.latency_tolerance = latency_tolerance
+        self.smoothing = smoothing
+        self.baseline_latency = baseline_latency
+        self.in_flight = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+
+    async def acquire(self):
+        while self.in_flight >= int(self.limit):
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters.append(waiter)
+            try:
+                await waiter
+            except asyncio.CancelledError:
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+                elif not waiter.cancelled():
+                    # Pass the wake-up on to the next waiter
+                    self._wake()
+                raise
+        self.in_flight += 1
+
+    def release(self, latency: float, dropped: bool = False):
+        """Return a slot, recording how long the request took"""
+        self.in_flight -= 1
+        self._update(latency, dropped)
+        self._wake()
+
+    def _update(self, latency: float, dropped: bool):
+        baseline = self.baseline_latency
+        if baseline is None:
+            baseline = latency
+        if dropped or latency > self.latency_tolerance * baseline:
+            self.limit = max(self.min_limit, self.limit * self.backoff_ratio)
+        elif self.in_flight + 1 >= self.limit / 2:
+            # Only grow while the limit is actually being used
+            self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+        if not dropped:
+            self.baseline_latency = baseline + self.smoothing * (latency - baseline)
+
+    def _wake(self):
+        free = int(self.limit) - self.in_flight
+        while free > 0 and self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                free -= 1
+
+
+def recorded_latencies(window: int = config.WEBHOOK_LATENCY_SEED_WINDOW):
+    """(host, median response time in ms) of the hosts' successful attempts
+    over the last ``window`` seconds"""
+    # The netloc of the URL, as circuit_host reads it
+    host = func.substring(Webhook.url, "^[^:/]+://([^/?#]+)").label("host")
+    since = func.now() - timedelta(seconds=window)
+    return (
+        select(
+            host,
+            func.percentile_cont(0.5).within_group(WebhookDelivery.response_time_ms),
+        )
+        .join(Webhook, Webhook.id == WebhookDelivery.webhook_id)
+        .where(
+            # The partition key, only the recent partitions are read
+            WebhookDelivery.created_at >= since,
+            WebhookDelivery.last_attempt >= since,
+            WebhookDelivery.response_time_ms.is_not(None),
+            WebhookDelivery.response_status < 500,
+        )
+        .group_by(host.name)
+    )
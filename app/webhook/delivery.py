@@ -0,0 +1,385 @@
+# app/webhook/delivery.py
+import asyncio
+import hmac
+import os
+import statistics
+import time
+from datetime import datetime
+from typing import (
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Dict,
+    List,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+    TypeVar,
+    Union,
+)
+
+import httpx
+import orjson
+import structlog
+from sqlalchemy.exc import SQLAlchemyError
+
+from app.core import config
+from app.db.base_model import now
+from app.db.session import SessionLocal
+from app.webhook.blobstore import (
+    CLAIM_CHECK_KEY,
+    BlobStore,
+    get_blob_store,
+    is_claim_check,
+)
+from app.webhook.circuit import CircuitBreaker, circuit_host
+from app.webhook.concurrency import AdaptiveLimit, recorded_latencies
+from app.webhook.ratelimit import RateLimiter
+from app.webhook.schema import DeliveryResult, WebhookTarget
+
+logger = structlog.get_logger()
+
+T = TypeVar("T")
+
+DEFAULT_HEADERS = {
+    "Content-Type": "application/json",
+    "User-Agent": "Whookfirm-Webhooks/1.0",
+}
+SIGNATURE_HEADER = "X-Webhook-Signature"
+
+
+def encode_payload(payload: Dict[str, Any]) -> bytes:
+    """Serialize a payload once, the bytes are sent to every webhook as is"""
+    return orjson.dumps(payload)
+
+
+def signature_headers(secret: Optional[str], body: bytes) -> Dict[str, str]:
+    """HMAC-SHA256 of the exact body bytes, keyed with the webhook's secret"""
+    if not secret:
+        return {}
+    digest = hmac.digest(secret.encode(), body, "sha256")
+    return {SIGNATURE_HEADER: f"sha256={digest.hex()}"}
+
+
+class StreamedBody:
+    """The body of an event whose data is in the blob store (claim check).
+
+    Only the envelope around the data is kept in memory, the data is streamed
+    from the store: once to sign it with the secrets of all webhooks, then
+    once per request. Requests carry a Content-Length, not chunked encoding.
+    """
+
+    def __init__(self, head: bytes, key: str, size: int, store: BlobStore):
+        self.head = head
+        self.key = key
+        self.size = size
+        self.store = store
+        self.secrets: Set[str] = set()
+        self._signing: Optional[asyncio.Future] = None
+
+    def __len__(self) -> int:
+        return len(self.head) + self.size + 1
+
+    async def chunks(self) -> AsyncIterator[bytes]:
+        yield self.head
+        async for chunk in self.store.stream(self.key):
+            yield chunk
+        yield b"}"
+
+    async def headers(self, secret: Optional[str]) -> Dict[str, str]:
+        headers = {"Content-Length": str(len(self))}
+        if not secret:
+            return headers
+        # One pass signs the body for every webhook sending it
+        if self._signing is None:
+            self._signing = asyncio.ensure_future(self._sign())
+        digests = await asyncio.shield(self._signing)
+        headers[SIGNATURE_HEADER] = f"sha256={digests[secret].hex()}"
+        return headers
+
+    async def _sign(self) -> Dict[str, bytes]:
+        macs = {
+            secret: hmac.new(secret.encode(), digestmod="sha256")
+            for secret in self.secrets
+        }
+        async for chunk in self.chunks():
+            for mac in macs.values():
+                mac.update(chunk)
+        return {secret: mac.digest() for secret, mac in macs.items()}
+
+
+Body = Union[bytes, StreamedBody]
+
+
+def encode_body(payload: Dict[str, Any]) -> Body:
+    """The payload encoded, or streamed from the blob store if its data is a
+    claim check"""
+    data = payload.get("data")
+    if not is_claim_check(data):
+        return encode_payload(payload)
+    head = encode_payload({k: v for k, v in payload.items() if k != "data"})
+    return StreamedBody(
+        head[:-1] + b',"data":', data[CLAIM_CHECK_KEY], data["size"], get_blob_store()
+    )
+
+
+class DeliveryEngine:
+    """Delivers an event to all of its webhooks concurrently.
+
+    One engine lives per worker process and keeps a single httpx.AsyncClient,
+    so connections (and TLS sessions) are reused across events. Each
+    destination host gets a number of in-flight requests that adapts to its
+    latency, see AdaptiveLimit. Requests
+    over the rate limit or to hosts whose circuit is open are deferred
+    instead of sent.
+    """
+
+    def __init__(
+        self,
+        timeout: float = config.WEBHOOK_REQUEST_TIMEOUT,
+        max_connections: int = config.WEBHOOK_MAX_CONNECTIONS,
+        max_keepalive_connections: int = config.WEBHOOK_MAX_KEEPALIVE_CONNECTIONS,
+        max_connections_per_host: int = config.WEBHOOK_MAX_CONNECTIONS_PER_HOST,
+        http2: bool = config.WEBHOOK_HTTP2,
+        circuit_breaker: Optional[CircuitBreaker] = None,
+        rate_limiter: Optional[RateLimiter] = None,
+    ):
+        self.timeout = timeout
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+        )
+        self.max_connections_per_host = max_connections_per_host
+        self.http2 = http2
+        self.circuit_breaker = circuit_breaker
+        self.rate_limiter = rate_limiter
+        self._client: Optional[httpx.AsyncClient] = None
+        self._host_limits: Dict[str, AdaptiveLimit] = {}
+        self._host_latencies: Dict[str, float] = {}
+        self._typical_latency: Optional[float] = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                timeout=self.timeout,
+                limits=self.limits,
+                http2=self.http2,
+                headers=DEFAULT_HEADERS,
+            )
+        return self._client
+
+    def seed_host_limits(self, latencies: Sequence[Tuple[str, float]]):
+        """Start the limits of hosts from their recorded median latency (ms),
+        see recorded_latencies. Hosts slower than the typical one start with
+        proportionally fewer requests in flight, faster ones with more."""
+        self._host_latencies = {
+            host: float(latency) / 1000 for host, latency in latencies if latency
+        }
+        if self._host_latencies:
+            self._typical_latency = statistics.median(self._host_latencies.values())
+
+    def _host_limit(self, host: str) -> AdaptiveLimit:
+        limit = self._host_limits.get(host)
+        if limit is None:
+            latency = self._host_latencies.get(host)
+            initial_limit = config.WEBHOOK_INITIAL_CONNECTIONS_PER_HOST
+            if latency is not None and self._typical_latency:
+                initial_limit = round(initial_limit * self._typical_latency / latency)
+            limit = AdaptiveLimit(
+                initial_limit=initial_limit,
+                max_limit=self.max_connections_per_host,
+                baseline_latency=latency,
+            )
+            self._host_limits[host] = limit
+        return limit
+
+    async def send(self, webhook: WebhookTarget, body: Body) -> DeliveryResult:
+        """POST an encoded payload to a single webhook, never raising."""
+        host = circuit_host(webhook.url)
+        # The circuit first, deferred requests take no rate limit token
+        failing = False
+        if self.circuit_breaker is not None:
+            retry_at, failing = await self.circuit_breaker.check(host)
+            if retry_at is not None:
+                return self._deferred(webhook, retry_at, "circuit open")
+        if self.rate_limiter is not None:
+            retry_at = await self.rate_limiter.retry_at(host, webhook.id)
+            if retry_at is not None:
+                return self._deferred(webhook, retry_at, "rate limited")
+
+        limit = self._host_limit(host)
+        await limit.acquire()
+        attempted_at = now()
+        started = time.perf_counter()
+        overloaded = True
+        try:
+            response = await self._post(webhook, body)
+            overloaded = response.status_code >= 500
+        except Exception as e:
+            logger.error("Webhook request failed", webhook_id=webhook.id, error=str(e))
+            await self._record_outcome(host, healthy=False, failing=failing)
+            return DeliveryResult(
+                webhook_id=webhook.id,
+                success=False,
+                response_body=str(e)[:1000],
+                attempted_at=attempted_at,
+                response_time_ms=int((time.perf_counter() - started) * 1000),
+            )
+        finally:
+            limit.release(time.perf_counter() - started, dropped=overloaded)
+        response_time_ms = int((time.perf_counter() - started) * 1000)
+
+        # Client errors mean the endpoint is up, only 5xx trip the circuit
+        await self._record_outcome(
+            host, healthy=response.status_code < 500, failing=failing
+        )
+        success = response.status_code < 400
+        if success:
+            logger.info(
+                "Webhook delivered successfully",
+                webhook_id=webhook.id,
+                status_code=response.status_code,
+            )
+        else:
+            logger.warning(
+                "Webhook delivery failed",
+                webhook_id=webhook.id,
+                status_code=response.status_code,
+            )
+        return DeliveryResult(
+            webhook_id=webhook.id,
+            success=success,
+            status_code=response.status_code,
+            response_body=response.text[:1000],
+            attempted_at=attempted_at,
+            response_time_ms=response_time_ms,
+        )
+
+    async def _post(self, webhook: WebhookTarget, body: Body) -> httpx.Response:
+        if isinstance(body, bytes):
+            return await self.client.post(
+                webhook.url,
+                content=body,
+                headers=signature_headers(webhook.secret, body),
+            )
+        # Reading the blob store fails like the request would
+        return await self.client.post(
+            webhook.url,
+            content=body.chunks(),
+            headers=await body.headers(webhook.secret),
+        )
+
+    def _deferred(
+        self, webhook: WebhookTarget, retry_at: datetime, reason: str
+    ) -> DeliveryResult:
+        logger.info(
+            "Webhook deferred",
+            webhook_id=webhook.id,
+            reason=reason,
+            retry_at=retry_at.isoformat(),
+        )
+        return DeliveryResult(
+            webhook_id=webhook.id,
+            success=False,
+            attempted_at=now(),
+            deferred=True,
+            retry_at=retry_at,
+        )
+
+    async def _record_outcome(self, host: str, healthy: bool, failing: bool):
+        if self.circuit_breaker is None:
+            return
+        if healthy:
+            # Hosts without failures on record have nothing to reset
+            if failing:
+                await self.circuit_breaker.record_success(host)
+        else:
+            await self.circuit_breaker.record_failure(host)
+
+    async def deliver(
+        self, webhooks: Sequence[WebhookTarget], payload: Dict[str, Any]
+    ) -> List[DeliveryResult]:
+        """Fan the payload out to every webhook at once.
+
+        The payload is encoded once for all of them. Results are returned in
+        the same order as ``webhooks``.
+        """
+        return await self.deliver_batch([(webhook, payload) for webhook in webhooks])
+
+    async def deliver_batch(
+        self, requests: Sequence[Tuple[WebhookTarget, Dict[str, Any]]]
+    ) -> List[DeliveryResult]:
+        """Send a batch of (webhook, payload) pairs concurrently, in order."""
+        # Requests sharing a payload object share its encoding
+        bodies: Dict[int, Body] = {}
+        for webhook, payload in requests:
+            body = bodies.get(id(payload))
+            if body is None:
+                body = bodies[id(payload)] = encode_body(payload)
+            if isinstance(body, StreamedBody) and webhook.secret:
+                body.secrets.add(webhook.secret)
+        return list(
+            await asyncio.gather(
+                *(
+                    self.send(webhook, bodies[id(payload)])
+                    for webhook, payload in requests
+                )
+            )
+        )
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+# Celery's prefork pool runs tasks synchronously, so each child process keeps
+# its own event loop alive between tasks. The pooled client and its
+# connections are bound to that loop and must never cross a fork.
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_engine: Optional[DeliveryEngine] = None
+_owner_pid: Optional[int] = None
+
+
+def _ensure_process_state():
+    global _loop, _engine, _owner_pid
+    if _owner_pid != os.getpid() or _loop is None or _loop.is_closed():
+        _loop = asyncio.new_event_loop()
+        _engine = DeliveryEngine(
+            circuit_breaker=CircuitBreaker(), rate_limiter=RateLimiter()
+        )
+        _owner_pid = os.getpid()
+        _seed_host_limits(_engine)
+
+
+def _seed_host_limits(engine: DeliveryEngine):
+    if config.WEBHOOK_LATENCY_SEED_WINDOW <= 0:
+        return
+    try:
+        with SessionLocal() as db:
+            engine.seed_host_limits(db.execute(recorded_latencies()).all())
+    except SQLAlchemyError as e:
+        logger.warning("Failed to seed host concurrency limits", error=str(e))
+
+
+def get_delivery_engine() -> DeliveryEngine:
+    _ensure_process_state()
+    return _engine  # type: ignore
+
+
+def run_on_worker_loop(coro: Awaitable[T]) -> T:
+    """Run a coroutine on this process's long-lived event loop."""
+    _ensure_process_state()
+    return _loop.run_until_complete(coro)  # type: ignore
+
+
+def shutdown_delivery_engine():
+    global _loop, _engine, _owner_pid
+    if _owner_pid != os.getpid() or _loop is None:
+        return
+    if _engine is not None:
+        _loop.run_until_complete(_engine.aclose())
+    _loop.close()
+    _loop, _engine, _owner_pid = None, None, None
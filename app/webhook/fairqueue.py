@@ -0,0 +1,259 @@
+# app/webhook/fairqueue.py
+"""Per-tenant fair queueing in front of the Celery queues.
+
+Publishers push task messages onto a Redis list per lane (Celery queue) and
+user instead of the Celery queue itself. The dispatcher keeps each Celery
+queue shallow and refills it with deficit round-robin over the users that
+have a backlog, so every tenant gets a bounded share of the workers however
+much it has queued:
+
+    python -m app.webhook.fairqueue
+
+With WEBHOOK_SHARDS set, each user's messages go to the queue of its shard
+instead, see app/webhook/supervisor.py.
+"""
+
+import asyncio
+import signal
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Sequence, Tuple
+
+import redis.asyncio as aioredis
+import structlog
+from redis.exceptions import RedisError
+
+from app.core import config
+from app.db.cache import get_redis, get_sync_redis
+from app.webhook.broker import AsyncBroker
+from app.webhook.sharding import LANES, lane_queues, tenant_queue
+
+logger = structlog.get_logger()
+
+# Moves up to ARGV[1] of the oldest messages of a user's queue (KEYS[1]) onto
+# the Celery queue or shard queue (KEYS[2]) and drops the user from the lane's active set
+# (KEYS[3]) once its queue is empty. Returns the number of messages moved.
+MOVE_MESSAGES = """
+local moved = 0
+for i = 1, tonumber(ARGV[1]) do
+    local message = redis.call('RPOP', KEYS[1])
+    if not message then
+        break
+    end
+    redis.call('LPUSH', KEYS[2], message)
+    moved = moved + 1
+end
+if redis.call('LLEN', KEYS[1]) == 0 then
+    redis.call('SREM', KEYS[3], ARGV[2])
+end
+return moved
+"""
+
+# (lane, tenant, task_name, args), tenants are user ids as text so queue keys
+# and shards are the same whoever enqueues
+FairTask = Tuple[str, str, str, Sequence[Any]]
+
+
+def tenant_queue_key(lane: str, tenant: str) -> str:
+    return f"fairq:{lane}:{tenant}"
+
+
+def active_tenants_key(lane: str) -> str:
+    return f"fairq:{lane}:active"
+
+
+class DeficitRoundRobin:
+    """Deficit round-robin over tenants, each message costing one unit.
+
+    Tenants with a backlog take turns in a fixed order. On its turn a tenant
+    earns ``quantum`` times its weight and may send that many messages, so a
+    tenant's share does not depend on the size of its backlog. A turn cut
+    short by the budget is resumed on the next call.
+    """
+
+    def __init__(self, quantum: int = config.FAIR_QUEUE_QUANTUM):
+        self.quantum = quantum
+        self._order: Deque[str] = deque()
+        self._deficits: Dict[str, float] = {}
+        self._resume = False
+
+    def schedule(
+        self,
+        backlogs: Dict[str, int],
+        budget: int,
+        weights: Optional[Dict[str, float]] = None,
+    ) -> Dict[str, int]:
+        """How many messages to take from each tenant, at most ``budget``"""
+        for tenant, backlog in backlogs.items():
+            if backlog > 0 and tenant not in self._deficits:
+                self._order.append(tenant)
+                self._deficits[tenant] = 0
+        for tenant in list(self._order):
+            if backlogs.get(tenant, 0) <= 0:
+                self._drop(tenant)
+
+        remaining = dict(backlogs)
+        taken: Dict[str, int] = {}
+        while budget > 0 and self._order:
+            tenant = self._order[0]
+            if not self._resume:
+                weight = weights.get(tenant, 1) if weights else 1
+                self._deficits[tenant] += self.quantum * weight
+            self._resume = False
+
+            count = min(int(self._deficits[tenant]), remaining[tenant], budget)
+            self._deficits[tenant] -= count
+            remaining[tenant] -= count
+            budget -= count
+            if count:
+                taken[tenant] = taken.get(tenant, 0) + count
+
+            if remaining[tenant] == 0:
+                self._drop(tenant)
+            elif self._deficits[tenant] >= 1:
+                # Out of budget mid-turn
+                self._resume = True
+            else:
+                self._order.rotate(-1)
+        return taken
+
+    def _drop(self, tenant: str):
+        if self._order and self._order[0] == tenant:
+            self._resume = False
+        self._order.remove(tenant)
+        del self._deficits[tenant]
+
+
+class FairQueue:
+    """Publishes tasks onto the per-tenant queues of a lane"""
+
+    def __init__(self, broker: AsyncBroker):
+        self.broker = broker
+
+    def _messages(self, tasks: Sequence[FairTask]) -> List[Tuple[str, str, str]]:
+        """(lane, tenant, message) for each task"""
+        messages = []
+        for lane, tenant, task_name, args in tasks:
+            _, message = self.broker.build_message(task_name, args, lane)
+            messages.append((lane, tenant, message))
+        return messages
+
+    def enqueue_sync(self, tasks: Sequence[FairTask]):
+        with get_sync_redis().pipeline(transaction=False) as pipe:
+            for lane, tenant, message in self._messages(tasks):
+                pipe.lpush(tenant_queue_key(lane, tenant), message)
+                pipe.sadd(active_tenants_key(lane), tenant)
+            pipe.execute()
+
+    async def enqueue(
+        self, tasks: Sequence[FairTask], client: Optional[aioredis.Redis] = None
+    ):
+        async with (client or get_redis()).pipeline(transaction=False) as pipe:
+            for lane, tenant, message in self._messages(tasks):
+                pipe.lpush(tenant_queue_key(lane, tenant), message)
+                pipe.sadd(active_tenants_key(lane), tenant)
+            await pipe.execute()
+
+
+class FairDispatcher:
+    """Refills each Celery queue (or shard queue) from the tenant queues of its lane"""
+
+    def __init__(
+        self,
+        lanes: Sequence[str] = LANES,
+        queue_depth: int = config.FAIR_QUEUE_DEPTH,
+        poll_interval: float = config.FAIR_QUEUE_POLL_INTERVAL,
+        shards: int = config.WEBHOOK_SHARDS,
+    ):
+        self.lanes = lanes
+        self.queue_depth = queue_depth
+        self.poll_interval = poll_interval
+        self.shards = shards
+        self.schedulers = {
+            queue: DeficitRoundRobin()
+            for lane in lanes
+            for queue in lane_queues(lane, shards)
+        }
+        self._stopping = asyncio.Event()
+
+    async def dispatch(self, lane: str) -> int:
+        """Top the lane's queues up to queue_depth, returns messages moved"""
+        cache = get_redis()
+        tenants = sorted(
+            member.decode() for member in await cache.smembers(active_tenants_key(lane))
+        )
+        if not tenants:
+            return 0
+        destinations = {
+            tenant: tenant_queue(lane, tenant, self.shards) for tenant in tenants
+        }
+        queues = sorted(set(destinations.values()))
+        async with cache.pipeline(transaction=False) as pipe:
+            for queue in queues:
+                pipe.llen(queue)
+            for tenant in tenants:
+                pipe.llen(tenant_queue_key(lane, tenant))
+            counts = await pipe.execute()
+        depths = dict(zip(queues, counts))
+        backlogs = dict(zip(tenants, counts[len(queues) :]))
+
+        moves: List[Tuple[str, int]] = []
+        for queue in queues:
+            plan = self.schedulers[queue].schedule(
+                {
+                    tenant: backlogs[tenant]
+                    for tenant in tenants
+                    if destinations[tenant] == queue
+                },
+                self.queue_depth - depths[queue],
+            )
+            moves.extend(plan.items())
+        # Empty queues move nothing but leave the active set
+        moves += [(tenant, 0) for tenant in tenants if not backlogs[tenant]]
+        async with cache.pipeline(transaction=False) as pipe:
+            for tenant, count in moves:
+                pipe.eval(
+                    MOVE_MESSAGES,
+                    3,
+                    tenant_queue_key(lane, tenant),
+                    destinations[tenant],
+                    active_tenants_key(lane),
+                    count,
+                    tenant,
+                )
+            moved = await pipe.execute()
+        return sum(moved)
+
+    async def run(self):
+        """Dispatch until stopped, polling only while nothing was moved"""
+        logger.info("Fair queue dispatcher started", lanes=list(self.lanes))
+        while not self._stopping.is_set():
+            moved = 0
+            for lane in self.lanes:
+                try:
+                    moved += await self.dispatch(lane)
+                except RedisError as e:
+                    logger.error("Fair queue dispatch failed", lane=lane, error=str(e))
+
+            if not moved:
+                try:
+                    await asyncio.wait_for(
+                        self._stopping.wait(), timeout=self.poll_interval
+                    )
+                except asyncio.TimeoutError:
+                    pass
+        logger.info("Fair queue dispatcher stopped")
+
+    def stop(self):
+        self._stopping.set()
+
+
+async def main():
+    dispatcher = FairDispatcher()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, dispatcher.stop)
+    await dispatcher.run()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
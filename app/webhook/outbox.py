@@ -0,0 +1,69 @@
+# app/webhook/outbox.py
+"""Outbox relay process.
+
+Events are written to `webhook_events` in the same transaction as the change
+that produced them and left unpublished. This process drains those rows in
+batches and enqueues them for the Celery workers:
+
+    python -m app.webhook.outbox
+"""
+
+import asyncio
+import signal
+
+import structlog
+from redis.exceptions import RedisError
+from sqlalchemy.exc import SQLAlchemyError
+
+from app.core import config
+from app.db.session import AsyncSessionLocal
+from app.webhook.webhook_notifier import WebhookNotifier
+
+logger = structlog.get_logger()
+
+
+class OutboxRelay:
+    def __init__(
+        self,
+        batch_size: int = config.OUTBOX_BATCH_SIZE,
+        poll_interval: float = config.OUTBOX_POLL_INTERVAL,
+    ):
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.notifier = WebhookNotifier()
+        self._stopping = asyncio.Event()
+
+    async def run(self):
+        """Relay until stopped, polling only while the outbox is drained"""
+        logger.info("Outbox relay started", batch_size=self.batch_size)
+        while not self._stopping.is_set():
+            published = 0
+            try:
+                async with AsyncSessionLocal() as db:
+                    published = await self.notifier.publish_outbox(db, self.batch_size)
+            except (SQLAlchemyError, RedisError) as e:
+                logger.error("Outbox relay failed", error=str(e))
+
+            if published < self.batch_size:
+                try:
+                    await asyncio.wait_for(
+                        self._stopping.wait(), timeout=self.poll_interval
+                    )
+                except asyncio.TimeoutError:
+                    pass
+        logger.info("Outbox relay stopped")
+
+    def stop(self):
+        self._stopping.set()
+
+
+async def main():
+    relay = OutboxRelay()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, relay.stop)
+    await relay.run()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
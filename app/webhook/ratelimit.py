@@ -0,0 +1,115 @@
+# app/webhook/ratelimit.py
+import asyncio
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional, Tuple
+
+import structlog
+from redis.exceptions import RedisError
+
+from app.core import config
+from app.db.cache import get_redis
+
+logger = structlog.get_logger()
+
+# Takes a token from every bucket in KEYS, or from none of them. ARGV holds
+# the current time in ms followed by a (rate per second, burst) pair for each
+# bucket. Returns 0 when the tokens were taken, otherwise the milliseconds
+# until all buckets have one.
+TAKE_TOKENS = """
+local now = tonumber(ARGV[1])
+local wait = 0
+local tokens = {}
+for i, key in ipairs(KEYS) do
+    local rate = tonumber(ARGV[2 * i])
+    local burst = tonumber(ARGV[2 * i + 1])
+    local bucket = redis.call('HMGET', key, 'tokens', 'ts')
+    local available = tonumber(bucket[1]) or burst
+    local elapsed = math.max(0, now - (tonumber(bucket[2]) or now))
+    available = math.min(burst, available + elapsed * rate / 1000)
+    tokens[i] = available
+    if available < 1 then
+        wait = math.max(wait, math.ceil((1 - available) * 1000 / rate))
+    end
+end
+if wait > 0 then
+    return wait
+end
+for i, key in ipairs(KEYS) do
+    local rate = tonumber(ARGV[2 * i])
+    local burst = tonumber(ARGV[2 * i + 1])
+    redis.call('HSET', key, 'tokens', tokens[i] - 1, 'ts', now)
+    redis.call('PEXPIRE', key, math.ceil(burst * 1000 / rate) + 1000)
+end
+return 0
+"""
+
+
+class RateLimiter:
+    """Token buckets per destination host and per webhook, shared through Redis.
+
+    A request needs a token from both buckets. Short waits for a token are
+    slept through, up to ``max_wait`` seconds, beyond which the caller is told
+    when to try again so the delivery can be deferred. A rate of 0 disables
+    the bucket, and requests are allowed when Redis is unavailable.
+    """
+
+    def __init__(
+        self,
+        host_rate: float = config.WEBHOOK_RATE_LIMIT_HOST_RATE,
+        host_burst: int = config.WEBHOOK_RATE_LIMIT_HOST_BURST,
+        webhook_rate: float = config.WEBHOOK_RATE_LIMIT_WEBHOOK_RATE,
+        webhook_burst: int = config.WEBHOOK_RATE_LIMIT_WEBHOOK_BURST,
+        max_wait: float = config.WEBHOOK_RATE_LIMIT_MAX_WAIT,
+    ):
+        self.host_rate = host_rate
+        self.host_burst = host_burst
+        self.webhook_rate = webhook_rate
+        self.webhook_burst = webhook_burst
+        self.max_wait = max_wait
+
+    def _buckets(
+        self, host: str, webhook_id: uuid.UUID
+    ) -> List[Tuple[str, float, int]]:
+        buckets = []
+        if self.host_rate > 0:
+            buckets.append((f"ratelimit:host:{host}", self.host_rate, self.host_burst))
+        if self.webhook_rate > 0:
+            buckets.append(
+                (
+                    f"ratelimit:webhook:{webhook_id}",
+                    self.webhook_rate,
+                    self.webhook_burst,
+                )
+            )
+        return buckets
+
+    async def take(self, host: str, webhook_id: uuid.UUID) -> float:
+        """Take a token, returns 0 or the seconds to wait before trying again"""
+        buckets = self._buckets(host, webhook_id)
+        if not buckets:
+            return 0
+        args: List = [int(time.time() * 1000)]
+        for _, rate, burst in buckets:
+            args.extend((rate, burst))
+        try:
+            wait_ms = await get_redis().eval(
+                TAKE_TOKENS, len(buckets), *(key for key, _, _ in buckets), *args
+            )
+        except RedisError as e:
+            logger.warning("Rate limiter unavailable", host=host, error=str(e))
+            return 0
+        return int(wait_ms) / 1000
+
+    async def retry_at(self, host: str, webhook_id: uuid.UUID) -> Optional[datetime]:
+        """None once a request may be sent, else when to try again"""
+        waited = 0.0
+        while True:
+            wait = await self.take(host, webhook_id)
+            if not wait:
+                return None
+            if waited + wait > self.max_wait:
+                return datetime.now(timezone.utc) + timedelta(seconds=wait)
+            await asyncio.sleep(wait)
+            waited += wait
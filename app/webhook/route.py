@@ -7,13 +7,18 @@ from app.auth.deps import CurrentUser
 from app.db.session import DbSession
 from app.webhook.schema import (
     WebhookCreate,
+    WebhookEventBatchCreate,
+    WebhookEventBatchResponse,
     WebhookResponse,
     WebhookTestResponse,
 )
 from app.webhook.service import webhook_manager
+from app.webhook.webhook_notifier import WebhookNotifier
 
 router = APIRouter(prefix="/webhooks")
 
+webhook_notifier = WebhookNotifier()
+
 
 @router.get("", response_model=List[WebhookResponse])
 async def list_webhooks(
@@ -39,6 +44,28 @@ async def create_webhook(
     return db_webhook
 
 
+@router.post(
+    "/events/batch",
+    response_model=WebhookEventBatchResponse,
+    status_code=status.HTTP_202_ACCEPTED,
+)
+def publish_events(
+    current_user: CurrentUser,
+    batch: WebhookEventBatchCreate,
+):
+    """Publish a batch of webhook events for the current user"""
+    # Declared sync so the blocking database and broker calls run in the threadpool
+    result = webhook_notifier.publish_events(
+        [(event.event_type, current_user.id, event.data) for event in batch.events]
+    )
+    if result["status"] != "success":
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=result["message"],
+        )
+    return {"event_ids": result["event_ids"]}
+
+
 @router.get("/{webhook_id}", response_model=WebhookResponse)
 async def get_webhook(
     db: DbSession,
@@ -0,0 +1,145 @@
+# app/webhook/routing.py
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Dict, List, Optional, Set, Tuple
+
+import structlog
+from redis.exceptions import RedisError
+
+from app.core import config
+from app.db.cache import get_redis, get_sync_redis
+from app.webhook.schema import WebhookTarget
+
+logger = structlog.get_logger()
+
+ROUTING_INVALIDATION_CHANNEL = "webhook-routing-invalidate"
+
+RoutingKey = Tuple[str, str]
+Generation = Tuple[int, int]
+
+
+class RoutingCache:
+    """Size-bounded LRU of the active webhooks per (user_id, event_type).
+
+    Entries expire after ``ttl`` seconds and are dropped for a whole user when
+    its webhooks change, see publish_routing_invalidation. Each user has a
+    generation number bumped on invalidation, so a lookup that raced with an
+    invalidation does not store its possibly stale result.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = config.WEBHOOK_ROUTING_CACHE_SIZE,
+        ttl: float = config.WEBHOOK_ROUTING_CACHE_TTL,
+    ):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: OrderedDict[RoutingKey, Tuple[float, List[WebhookTarget]]] = (
+            OrderedDict()
+        )
+        self._keys_by_user: Dict[str, Set[RoutingKey]] = {}
+        self._generations: Dict[str, int] = {}
+        self._epoch = 0
+        self._lock = threading.Lock()
+
+    def generation(self, user_id: uuid.UUID) -> Generation:
+        with self._lock:
+            return self._epoch, self._generations.get(str(user_id), 0)
+
+    def get(self, user_id: uuid.UUID, event_type: str) -> Optional[List[WebhookTarget]]:
+        key = (str(user_id), event_type)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, targets = entry
+            if expires_at < time.monotonic():
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            return targets
+
+    def set(
+        self,
+        user_id: uuid.UUID,
+        event_type: str,
+        targets: List[WebhookTarget],
+        generation: Generation,
+    ):
+        """Store targets loaded while the user was at ``generation``"""
+        key = (str(user_id), event_type)
+        with self._lock:
+            if (self._epoch, self._generations.get(key[0], 0)) != generation:
+                return
+            self._entries[key] = (time.monotonic() + self.ttl, targets)
+            self._entries.move_to_end(key)
+            self._keys_by_user.setdefault(key[0], set()).add(key)
+            while len(self._entries) > self.maxsize:
+                self._remove(next(iter(self._entries)))
+
+    def invalidate_user(self, user_id: str):
+        with self._lock:
+            self._generations[user_id] = self._generations.get(user_id, 0) + 1
+            for key in self._keys_by_user.pop(user_id, set()):
+                self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._epoch += 1
+            self._generations.clear()
+            self._entries.clear()
+            self._keys_by_user.clear()
+
+    def _remove(self, key: RoutingKey):
+        self._entries.pop(key, None)
+        keys = self._keys_by_user.get(key[0])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._keys_by_user[key[0]]
+
+    def listen_for_invalidations(self):
+        """Drop cached routes as invalidations arrive, reconnecting on errors"""
+        while True:
+            try:
+                pubsub = get_sync_redis().pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(ROUTING_INVALIDATION_CHANNEL)
+                # Invalidations sent while disconnected were missed
+                self.clear()
+                for message in pubsub.listen():
+                    self.invalidate_user(message["data"].decode())
+            except RedisError as e:
+                logger.warning("Routing invalidation listener failed", error=str(e))
+                time.sleep(5)
+
+
+_routing_cache: Optional[RoutingCache] = None
+_owner_pid: Optional[int] = None
+
+
+def get_routing_cache() -> RoutingCache:
+    """The routing cache of this worker process, listening for invalidations"""
+    global _routing_cache, _owner_pid
+    if _owner_pid != os.getpid() or _routing_cache is None:
+        _routing_cache = RoutingCache()
+        _owner_pid = os.getpid()
+        threading.Thread(
+            target=_routing_cache.listen_for_invalidations,
+            name="routing-invalidation",
+            daemon=True,
+        ).start()
+    return _routing_cache
+
+
+async def publish_routing_invalidation(user_id: uuid.UUID):
+    """Tell every worker to drop the cached routes of a user"""
+    try:
+        await get_redis().publish(ROUTING_INVALIDATION_CHANNEL, str(user_id))
+    except RedisError as e:
+        # Workers pick the change up once their entries expire
+        logger.warning(
+            "Failed to publish routing invalidation", user_id=user_id, error=str(e)
+        )
@@ -1,10 +1,12 @@
 # app/schemas.py (additional webhook schemas)
 from uuid import UUID
-from pydantic import BaseModel, HttpUrl, ConfigDict, field_validator
+from pydantic import BaseModel, HttpUrl, ConfigDict, Field, field_validator
 from typing import List, Optional, Dict, Any
 from datetime import datetime
 from enum import Enum
 
+from app.webhook.blobstore import CLAIM_CHECK_KEY
+
 
 class WebhookUpdate(BaseModel):
     url: Optional[HttpUrl] = None
@@ -92,10 +94,43 @@ class WebhookEvent(BaseModel):
     data: Dict[str, Any]
 
 
+class WebhookEventCreate(BaseModel):
+    event_type: str
+    data: Dict[str, Any]
+
+    @field_validator("data")
+    def validate_data(cls, v):
+        if CLAIM_CHECK_KEY in v:
+            raise ValueError(f"{CLAIM_CHECK_KEY} is a reserved key")
+        return v
+
+    @field_validator("event_type")
+    def validate_event_type(cls, v):
+        valid_events = [
+            "subscriber.created",
+            "subscriber.updated",
+            "subscriber.deleted",
+            "subscriber.unsubscribed",
+            "segment.subscriber_added",
+            "segment.subscriber_removed",
+        ]
+        if v not in valid_events:
+            raise ValueError(f"Invalid event: {v}")
+        return v
+
+
+class WebhookEventBatchCreate(BaseModel):
+    events: List[WebhookEventCreate] = Field(min_length=1, max_length=10000)
+
+
+class WebhookEventBatchResponse(BaseModel):
+    event_ids: List[str]
+
+
 class WebhookDeliverySchema(BaseModel):
     webhook_id: UUID
     event_id: UUID
-    payload: dict
+    payload: Optional[dict]
     status: str
     attempts: int
     last_attempt: Optional[datetime]
@@ -113,3 +148,23 @@ class WebhookSchema(BaseModel):
     events: dict
 
     model_config = ConfigDict(from_attributes=True)
+
+
+class WebhookTarget(BaseModel):
+    id: UUID
+    url: str
+    secret: Optional[str] = None
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class DeliveryResult(BaseModel):
+    webhook_id: UUID
+    success: bool
+    status_code: Optional[int] = None
+    response_body: Optional[str] = None
+    attempted_at: datetime
+    response_time_ms: Optional[int] = None
+    # Not sent because the endpoint's circuit is open, try again at retry_at
+    deferred: bool = False
+    retry_at: Optional[datetime] = None
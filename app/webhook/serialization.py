@@ -0,0 +1,62 @@
+# app/webhook/serialization.py
+"""Compact encoding of the task messages of the delivery queues.
+
+CELERY_TASK_SERIALIZER selects json (the default) or msgpack, which needs
+``pip install msgpack``. Task bodies larger than
+CELERY_COMPRESSION_THRESHOLD_BYTES are compressed with
+CELERY_TASK_COMPRESSION, gzip or zstd (``pip install zstandard``). Both are
+recorded in each message, so workers read messages of every setting and the
+settings can be changed without draining the queues.
+"""
+
+import datetime
+import uuid
+from typing import Any, Optional, Tuple
+
+from kombu import compression  # type: ignore
+from kombu.serialization import register  # type: ignore
+
+from app.core import config
+
+
+def _msgpack_default(obj: Any) -> Any:
+    # Task arguments carry user ids and timestamps, which JSON encodes as text
+    if isinstance(obj, uuid.UUID):
+        return str(obj)
+    if isinstance(obj, (datetime.datetime, datetime.date)):
+        return obj.isoformat()
+    raise TypeError(f"Cannot serialize {type(obj).__name__}")
+
+
+def register_msgpack():
+    """Replace kombu's msgpack serializer with one that also takes UUIDs"""
+    try:
+        import msgpack  # type: ignore
+    except ImportError:
+        if config.CELERY_TASK_SERIALIZER == "msgpack":
+            raise ImportError(
+                "CELERY_TASK_SERIALIZER=msgpack needs msgpack: pip install msgpack"
+            )
+        return
+
+    register(
+        "msgpack",
+        lambda obj: msgpack.packb(obj, use_bin_type=True, default=_msgpack_default),
+        lambda data: msgpack.unpackb(data, raw=False),
+        content_type="application/x-msgpack",
+        content_encoding="binary",
+    )
+
+
+def compress_body(body: bytes) -> Tuple[bytes, Optional[str]]:
+    """The body to send and its compression, None when sent as is"""
+    method = config.CELERY_TASK_COMPRESSION
+    if not method or len(body) <= config.CELERY_COMPRESSION_THRESHOLD_BYTES:
+        return body, None
+    return compression.compress(body, method)
+
+
+def decompress_body(body: bytes, content_type: Optional[str]) -> bytes:
+    if not content_type:
+        return body
+    return compression.decompress(body, content_type)
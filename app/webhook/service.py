@@ -2,13 +2,14 @@
 from uuid import UUID
 from fastapi import HTTPException, status
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import and_, select
+from sqlalchemy import and_, delete, select
 from typing import List, Optional, Sequence
 import secrets
 import string
 import structlog
 
-from app.models import Webhook
+from app.models import Webhook, WebhookSubscription
+from app.webhook.routing import publish_routing_invalidation
 from app.webhook.schema import WebhookCreate
 from app.webhook.webhook_notifier import send_test_webhook
 
@@ -120,10 +121,16 @@ class WebhookManager:
             events=webhook_data.events,
             secret=webhook_data.secret,
             is_active=True,
+            # Routing index, one row per subscribed event type
+            subscriptions=[
+                WebhookSubscription(user_id=user_id, event_type=event_type)
+                for event_type in dict.fromkeys(webhook_data.events)
+            ],
         )
         db.add(new_webhook)
         await db.commit()
         await db.refresh(new_webhook)
+        await publish_routing_invalidation(user_id)
 
         return new_webhook
 
@@ -190,8 +197,16 @@ class WebhookManager:
             )
 
         # Soft delete - mark as inactive
+        owner_id = webhook.user_id
         webhook.is_active = False  # type: ignore
+        # Inactive webhooks no longer receive events
+        await db.execute(
+            delete(WebhookSubscription).where(
+                WebhookSubscription.webhook_id == webhook_id
+            )
+        )
         await db.commit()
+        await publish_routing_invalidation(owner_id)
 
         logger.info("Webhook deleted", webhook_id=webhook_id, user_id=user_id)
 
@@ -0,0 +1,76 @@
+# app/webhook/sharding.py
+import zlib
+from typing import Dict, List, Sequence
+
+import structlog
+from prometheus_client import Gauge
+from redis.exceptions import RedisError
+
+from app.core import config
+from app.db.cache import get_redis
+
+logger = structlog.get_logger()
+
+# Delivery queues (Celery queues), most urgent first
+LANES = ("webhooks_priority", "webhooks")
+
+SHARD_QUEUE_DEPTH = Gauge(
+    "webhook_shard_queue_depth",
+    "Messages waiting in each delivery queue shard",
+    ["lane", "shard"],
+)
+
+
+def shard_of(tenant: str, shards: int) -> int:
+    """Shard of a user, stable across processes and restarts"""
+    return zlib.crc32(str(tenant).encode()) % shards
+
+
+def shard_queue(lane: str, shard: int) -> str:
+    return f"{lane}:shard:{shard}"
+
+
+def lane_queues(lane: str, shards: int) -> List[str]:
+    """Queues the messages of a lane are delivered from"""
+    if not shards:
+        return [lane]
+    return [shard_queue(lane, shard) for shard in range(shards)]
+
+
+def tenant_queue(lane: str, tenant: str, shards: int) -> str:
+    if not shards:
+        return lane
+    return shard_queue(lane, shard_of(tenant, shards))
+
+
+def assign_shards(shards: int, slots: Sequence[int]) -> Dict[int, List[int]]:
+    """Spread the shards evenly over the live worker slots"""
+    assignment: Dict[int, List[int]] = {slot: [] for slot in slots}
+    if not slots:
+        return assignment
+    for shard in range(shards):
+        assignment[slots[shard % len(slots)]].append(shard)
+    return assignment
+
+
+async def collect_shard_metrics(
+    lanes: Sequence[str] = LANES,
+    shards: int = config.WEBHOOK_SHARDS,
+):
+    """Refresh the shard queue depths from Redis, called when /metrics is scraped"""
+    if not shards:
+        return
+    try:
+        async with get_redis().pipeline(transaction=False) as pipe:
+            for lane in lanes:
+                for queue in lane_queues(lane, shards):
+                    pipe.llen(queue)
+            depths = await pipe.execute()
+    except RedisError as e:
+        logger.warning("Failed to collect shard metrics", error=str(e))
+        return
+
+    depths_iter = iter(depths)
+    for lane in lanes:
+        for shard in range(shards):
+            SHARD_QUEUE_DEPTH.labels(lane=lane, shard=str(shard)).set(next(depths_iter))
@@ -0,0 +1,154 @@
+# app/webhook/supervisor.py
+"""Runs one asyncio delivery worker per core and shards users across them.
+
+With WEBHOOK_SHARDS set, the fair queue dispatcher routes each user's
+messages to the queue of its shard, a hash of the user_id. Every shard is
+served by a single worker process, so a user's deliveries and the per-host
+limits they adapt stay in one process. When a process dies its shards are
+spread over the others until it has been restarted:
+
+    python -m app.webhook.supervisor --processes 4
+"""
+
+import argparse
+import asyncio
+import multiprocessing
+import os
+import signal
+import threading
+import time
+from typing import Dict, Optional, Sequence
+
+import structlog
+from redis.exceptions import RedisError
+
+from app.core import config
+from app.webhook.sharding import LANES, assign_shards
+from app.webhook.worker import (
+    AsyncWorker,
+    main,
+    requeue_sync,
+    worker_name,
+    worker_queues,
+)
+
+logger = structlog.get_logger()
+
+
+def _run_worker(slot: int, owners: Sequence[int], shards: int, concurrency: int):
+    worker = AsyncWorker(
+        concurrency=concurrency, shards=shards, owners=owners, slot=slot
+    )
+    asyncio.run(main(worker))
+
+
+class Supervisor:
+    """Forks the worker processes, restarts the ones that die and assigns
+    shards to the live ones through a shared shard-to-slot array"""
+
+    def __init__(
+        self,
+        processes: int = os.cpu_count() or 1,
+        concurrency: int = config.ASYNC_WORKER_CONCURRENCY,
+        shards: int = config.WEBHOOK_SHARDS,
+        restart_delay: float = config.SUPERVISOR_RESTART_DELAY,
+        check_interval: float = 1.0,
+    ):
+        self.processes = processes
+        self.concurrency = concurrency
+        self.shards = shards
+        self.restart_delay = restart_delay
+        self.check_interval = check_interval
+        self.queues = worker_queues(LANES, shards)
+        self.owners = multiprocessing.Array("i", [-1] * shards)
+        self.children: Dict[int, multiprocessing.Process] = {}
+        # Slots waiting to be restarted, by time.monotonic() to restart at
+        self.restarts: Dict[int, float] = {}
+        self._stopping = threading.Event()
+
+    def start_worker(self, slot: int):
+        child = multiprocessing.Process(
+            target=_run_worker,
+            args=(slot, self.owners, self.shards, self.concurrency),
+            name=f"webhook-worker-{slot}",
+        )
+        child.start()
+        self.children[slot] = child
+
+    def rebalance(self):
+        live = sorted(slot for slot, child in self.children.items() if child.is_alive())
+        for slot, shards in assign_shards(self.shards, live).items():
+            for shard in shards:
+                self.owners[shard] = slot
+        logger.info("Shards assigned", slots=live, shards=self.shards)
+
+    def check(self):
+        """Replace dead workers, moving their shards to the live ones meanwhile"""
+        changed = False
+        for slot, child in list(self.children.items()):
+            if child.is_alive():
+                continue
+            child.join()
+            del self.children[slot]
+            logger.error(
+                "Worker process died", slot=slot, pid=child.pid, exitcode=child.exitcode
+            )
+            self._release(child.pid)
+            self.restarts[slot] = time.monotonic() + self.restart_delay
+            changed = True
+
+        now = time.monotonic()
+        for slot, restart_at in list(self.restarts.items()):
+            if restart_at <= now:
+                del self.restarts[slot]
+                self.start_worker(slot)
+                changed = True
+
+        if changed:
+            self.rebalance()
+
+    def _release(self, pid: Optional[int]):
+        try:
+            requeued = requeue_sync(worker_name(pid), self.queues)
+        except RedisError as e:
+            # Recovered by the heartbeats of the other workers instead
+            logger.error("Failed to requeue tasks of dead worker", error=str(e))
+            return
+        if requeued:
+            logger.warning("Requeued tasks of dead worker", pid=pid, count=requeued)
+
+    def run(self):
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(sig, lambda signum, frame: self.stop())
+        for slot in range(self.processes):
+            self.start_worker(slot)
+        self.rebalance()
+        logger.info("Supervisor started", processes=self.processes, shards=self.shards)
+
+        while not self._stopping.wait(self.check_interval):
+            self.check()
+
+        for child in self.children.values():
+            if child.is_alive():
+                os.kill(child.pid, signal.SIGTERM)
+        for child in self.children.values():
+            child.join(config.ASYNC_WORKER_SHUTDOWN_TIMEOUT + 10)
+            if child.is_alive():
+                logger.error("Worker did not stop in time", pid=child.pid)
+                child.kill()
+                child.join()
+                self._release(child.pid)
+        logger.info("Supervisor stopped")
+
+    def stop(self):
+        self._stopping.set()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--processes", type=int, default=os.cpu_count() or 1)
+    parser.add_argument(
+        "--concurrency", type=int, default=config.ASYNC_WORKER_CONCURRENCY
+    )
+    args = parser.parse_args()
+    Supervisor(processes=args.processes, concurrency=args.concurrency).run()
@@ -2,18 +2,39 @@
 import uuid
 import httpx
 import structlog
-from typing import Dict, Any
-from datetime import datetime
+from typing import Dict, Any, List, Mapping, Optional, Sequence, Set, Tuple, TypedDict
+from datetime import datetime, timedelta
 from celery import Celery  # type: ignore
-from sqlalchemy import and_
-from sqlalchemy.sql import text
+from celery.signals import worker_process_shutdown  # type: ignore
+from sqlalchemy import cast, column, func, insert, select, update, values
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from redis.exceptions import RedisError
 from sqlalchemy.exc import SQLAlchemyError
 from celery.exceptions import CeleryError  # type: ignore
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.db.session import SessionLocal
+from app.db import partitions
+from app.db.session import SessionLocal, engine
 from app.core import config
-from sqlalchemy.orm import Session
-from app.models import Subscriber, Webhook, WebhookDelivery, WebhookEvent
+from sqlalchemy.orm import Session, joinedload
+from app.db.base_model import now
+from app.models import Webhook, WebhookDelivery, WebhookEvent, WebhookSubscription
+from app.subscriber.counter import subscriber_counter
+from app.webhook.blobstore import BlobStoreError, check_in, expire_blobs
+from app.webhook.broker import AsyncBroker
+from app.webhook.fairqueue import FairQueue
+from app.webhook.delivery import (
+    DEFAULT_HEADERS,
+    DeliveryEngine,
+    encode_payload,
+    get_delivery_engine,
+    run_on_worker_loop,
+    shutdown_delivery_engine,
+    signature_headers,
+)
+from app.webhook.routing import get_routing_cache
+from app.webhook.serialization import register_msgpack
+from app.webhook.schema import DeliveryResult, WebhookTarget
 
 logger = structlog.get_logger()
 
@@ -21,13 +42,16 @@ logger = structlog.get_logger()
 celery_app = Celery(
     "webhook_notifier",
     broker=f"redis://{config.REDIS_HOST}:{config.REDIS_PORT}/0",
-    backend=f"redis://{config.REDIS_HOST}:{config.REDIS_PORT}/0",
 )
 
+register_msgpack()
 celery_app.conf.update(
-    task_serializer="json",
-    accept_content=["json"],
-    result_serializer="json",
+    task_serializer=config.CELERY_TASK_SERIALIZER,
+    # Messages enqueued under a previous setting are still read
+    accept_content=["json", "msgpack"],
+    # Tasks are fire-and-forget, outcomes are recorded on the deliveries.
+    # Without a result backend no return value is written back to Redis.
+    task_ignore_result=True,
     timezone="UTC",
     enable_utc=True,
     worker_prefetch_multiplier=1,
@@ -38,10 +62,38 @@ celery_app.conf.update(
         "webhook_notifier.process_webhook_event_high_priority": {
             "queue": "webhooks_priority"
         },
+        "webhook_notifier.process_webhook_event_batch": {"queue": "webhooks"},
+        "webhook_notifier.process_webhook_event_batch_high_priority": {
+            "queue": "webhooks_priority"
+        },
+    },
+    beat_schedule={
+        "retry-due-webhook-deliveries": {
+            "task": "app.webhook.webhook_notifier.retry_due_deliveries",
+            "schedule": config.WEBHOOK_RETRY_POLL_INTERVAL,
+            "options": {"queue": "webhooks"},
+        },
+        # Partitions are created days ahead, hourly runs leave plenty of slack
+        "maintain-webhook-partitions": {
+            "task": "app.webhook.webhook_notifier.maintain_partitions",
+            "schedule": 3600.0,
+            "options": {"queue": "webhooks"},
+        },
     },
 )
 
 
+# Non-blocking producer used by the outbox relay
+async_broker = AsyncBroker(celery_app)
+# Events are published per user and dispatched fairly to the Celery queues
+fair_queue = FairQueue(async_broker)
+
+
+@worker_process_shutdown.connect
+def _close_delivery_engine(**kwargs):
+    shutdown_delivery_engine()
+
+
 class WebhookNotifier:
     def __init__(self):
         self.max_retries = 5
@@ -50,36 +102,39 @@ class WebhookNotifier:
     def publish_event(self, event_type: str, user_id: uuid.UUID, data: Dict[str, Any]):
         """Publish webhook event to message queue"""
         event_id = str(uuid.uuid4())
+        created_at = now()
 
         # Store event in database for tracking
         db = SessionLocal()
         try:
+            # Large data is enqueued and stored as a claim check
+            data = check_in(event_id, created_at, data)
             webhook_event = WebhookEvent(
                 event_id=event_id,
                 event_type=event_type,
                 user_id=user_id,
                 data=data,
                 processed=False,
+                # Enqueued right below, keep it out of the outbox
+                published_at=created_at,
+                created_at=created_at,
             )
             db.add(webhook_event)
             db.commit()
 
             # Determine priority based on user's subscriber count
             subscriber_count = self._get_subscriber_count(db, user_id)
-
-            if subscriber_count > 10000:  # Whale account
-                # Use lower priority queue with rate limiting
-                process_webhook_event.apply_async(
-                    args=[event_id, event_type, user_id, data],
-                    queue="webhooks",
-                    countdown=self._calculate_delay(subscriber_count),
-                )
-            else:
-                # Use high priority queue
-                process_webhook_event_high_priority.apply_async(
-                    args=[event_id, event_type, user_id, data],
-                    queue="webhooks_priority",
-                )
+            queue = self._select_queue(subscriber_count)
+            fair_queue.enqueue_sync(
+                [
+                    (
+                        queue,
+                        str(user_id),
+                        self._event_task(queue).name,
+                        [event_id, event_type, user_id, data, created_at.isoformat()],
+                    )
+                ]
+            )
 
             logger.info(
                 "Webhook event published",
@@ -99,7 +154,16 @@ class WebhookNotifier:
                 "status": "error",
                 "message": "Failed to store event in the database",
             }
-        except CeleryError as queue_error:
+        except BlobStoreError as blob_error:
+            logger.error(
+                "Blob store error occurred while publishing webhook event",
+                extra={"event_id": event_id, "error": str(blob_error)},
+            )
+            return {
+                "status": "error",
+                "message": "Failed to store event payload",
+            }
+        except (CeleryError, RedisError) as queue_error:
             logger.error(
                 "Queue error occurred while publishing webhook event",
                 extra={"event_id": event_id, "error": str(queue_error)},
@@ -111,55 +175,291 @@ class WebhookNotifier:
         finally:
             db.close()
 
+    def stage_event(
+        self,
+        db: AsyncSession,
+        event_type: str,
+        user_id: uuid.UUID,
+        data: Dict[str, Any],
+    ) -> str:
+        """Stage a webhook event in the caller's transaction (transactional outbox)
+
+        The event row is committed together with the caller's changes and is
+        enqueued afterwards by the outbox relay, see app/webhook/outbox.py.
+        """
+        event_id = str(uuid.uuid4())
+        db.add(
+            WebhookEvent(
+                event_id=event_id,
+                event_type=event_type,
+                user_id=user_id,
+                data=data,
+                processed=False,
+                created_at=now(),
+            )
+        )
+        return event_id
+
+    async def publish_outbox(self, db: AsyncSession, batch_size: int) -> int:
+        """Enqueue a batch of staged events, returns how many were published
+
+        Rows are locked with FOR UPDATE SKIP LOCKED so several relays can drain
+        the outbox concurrently, and the whole batch is pushed to the fair
+        queue in one pipelined round trip.
+        """
+        result = await db.execute(
+            select(WebhookEvent)
+            .where(WebhookEvent.published_at.is_(None))
+            .order_by(WebhookEvent.created_at)
+            .limit(batch_size)
+            .with_for_update(skip_locked=True)
+        )
+        events = result.scalars().all()
+        if not events:
+            await db.rollback()
+            return 0
+
+        # Determine priority once per user
+        subscriber_counts = await self._get_subscriber_counts_async(
+            db, {event.user_id for event in events}
+        )
+        tasks = []
+        for event in events:
+            queue = self._select_queue(subscriber_counts[event.user_id])
+            tasks.append(
+                (
+                    queue,
+                    str(event.user_id),
+                    self._event_task(queue).name,
+                    [
+                        event.event_id,
+                        event.event_type,
+                        event.user_id,
+                        event.data,
+                        event.created_at.isoformat(),
+                    ],
+                )
+            )
+
+        # Enqueue before marking the rows published. A crash in between
+        # re-sends the batch, which delivery idempotency absorbs.
+        await fair_queue.enqueue(tasks)
+        await db.execute(
+            update(WebhookEvent)
+            .where(
+                WebhookEvent.id.in_([event.id for event in events]),
+                # Only the partitions of the batch are searched
+                WebhookEvent.created_at.in_({event.created_at for event in events}),
+            )
+            .values(published_at=func.now())
+        )
+        await db.commit()
+
+        logger.info("Webhook events published from outbox", count=len(events))
+        return len(events)
+
+    def publish_events(self, batch: Sequence[Tuple[str, uuid.UUID, Dict[str, Any]]]):
+        """Publish a batch of (event_type, user_id, data) webhook events
+
+        All events are stored with one multi-row INSERT in a single
+        transaction, the subscriber count is looked up once per user and each
+        user's events are enqueued in chunks, one Celery message per chunk.
+        """
+        events = [
+            (str(uuid.uuid4()), event_type, user_id, data)
+            for event_type, user_id, data in batch
+        ]
+        if not events:
+            return {"status": "success", "message": "No events to publish"}
+
+        # Also the events' created_at, which the workers look them up by
+        published_at = now()
+        db = SessionLocal()
+        try:
+            # Large data is enqueued and stored as a claim check
+            events = [
+                (event_id, event_type, user_id, check_in(event_id, published_at, data))
+                for event_id, event_type, user_id, data in events
+            ]
+            db.execute(
+                insert(WebhookEvent),
+                [
+                    {
+                        "event_id": event_id,
+                        "event_type": event_type,
+                        "user_id": user_id,
+                        "data": data,
+                        "processed": False,
+                        "published_at": published_at,
+                        "created_at": published_at,
+                    }
+                    for event_id, event_type, user_id, data in events
+                ],
+            )
+            db.commit()
+
+            # Determine priority once per user
+            subscriber_counts = self._get_subscriber_counts(
+                db, {user_id for _, _, user_id, _ in events}
+            )
+
+            # Group events per user, chunks are scheduled fairly per user
+            groups: Dict[Tuple[str, uuid.UUID], List[Any]] = {}
+            for event in events:
+                queue = self._select_queue(subscriber_counts.get(event[2], 0))
+                groups.setdefault((queue, event[2]), []).append(
+                    [*event, published_at.isoformat()]
+                )
+
+            chunk_size = config.WEBHOOK_PUBLISH_CHUNK_SIZE
+            tasks = []
+            for (queue, user_id), queued in groups.items():
+                task = (
+                    process_webhook_event_batch
+                    if queue == "webhooks"
+                    else process_webhook_event_batch_high_priority
+                )
+                for i in range(0, len(queued), chunk_size):
+                    tasks.append(
+                        (queue, str(user_id), task.name, [queued[i : i + chunk_size]])
+                    )
+            fair_queue.enqueue_sync(tasks)
+
+            logger.info(
+                "Webhook events published",
+                count=len(events),
+                users=len(subscriber_counts),
+            )
+            return {
+                "status": "success",
+                "message": "Events published successfully",
+                "event_ids": [event_id for event_id, _, _, _ in events],
+            }
+        except SQLAlchemyError as db_error:
+            logger.error(
+                "Database error occurred while publishing webhook events",
+                extra={"count": len(events), "error": str(db_error)},
+            )
+            db.rollback()
+            return {
+                "status": "error",
+                "message": "Failed to store events in the database",
+            }
+        except BlobStoreError as blob_error:
+            logger.error(
+                "Blob store error occurred while publishing webhook events",
+                extra={"count": len(events), "error": str(blob_error)},
+            )
+            return {
+                "status": "error",
+                "message": "Failed to store event payloads",
+            }
+        except (CeleryError, RedisError) as queue_error:
+            logger.error(
+                "Queue error occurred while publishing webhook events",
+                extra={"count": len(events), "error": str(queue_error)},
+            )
+            return {
+                "status": "error",
+                "message": "Failed to enqueue events for processing",
+            }
+        finally:
+            db.close()
+
     def _get_subscriber_count(self, db: Session, user_id: uuid.UUID) -> int:
-        return db.query(Subscriber).filter(Subscriber.user_id == user_id).count()
+        return subscriber_counter.get_many_sync(db, [user_id])[user_id]
+
+    def _get_subscriber_counts(
+        self, db: Session, user_ids: Set[uuid.UUID]
+    ) -> Dict[uuid.UUID, int]:
+        return subscriber_counter.get_many_sync(db, user_ids)
 
-    def _calculate_delay(self, subscriber_count: int) -> int:
-        """Calculate delay for webhook processing based on account size"""
-        if subscriber_count > 100000:
-            return 30  # 30 second delay for very large accounts
-        elif subscriber_count > 50000:
-            return 15  # 15 second delay for large accounts
-        elif subscriber_count > 10000:
-            return 5  # 5 second delay for medium accounts
-        return 0
+    async def _get_subscriber_counts_async(
+        self, db: AsyncSession, user_ids: Set[uuid.UUID]
+    ) -> Dict[uuid.UUID, int]:
+        return await subscriber_counter.get_many(db, user_ids)
 
+    def _select_queue(self, subscriber_count: int) -> str:
+        """Return the queue for an account of the given size
 
-@celery_app.task(bind=True, max_retries=5)
+        Within a queue every account gets a fair share of the workers, see
+        app/webhook/fairqueue.py, so large accounts are no longer delayed.
+        """
+        if subscriber_count > 10000:  # Whale account
+            # Use lower priority queue
+            return "webhooks"
+        # Use high priority queue
+        return "webhooks_priority"
+
+    def _event_task(self, queue: str):
+        if queue == "webhooks":
+            return process_webhook_event
+        return process_webhook_event_high_priority
+
+
+@celery_app.task(bind=True)
 def process_webhook_event(
-    self, event_id: str, event_type: str, user_id: uuid.UUID, data: Dict[str, Any]
+    self,
+    event_id: str,
+    event_type: str,
+    user_id: uuid.UUID,
+    data: Dict[str, Any],
+    created_at: Optional[str] = None,
 ):
     """Process webhook event with retry mechanism"""
-    return _process_webhook_event_impl(self, event_id, event_type, user_id, data)
+    return _process_webhook_event_impl(
+        self, event_id, event_type, user_id, data, created_at
+    )
 
 
-@celery_app.task(bind=True, max_retries=5)
+@celery_app.task(bind=True)
 def process_webhook_event_high_priority(
-    self, event_id: str, event_type: str, user_id: uuid.UUID, data: Dict[str, Any]
+    self,
+    event_id: str,
+    event_type: str,
+    user_id: uuid.UUID,
+    data: Dict[str, Any],
+    created_at: Optional[str] = None,
 ):
     """Process high priority webhook event"""
-    return _process_webhook_event_impl(self, event_id, event_type, user_id, data)
+    return _process_webhook_event_impl(
+        self, event_id, event_type, user_id, data, created_at
+    )
+
+
+@celery_app.task(bind=True)
+def process_webhook_event_batch(self, events: List[List[Any]]):
+    """Process a chunk of [event_id, event_type, user_id, data, created_at]
+    webhook events"""
+    for event in events:
+        _process_webhook_event_impl(self, *event)
+
+
+@celery_app.task(bind=True)
+def process_webhook_event_batch_high_priority(self, events: List[List[Any]]):
+    """Process a chunk of high priority webhook events"""
+    for event in events:
+        _process_webhook_event_impl(self, *event)
 
 
 def _process_webhook_event_impl(
-    task, event_id: str, event_type: str, user_id: uuid.UUID, data: Dict[str, Any]
+    task,
+    event_id: str,
+    event_type: str,
+    user_id: uuid.UUID,
+    data: Dict[str, Any],
+    created_at: Optional[str] = None,
 ):
-    """Implementation of webhook event processing"""
+    """Implementation of webhook event processing
+
+    created_at is the event's partition key, every publisher sends it.
+    Messages enqueued before the tables were partitioned do not carry it and
+    are keyed by their event row.
+    """
     db = SessionLocal()
     try:
         # Get all active webhooks for this user that listen to this event
-        webhooks = (
-            db.query(Webhook)
-            .filter(
-                and_(
-                    Webhook.user_id == user_id,
-                    Webhook.is_active,
-                    text("webhooks.events::jsonb @> :event_type"),
-                )
-            )
-            .params(event_type=f'["{event_type}"]')
-            .all()
-        )
+        webhooks = _get_webhook_targets(db, user_id, event_type)
 
         if not webhooks:
             logger.info(
@@ -170,146 +470,521 @@ def _process_webhook_event_impl(
             )
             return
 
-        # Create payload
-        payload = {
-            "event_id": event_id,
-            "event_type": event_type,
-            "timestamp": datetime.utcnow().isoformat(),
-            "data": data,
-        }
-
-        # Send to each webhook
-        for webhook in webhooks:
-            try:
-                # Ensure that the event processing is idempotent
-                # so that retries do not result in duplicate webhook deliveries.
-                # For the production system, we should check for the delivery
-                # existence before creating a new one.
-                # key(webhook.id, event_id)
-                delivery = None
-                existing_delivery = (
-                    db.query(WebhookDelivery)
-                    .filter(
-                        WebhookDelivery.webhook_id == webhook.id,
-                        WebhookDelivery.event_id == event_id,
-                    )
-                    .first()
-                )
-                if not existing_delivery:
-                    delivery = WebhookDelivery(
-                        webhook_id=webhook.id,
-                        event_id=event_id,
-                        payload=payload,
-                        status="pending",
-                        attempts=0,
-                    )
-                    db.add(delivery)
-                    db.commit()
-                else:
-                    if existing_delivery.status == "delivered":
-                        logger.info(
-                            "Webhook already delivered",
-                            webhook_id=webhook.id,
-                            event_id=event_id,
-                        )
-                        continue
-                    else:
-                        delivery = existing_delivery
-                if delivery:
-                    # Send HTTP request
-                    success = _send_webhook_request(webhook, payload, delivery, db)
-
-                    if not success and task.request.retries < task.max_retries:
-                        # Retry with exponential backoff
-                        retry_delay = WebhookNotifier().retry_delays[
-                            task.request.retries
-                        ]
-                        raise task.retry(countdown=retry_delay)
-
-            except Exception as e:
-                logger.error(
-                    "Failed to process webhook delivery",
-                    webhook_id=webhook.id,
-                    event_id=event_id,
-                    error=str(e),
-                )
-                continue
-
-        # Mark event as processed
-        webhook_event = (
-            db.query(WebhookEvent).filter(WebhookEvent.event_id == event_id).first()
+        # The event is processed once its deliveries exist, from then on the
+        # retry scheduler owns them
+        event_created_at = _parse_created_at(created_at)
+        stored_at = db.execute(
+            _mark_event_processed(event_id, event_created_at)
+        ).scalar()
+        event_created_at = stored_at or event_created_at
+        if event_created_at is None:
+            _drop_unkeyed_event(event_id)
+            return
+        payload = _event_payload(event_id, event_type, data, event_created_at)
+        inserted = db.execute(
+            _insert_deliveries(
+                webhooks, event_id, payload, event_created_at, stored_at is None
+            )
+        ).all()
+        db.commit()
+        delivery_ids, pending = _pending_webhooks(webhooks, inserted, event_id)
+
+        # Send to all webhooks concurrently over the worker's pooled client.
+        # Failures are rescheduled per delivery rather than retrying the event.
+        results = run_on_worker_loop(get_delivery_engine().deliver(pending, payload))
+        _record_delivery_outcomes(
+            db,
+            _fan_out_outcomes(
+                delivery_ids, pending, results, event_id, event_created_at
+            ),
         )
-        if webhook_event:
-            webhook_event.processed = True  # type: ignore
-            db.commit()
+        db.commit()
 
     finally:
         db.close()
 
 
-def _send_webhook_request(
-    webhook: Webhook,
+async def process_webhook_event_async(
+    db: AsyncSession,
+    engine: DeliveryEngine,
+    event_id: str,
+    event_type: str,
+    user_id: uuid.UUID,
+    data: Dict[str, Any],
+    created_at: Optional[str] = None,
+):
+    """Asyncio counterpart of _process_webhook_event_impl, see app/webhook/worker.py"""
+    webhooks = await _get_webhook_targets_async(db, user_id, event_type)
+    if not webhooks:
+        logger.info(
+            "No webhooks found for event",
+            event_id=event_id,
+            event_type=event_type,
+            user_id=str(user_id),
+        )
+        return
+
+    event_created_at = _parse_created_at(created_at)
+    stored_at = (
+        await db.execute(_mark_event_processed(event_id, event_created_at))
+    ).scalar()
+    event_created_at = stored_at or event_created_at
+    if event_created_at is None:
+        _drop_unkeyed_event(event_id)
+        return
+    payload = _event_payload(event_id, event_type, data, event_created_at)
+    inserted = (
+        await db.execute(
+            _insert_deliveries(
+                webhooks, event_id, payload, event_created_at, stored_at is None
+            )
+        )
+    ).all()
+    await db.commit()
+    delivery_ids, pending = _pending_webhooks(webhooks, inserted, event_id)
+
+    results = await engine.deliver(pending, payload)
+    for statement in _delivery_outcome_updates(
+        _fan_out_outcomes(delivery_ids, pending, results, event_id, event_created_at)
+    ):
+        await db.execute(statement)
+    await db.commit()
+
+
+def _parse_created_at(created_at: Optional[str]) -> Optional[datetime]:
+    return datetime.fromisoformat(created_at) if created_at else None
+
+
+def _drop_unkeyed_event(event_id: str):
+    # Deliveries are deduplicated by their event's created_at. Made up here, a
+    # redelivered task would create its deliveries a second time.
+    logger.error(
+        "Webhook event has no row and its task no created_at, dropping it",
+        event_id=event_id,
+    )
+
+
+def _event_payload(
+    event_id: str,
+    event_type: str,
+    data: Dict[str, Any],
+    created_at: datetime,
+) -> Dict[str, Any]:
+    """The body sent for an event, the same for every attempt"""
+    return {
+        "event_id": event_id,
+        "event_type": event_type,
+        "timestamp": created_at.isoformat(),
+        "data": data,
+    }
+
+
+def _insert_deliveries(
+    webhooks: Sequence[WebhookTarget],
+    event_id: str,
     payload: Dict[str, Any],
-    delivery: WebhookDelivery,
-    db: Session,
-) -> bool:
-    """Send HTTP POST request to webhook URL"""
-    try:
-        headers = {
-            "Content-Type": "application/json",
-            "User-Agent": "Whookfirm-Webhooks/1.0",
+    created_at: datetime,
+    store_payload: bool,
+):
+    """INSERT the missing deliveries of an event, returning (id, webhook_id)
+
+    Ensure that the event processing is idempotent so that redelivered tasks do
+    not result in duplicate webhook deliveries. key(webhook.id, event_id,
+    created_at) is unique, so one INSERT creates every missing delivery and
+    skips the rest. Deliveries take the created_at of their event, so the
+    conflict check only probes the index of the event's partition. A
+    delivery that already exists is owned by the retry scheduler, which
+    re-sends it once its next_attempt is due. The lease makes the retry
+    scheduler pick new deliveries up should this worker die before recording
+    the attempt.
+
+    Retries rebuild the payload from the event row, so it is only copied into
+    the deliveries of events without one.
+    """
+    lease_until = now() + timedelta(seconds=config.WEBHOOK_DELIVERY_LEASE_SECONDS)
+    return (
+        pg_insert(WebhookDelivery)
+        .values(
+            [
+                {
+                    "webhook_id": webhook.id,
+                    "event_id": event_id,
+                    "payload": payload if store_payload else None,
+                    "status": "pending",
+                    "attempts": 0,
+                    "next_attempt": lease_until,
+                    "created_at": created_at,
+                }
+                for webhook in webhooks
+            ]
+        )
+        .on_conflict_do_nothing(index_elements=["webhook_id", "event_id", "created_at"])
+        .returning(WebhookDelivery.id, WebhookDelivery.webhook_id)
+    )
+
+
+def _pending_webhooks(
+    webhooks: Sequence[WebhookTarget], inserted: Sequence[Any], event_id: str
+) -> Tuple[Dict[uuid.UUID, uuid.UUID], List[WebhookTarget]]:
+    """Delivery ids by webhook and the webhooks whose delivery was just created"""
+    delivery_ids = {webhook_id: delivery_id for delivery_id, webhook_id in inserted}
+    pending = [webhook for webhook in webhooks if webhook.id in delivery_ids]
+    if len(pending) < len(webhooks):
+        logger.info(
+            "Webhook deliveries already exist",
+            event_id=event_id,
+            count=len(webhooks) - len(pending),
+        )
+    return delivery_ids, pending
+
+
+class DeliveryOutcome(TypedDict, total=False):
+    """Delivery column values recording an attempt, deferred ones only set
+    status and next_attempt"""
+
+    id: uuid.UUID
+    created_at: datetime
+    attempts: int
+    last_attempt: datetime
+    response_status: Optional[int]
+    response_body: Optional[str]
+    response_time_ms: Optional[int]
+    status: str
+    next_attempt: Optional[datetime]
+
+
+def _fan_out_outcomes(
+    delivery_ids: Dict[uuid.UUID, uuid.UUID],
+    pending: Sequence[WebhookTarget],
+    results: Sequence[DeliveryResult],
+    event_id: str,
+    created_at: datetime,
+) -> List[DeliveryOutcome]:
+    return [
+        {
+            "id": delivery_ids[webhook.id],
+            "created_at": created_at,
+            **_delivery_outcome(0, result, event_id),
         }
+        for webhook, result in zip(pending, results)
+    ]
 
-        with httpx.Client(timeout=30.0) as client:
-            # URL: https://jsonplaceholder.typicode.com/posts
-            # EVENT: subscriber.created
-            response = client.post(
-                webhook.url,  # type: ignore
-                json=payload,
-                headers=headers,
+
+def _mark_event_processed(event_id: str, created_at: Optional[datetime]):
+    """UPDATE returning the event's created_at, nothing if there is no row"""
+    statement = update(WebhookEvent).where(WebhookEvent.event_id == event_id)
+    if created_at is not None:
+        # Only the event's partition is searched
+        statement = statement.where(WebhookEvent.created_at == created_at)
+    return statement.values(processed=True).returning(WebhookEvent.created_at)
+
+
+@celery_app.task
+def maintain_partitions():
+    """Create upcoming partitions of the event tables and drop expired ones"""
+    with engine.begin() as conn:
+        changes = partitions.maintain_partitions(conn)
+    expire_blobs(now().date())
+    return changes
+
+
+@celery_app.task
+def retry_due_deliveries():
+    """Re-send failed deliveries whose next attempt is due"""
+    return _retry_due_deliveries_impl(config.WEBHOOK_RETRY_BATCH_SIZE)
+
+
+def _retry_due_deliveries_impl(batch_size: int) -> int:
+    """Drain due deliveries batch by batch, returns the number of attempts made"""
+    db = SessionLocal()
+    attempted = 0
+    try:
+        while True:
+            deliveries = _claim_due_deliveries(db, batch_size)
+            if not deliveries:
+                break
+
+            payloads = _event_payloads(
+                db.execute(_select_event_payloads(deliveries)).all()
             )
+            active, requests = _retry_requests(deliveries, payloads)
+            results = run_on_worker_loop(get_delivery_engine().deliver_batch(requests))
+            for delivery, result in zip(active, results):
+                _apply_delivery_result(delivery, result)
+            db.commit()
 
-            # Update delivery record
-            delivery.attempts += 1  # type: ignore
-            delivery.last_attempt = datetime.utcnow()  # type: ignore
-            delivery.response_status = response.status_code  # type: ignore
-            delivery.response_body = response.text[:1000]  # type: ignore
-
-            if response.status_code < 400:
-                delivery.status = "delivered"  # type: ignore
-                logger.info(
-                    "Webhook delivered successfully",
-                    webhook_id=webhook.id,
-                    status_code=response.status_code,
-                )
-                db.commit()
-                return True
-            else:
-                delivery.status = "failed"  # type: ignore
-                logger.warning(
-                    "Webhook delivery failed",
-                    webhook_id=webhook.id,
-                    status_code=response.status_code,
-                )
-                db.commit()
-                return False
+            attempted += len(results)
+            logger.info("Retried due webhook deliveries", count=len(results))
+            if len(deliveries) < batch_size:
+                break
+        return attempted
+    finally:
+        db.close()
 
-    except Exception as e:
-        delivery.attempts += 1  # type: ignore
-        delivery.last_attempt = datetime.utcnow()  # type: ignore
-        delivery.status = "failed"  # type: ignore
-        delivery.response_body = str(e)[:1000]  # type: ignore
-        db.commit()
 
-        logger.error("Webhook request failed", webhook_id=webhook.id, error=str(e))
-        return False
+async def retry_due_deliveries_async(
+    db: AsyncSession, engine: DeliveryEngine, batch_size: int
+) -> int:
+    """Asyncio counterpart of _retry_due_deliveries_impl"""
+    attempted = 0
+    while True:
+        claimed_ids = (await db.execute(_claim_due(batch_size))).scalars().all()
+        await db.commit()
+        if not claimed_ids:
+            break
+        deliveries = (
+            (
+                await db.execute(
+                    select(WebhookDelivery)
+                    .options(joinedload(WebhookDelivery.webhook))
+                    .where(WebhookDelivery.id.in_(claimed_ids))
+                )
+            )
+            .scalars()
+            .all()
+        )
+
+        payloads = _event_payloads(
+            (await db.execute(_select_event_payloads(deliveries))).all()
+        )
+        active, requests = _retry_requests(deliveries, payloads)
+        results = await engine.deliver_batch(requests)
+        for delivery, result in zip(active, results):
+            _apply_delivery_result(delivery, result)
+        await db.commit()
+
+        attempted += len(results)
+        logger.info("Retried due webhook deliveries", count=len(results))
+        if len(claimed_ids) < batch_size:
+            break
+    return attempted
+
+
+def _select_event_payloads(deliveries: Sequence[WebhookDelivery]):
+    """The events of deliveries that did not store their payload"""
+    missing = [delivery for delivery in deliveries if delivery.payload is None]
+    return select(
+        WebhookEvent.event_id,
+        WebhookEvent.event_type,
+        WebhookEvent.data,
+        WebhookEvent.created_at,
+    ).where(
+        WebhookEvent.event_id.in_({str(delivery.event_id) for delivery in missing}),
+        # Deliveries share their event's created_at (older ones were aligned by
+        # migration 2f8c4e1a7b95), this prunes the partitions
+        WebhookEvent.created_at.in_({delivery.created_at for delivery in missing}),
+    )
+
+
+def _event_payloads(events: Sequence[Any]) -> Dict[str, Dict[str, Any]]:
+    """Payloads by event_id, one object per event so it is encoded once"""
+    return {
+        event_id: _event_payload(event_id, event_type, data, created_at)
+        for event_id, event_type, data, created_at in events
+    }
+
+
+def _retry_requests(
+    deliveries: Sequence[WebhookDelivery], payloads: Dict[str, Dict[str, Any]]
+) -> Tuple[List[WebhookDelivery], List[Tuple[WebhookTarget, Dict[str, Any]]]]:
+    """Deliveries of active webhooks with what to send them"""
+    active, requests = [], []
+    for delivery in deliveries:
+        payload = delivery.payload
+        if payload is None:
+            payload = payloads.get(str(delivery.event_id))
+        if not delivery.webhook.is_active:
+            # The webhook was deleted, stop retrying
+            delivery.next_attempt = None  # type: ignore
+        elif payload is None:
+            logger.error(
+                "Webhook event not found, dropping delivery",
+                event_id=delivery.event_id,
+                webhook_id=delivery.webhook_id,
+            )
+            delivery.next_attempt = None  # type: ignore
+        else:
+            active.append(delivery)
+            requests.append((WebhookTarget.model_validate(delivery.webhook), payload))
+    return active, requests
+
+
+def _claim_due(batch_size: int):
+    """Lease a batch of due deliveries so concurrent schedulers skip them"""
+    due = (
+        select(WebhookDelivery.id)
+        .where(WebhookDelivery.next_attempt <= func.now())
+        .order_by(WebhookDelivery.next_attempt)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+    )
+    return (
+        update(WebhookDelivery)
+        .where(WebhookDelivery.id.in_(due.scalar_subquery()))
+        .values(
+            next_attempt=func.now()
+            + timedelta(seconds=config.WEBHOOK_DELIVERY_LEASE_SECONDS)
+        )
+        .returning(WebhookDelivery.id)
+    )
+
+
+def _claim_due_deliveries(db: Session, batch_size: int) -> List[WebhookDelivery]:
+    claimed_ids = db.execute(_claim_due(batch_size)).scalars().all()
+    db.commit()
+    if not claimed_ids:
+        return []
+    return (
+        db.query(WebhookDelivery)
+        .options(joinedload(WebhookDelivery.webhook))
+        .filter(WebhookDelivery.id.in_(claimed_ids))
+        .all()
+    )
+
+
+def _get_webhook_targets(
+    db: Session, user_id: uuid.UUID, event_type: str
+) -> List[WebhookTarget]:
+    """Active webhooks of a user for an event type, served from the worker cache"""
+    routing_cache = get_routing_cache()
+    targets = routing_cache.get(user_id, event_type)
+    if targets is not None:
+        return targets
+
+    generation = routing_cache.generation(user_id)
+    webhooks = (
+        db.query(Webhook)
+        .join(WebhookSubscription, WebhookSubscription.webhook_id == Webhook.id)
+        .filter(
+            WebhookSubscription.user_id == user_id,
+            WebhookSubscription.event_type == event_type,
+            Webhook.is_active,
+        )
+        .all()
+    )
+    targets = [WebhookTarget.model_validate(webhook) for webhook in webhooks]
+    routing_cache.set(user_id, event_type, targets, generation)
+    return targets
+
+
+async def _get_webhook_targets_async(
+    db: AsyncSession, user_id: uuid.UUID, event_type: str
+) -> List[WebhookTarget]:
+    routing_cache = get_routing_cache()
+    targets = routing_cache.get(user_id, event_type)
+    if targets is not None:
+        return targets
+
+    generation = routing_cache.generation(user_id)
+    result = await db.execute(
+        select(Webhook)
+        .join(WebhookSubscription, WebhookSubscription.webhook_id == Webhook.id)
+        .where(
+            # Task arguments arrive as JSON, asyncpg only binds real UUIDs
+            WebhookSubscription.user_id == uuid.UUID(str(user_id)),
+            WebhookSubscription.event_type == event_type,
+            Webhook.is_active,
+        )
+    )
+    targets = [WebhookTarget.model_validate(webhook) for webhook in result.scalars()]
+    routing_cache.set(user_id, event_type, targets, generation)
+    return targets
+
+
+def _apply_delivery_result(delivery: WebhookDelivery, result: DeliveryResult):
+    """Update delivery record with the outcome of an attempt"""
+    delivery.update(**_delivery_outcome(delivery.attempts, result, delivery.event_id))  # type: ignore
+
+
+def _delivery_outcome(
+    previous_attempts: int, result: DeliveryResult, event_id: Any
+) -> DeliveryOutcome:
+    """Delivery column values recording an attempt"""
+    if result.deferred:
+        # Not attempted, the retry scheduler sends it once the circuit allows
+        return {"status": "deferred", "next_attempt": result.retry_at}
+
+    outcome: DeliveryOutcome = {
+        "attempts": previous_attempts + 1,
+        "last_attempt": result.attempted_at,
+        "response_status": result.status_code,
+        "response_body": result.response_body,
+        "response_time_ms": result.response_time_ms,
+        "status": "delivered",
+        "next_attempt": None,
+    }
+    if result.success:
+        return outcome
+
+    outcome["status"] = "failed"
+    notifier = WebhookNotifier()
+    if outcome["attempts"] <= notifier.max_retries:
+        # Retry with exponential backoff
+        retry_delay = notifier.retry_delays[outcome["attempts"] - 1]
+        outcome["next_attempt"] = result.attempted_at + timedelta(seconds=retry_delay)
+    else:
+        logger.warning(
+            "Webhook delivery retries exhausted",
+            webhook_id=result.webhook_id,
+            event_id=event_id,
+            attempts=outcome["attempts"],
+        )
+    return outcome
+
+
+def _record_delivery_outcomes(db: Session, outcomes: Sequence[DeliveryOutcome]):
+    for statement in _delivery_outcome_updates(outcomes):
+        db.execute(statement)
+
+
+def _delivery_outcome_updates(outcomes: Sequence[DeliveryOutcome]) -> List[Any]:
+    """UPDATEs writing the outcomes of many attempts, keyed by "id" and
+    "created_at" (the partition key), one each for attempted and deferred
+    deliveries"""
+    table = WebhookDelivery.__table__
+    groups: Dict[Tuple[str, ...], List[Mapping[str, Any]]] = {}
+    for outcome in outcomes:
+        groups.setdefault(tuple(outcome), []).append(outcome)
+    statements = []
+    for names, group in groups.items():
+        keys = [name for name in ("id", "created_at") if name in names]
+        rows = values(
+            *(column(name, table.c[name].type) for name in names), name="outcomes"
+        ).data([tuple(outcome[name] for name in names) for outcome in group])
+        # Parameters in VALUES arrive untyped (and all-NULL columns as text), so
+        # every column is cast back to the type of the column it updates.
+        statements.append(
+            update(WebhookDelivery)
+            .where(
+                *(
+                    table.c[name] == cast(rows.c[name], table.c[name].type)
+                    for name in keys
+                )
+            )
+            .values(
+                {
+                    name: cast(rows.c[name], table.c[name].type)
+                    for name in names
+                    if name not in keys
+                }
+            )
+        )
+    return statements
 
 
 def send_test_webhook(webhook: Webhook, payload: Dict[str, Any]) -> bool:
     """Send a test webhook request"""
     try:
         with httpx.Client(timeout=10.0) as client:
-            response = client.post(webhook.url, json=payload)  # type: ignore
+            body = encode_payload(payload)
+            response = client.post(
+                webhook.url,  # type: ignore
+                content=body,
+                headers={
+                    **DEFAULT_HEADERS,
+                    **signature_headers(webhook.secret, body),  # type: ignore
+                },
+            )
 
             logger.info(
                 "Test webhook sent",
@@ -0,0 +1,422 @@
+# app/webhook/worker.py
+"""Asyncio delivery worker, an alternative to the prefork Celery workers.
+
+Consumes the same Redis queues as Celery and runs thousands of tasks
+concurrently on one event loop per process, since delivering a webhook is
+almost entirely waiting on the network:
+
+    python -m app.webhook.worker --concurrency 1000
+
+Run one per core with python -m app.webhook.supervisor.
+
+Messages are acknowledged once their task has run, like Celery with
+task_acks_late. A message is moved onto a processing list of the worker when
+it is taken and removed from it when acknowledged. Processing lists of
+workers that stopped sending heartbeats are put back on their queues.
+"""
+
+import argparse
+import asyncio
+import os
+import signal
+import socket
+from datetime import datetime, timezone
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Dict,
+    List,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+)
+
+import structlog
+from redis.exceptions import RedisError
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker, create_async_engine
+
+from app.core import config
+from app.db import partitions
+from app.db.cache import get_redis, get_sync_redis
+from app.webhook.blobstore import expire_blobs
+from app.webhook.broker import TaskMessage
+from app.webhook.circuit import CircuitBreaker
+from app.webhook.concurrency import recorded_latencies
+from app.webhook.delivery import DeliveryEngine
+from app.webhook.ratelimit import RateLimiter
+from app.webhook.sharding import LANES, lane_queues, shard_queue
+from app.webhook.webhook_notifier import (
+    async_broker,
+    maintain_partitions,
+    process_webhook_event,
+    process_webhook_event_async,
+    process_webhook_event_batch,
+    process_webhook_event_batch_high_priority,
+    process_webhook_event_high_priority,
+    retry_due_deliveries,
+    retry_due_deliveries_async,
+)
+
+logger = structlog.get_logger()
+
+WORKERS_KEY = "asyncworker:workers"
+
+# Moves the oldest message of the first non-empty queue of KEYS[1..n] onto its
+# processing list in KEYS[n+1..2n]. Returns {index, message} or nil.
+FETCH = """
+local n = #KEYS / 2
+for i = 1, n do
+    local message = redis.call('LMOVE', KEYS[i], KEYS[n + i], 'RIGHT', 'LEFT')
+    if message then
+        return {i, message}
+    end
+end
+return nil
+"""
+
+# Puts every message of a processing list (KEYS[1]) back at the consuming end
+# of its queue (KEYS[2]), oldest first. Returns the number of messages moved.
+REQUEUE = """
+local moved = 0
+while redis.call('LMOVE', KEYS[1], KEYS[2], 'LEFT', 'RIGHT') do
+    moved = moved + 1
+end
+return moved
+"""
+
+
+def worker_name(pid: Optional[int] = None) -> str:
+    # Stable across restarts on the same host and pid, so a restarted worker
+    # takes back what its previous incarnation left unacknowledged
+    return f"{socket.gethostname()}:{pid or os.getpid()}"
+
+
+def processing_key(worker_id: str, queue: str) -> str:
+    return f"asyncworker:{worker_id}:{queue}"
+
+
+def heartbeat_key(worker_id: str) -> str:
+    return f"asyncworker:{worker_id}:heartbeat"
+
+
+def worker_queues(lanes: Sequence[str], shards: int) -> List[str]:
+    """Every queue a worker may take messages from"""
+    queues = list(lanes)
+    if shards:
+        queues += [queue for lane in lanes for queue in lane_queues(lane, shards)]
+    return queues
+
+
+def requeue_sync(worker_id: str, queues: Sequence[str]) -> int:
+    """Put the unacknowledged messages of a worker back on their queues"""
+    with get_sync_redis().pipeline(transaction=False) as pipe:
+        for queue in queues:
+            pipe.eval(REQUEUE, 2, processing_key(worker_id, queue), queue)
+        return sum(pipe.execute())
+
+
+def create_db_engine(pool_size: int = config.ASYNC_WORKER_DB_POOL_SIZE) -> AsyncEngine:
+    # Sessions give their connection back between the database steps of a
+    # task, so a small pool serves many concurrent deliveries. Tasks queue for
+    # a connection rather than fail when it is exhausted.
+    return create_async_engine(
+        config.SQLALCHEMY_DATABASE_URI,
+        pool_pre_ping=True,
+        echo=config.SQLALCHEMY_ECHO_SQL,
+        pool_size=pool_size,
+        max_overflow=0,
+        pool_timeout=config.ASYNC_WORKER_SHUTDOWN_TIMEOUT,
+        connect_args={"server_settings": {"application_name": config.APPLICATION_NAME}},
+        pool_use_lifo=True,
+        pool_recycle=config.SQLALCHEMY_POOL_RECYCLE_INTERVAL,
+    )
+
+
+class AsyncWorker:
+    """Consumes the delivery queues on one event loop.
+
+    Under the supervisor, ``owners`` maps every shard to the slot of the
+    process serving it and the worker takes messages from the shard queues
+    its ``slot`` owns, then from the shared queues. The map is read on every
+    fetch, so shards move between processes without restarting them.
+    """
+
+    def __init__(
+        self,
+        lanes: Sequence[str] = LANES,
+        concurrency: int = config.ASYNC_WORKER_CONCURRENCY,
+        poll_interval: float = config.ASYNC_WORKER_POLL_INTERVAL,
+        shutdown_timeout: float = config.ASYNC_WORKER_SHUTDOWN_TIMEOUT,
+        heartbeat_interval: float = config.ASYNC_WORKER_HEARTBEAT_INTERVAL,
+        worker_id: Optional[str] = None,
+        shards: int = 0,
+        owners: Optional[Sequence[int]] = None,
+        slot: int = 0,
+    ):
+        self.lanes = lanes
+        self.queues = worker_queues(lanes, shards)
+        self.shards = shards
+        self.owners = owners
+        self.slot = slot
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self.shutdown_timeout = shutdown_timeout
+        self.heartbeat_interval = heartbeat_interval
+        self.worker_id = worker_id or worker_name()
+        self.handlers: Dict[str, Callable[..., Awaitable[Any]]] = {
+            process_webhook_event.name: self._process_event,
+            process_webhook_event_high_priority.name: self._process_event,
+            process_webhook_event_batch.name: self._process_batch,
+            process_webhook_event_batch_high_priority.name: self._process_batch,
+            retry_due_deliveries.name: self._retry_due_deliveries,
+            maintain_partitions.name: self._maintain_partitions,
+        }
+        self.db_engine: Optional[AsyncEngine] = None
+        self.session_factory: Optional[async_sessionmaker] = None
+        self.delivery_engine: Optional[DeliveryEngine] = None
+        self._slots = asyncio.Semaphore(concurrency)
+        self._tasks: Set[asyncio.Task] = set()
+        self._stopping = asyncio.Event()
+        self._fetches = 0
+
+    async def _process_event(
+        self, event_id, event_type, user_id, data, created_at=None
+    ):
+        async with self.session_factory() as db:
+            await process_webhook_event_async(
+                db,
+                self.delivery_engine,
+                event_id,
+                event_type,
+                user_id,
+                data,
+                created_at,
+            )
+
+    async def _process_batch(self, events: List[List[Any]]):
+        await asyncio.gather(*(self._process_event(*event) for event in events))
+
+    async def _retry_due_deliveries(self):
+        async with self.session_factory() as db:
+            await retry_due_deliveries_async(
+                db, self.delivery_engine, config.WEBHOOK_RETRY_BATCH_SIZE
+            )
+
+    async def _maintain_partitions(self):
+        async with self.db_engine.begin() as conn:
+            await conn.run_sync(partitions.maintain_partitions)
+        await asyncio.to_thread(expire_blobs, datetime.now(timezone.utc).date())
+
+    def owned_shards(self) -> List[int]:
+        if self.owners is None:
+            return []
+        return [
+            shard for shard in range(self.shards) if self.owners[shard] == self.slot
+        ]
+
+    def poll_order(self) -> List[str]:
+        """Queues to take the next message from, most urgent lane first"""
+        shards = self.owned_shards()
+        if shards:
+            # Start from a different shard each time so none is starved
+            start = self._fetches % len(shards)
+            shards = shards[start:] + shards[:start]
+        queues = []
+        for lane in self.lanes:
+            queues += [shard_queue(lane, shard) for shard in shards]
+            queues.append(lane)
+        return queues
+
+    async def fetch(self) -> Optional[Tuple[str, bytes]]:
+        """Move the next message onto a processing list, returns (queue, raw)"""
+        queues = self.poll_order()
+        self._fetches += 1
+        # Celery producers LPUSH, so the oldest message is on the right
+        fetched = await get_redis().eval(
+            FETCH,
+            2 * len(queues),
+            *queues,
+            *(processing_key(self.worker_id, queue) for queue in queues),
+        )
+        if fetched is None:
+            return None
+        index, raw = fetched
+        return queues[index - 1], raw
+
+    async def ack(self, queue: str, raw: bytes):
+        await get_redis().lrem(processing_key(self.worker_id, queue), 1, raw)
+
+    async def handle(self, queue: str, raw: bytes):
+        try:
+            message = async_broker.decode_message(raw)
+            handler = self.handlers.get(message.task_name)
+            if handler is None:
+                logger.error("Unknown task, discarding message", task=message.task_name)
+            else:
+                await _wait_for_eta(message)
+                await handler(*message.args, **message.kwargs)
+        except asyncio.CancelledError:
+            # Unacknowledged, the message is put back on its queue
+            raise
+        except Exception as e:
+            # Acknowledged anyway, failed deliveries have their own retries
+            logger.exception("Task failed", queue=queue, error=str(e))
+        finally:
+            self._slots.release()
+
+        try:
+            await self.ack(queue, raw)
+        except RedisError as e:
+            logger.error("Failed to acknowledge task", queue=queue, error=str(e))
+
+    async def requeue(self, worker_id: str) -> int:
+        """Put the unacknowledged messages of a worker back on their queues"""
+        async with get_redis().pipeline(transaction=False) as pipe:
+            for queue in self.queues:
+                pipe.eval(REQUEUE, 2, processing_key(worker_id, queue), queue)
+            requeued = sum(await pipe.execute())
+        if requeued:
+            logger.warning(
+                "Requeued unacknowledged tasks", worker=worker_id, count=requeued
+            )
+        return requeued
+
+    async def heartbeat(self):
+        """Announce this worker and recover the tasks of dead ones"""
+        cache = get_redis()
+        ttl = int(self.heartbeat_interval * 3)
+        async with cache.pipeline(transaction=False) as pipe:
+            pipe.set(heartbeat_key(self.worker_id), 1, ex=ttl)
+            pipe.sadd(WORKERS_KEY, self.worker_id)
+            await pipe.execute()
+
+        workers = [member.decode() for member in await cache.smembers(WORKERS_KEY)]
+        for worker_id in workers:
+            if worker_id != self.worker_id and not await cache.exists(
+                heartbeat_key(worker_id)
+            ):
+                await self.requeue(worker_id)
+                await cache.srem(WORKERS_KEY, worker_id)
+
+    async def _heartbeat_loop(self):
+        while not self._stopping.is_set():
+            try:
+                await self.heartbeat()
+            except RedisError as e:
+                logger.warning("Async worker heartbeat failed", error=str(e))
+            try:
+                await asyncio.wait_for(
+                    self._stopping.wait(), timeout=self.heartbeat_interval
+                )
+            except asyncio.TimeoutError:
+                pass
+
+    async def seed_host_limits(self):
+        if config.WEBHOOK_LATENCY_SEED_WINDOW <= 0:
+            return
+        try:
+            async with self.session_factory() as db:
+                latencies = (await db.execute(recorded_latencies())).all()
+        except SQLAlchemyError as e:
+            logger.warning("Failed to seed host concurrency limits", error=str(e))
+            return
+        self.delivery_engine.seed_host_limits(latencies)
+
+    async def run(self):
+        """Consume until stopped, then drain the tasks in flight"""
+        self.db_engine = create_db_engine()
+        self.session_factory = async_sessionmaker(bind=self.db_engine, autoflush=False)
+        self.delivery_engine = DeliveryEngine(
+            circuit_breaker=CircuitBreaker(), rate_limiter=RateLimiter()
+        )
+        await self.seed_host_limits()
+        await self.requeue(self.worker_id)
+        heartbeats = asyncio.create_task(self._heartbeat_loop())
+        logger.info(
+            "Async worker started",
+            worker=self.worker_id,
+            lanes=list(self.lanes),
+            shards=self.owned_shards(),
+            concurrency=self.concurrency,
+        )
+
+        while not self._stopping.is_set():
+            await self._slots.acquire()
+            if self._stopping.is_set():
+                self._slots.release()
+                break
+            try:
+                fetched = await self.fetch()
+            except RedisError as e:
+                logger.error("Async worker fetch failed", error=str(e))
+                fetched = None
+            if fetched is None:
+                self._slots.release()
+                try:
+                    await asyncio.wait_for(
+                        self._stopping.wait(), timeout=self.poll_interval
+                    )
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            task = asyncio.create_task(self.handle(*fetched))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+        await self._shutdown(heartbeats)
+
+    async def _shutdown(self, heartbeats: asyncio.Task):
+        if self._tasks:
+            logger.info("Waiting for tasks in flight", count=len(self._tasks))
+            _, pending = await asyncio.wait(self._tasks, timeout=self.shutdown_timeout)
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+        await heartbeats
+
+        try:
+            await self.requeue(self.worker_id)
+            async with get_redis().pipeline(transaction=False) as pipe:
+                pipe.delete(heartbeat_key(self.worker_id))
+                pipe.srem(WORKERS_KEY, self.worker_id)
+                await pipe.execute()
+        except RedisError as e:
+            # The tasks are recovered once the heartbeat expires
+            logger.error("Failed to release tasks in flight", error=str(e))
+        if self.delivery_engine is not None:
+            await self.delivery_engine.aclose()
+        if self.db_engine is not None:
+            await self.db_engine.dispose()
+        logger.info("Async worker stopped", worker=self.worker_id)
+
+    def stop(self):
+        self._stopping.set()
+
+
+async def _wait_for_eta(message: TaskMessage):
+    if message.eta is None:
+        return
+    delay = (
+        datetime.fromisoformat(message.eta) - datetime.now(timezone.utc)
+    ).total_seconds()
+    if delay > 0:
+        await asyncio.sleep(delay)
+
+
+async def main(worker: AsyncWorker):
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, worker.stop)
+    await worker.run()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--concurrency", type=int, default=config.ASYNC_WORKER_CONCURRENCY
+    )
+    args = parser.parse_args()
+    asyncio.run(main(AsyncWorker(concurrency=args.concurrency)))